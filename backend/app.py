@@ -3,9 +3,11 @@ from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from sentiment_analyzer import FinBERTSentimentAnalyzer
-from price_predictor import get_predictor
+from price_predictor import get_predictor, predictor_slot, FORECAST_BACKENDS
+from model_registry import ModelSlot, model_registry, SENTIMENT_MODEL
+from xgb_forecaster import get_xgb_forecaster, volatility_return_std
 from optimization_api import optimization_bp
-import threading
+from signals import interval_return_std, signal_cache
 
 # Load environment variables
 load_dotenv()
@@ -17,26 +19,36 @@ app = Flask(__name__)
 CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000", "http://localhost:5000"],
-        "methods": ["GET", "POST", "OPTIONS"],
+        "methods": ["GET", "POST", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization"]
     }
 })
 
-# Initialize FinBERT analyzer (singleton pattern with thread lock)
-analyzer = None
-analyzer_lock = threading.Lock()
+# Upper bound on Monte Carlo dropout samples per prediction
+MAX_MC_SAMPLES = 1000
+
+# Admin endpoints (model hot swap) require "Authorization: Bearer <ADMIN_TOKEN>";
+# they are disabled when ADMIN_TOKEN is unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def load_analyzer(entry):
+    """FinBERT analyzer for a model registry version (None: ProsusAI/finbert from HuggingFace)"""
+    print("Initializing FinBERT model...")
+    if entry is None:
+        instance = FinBERTSentimentAnalyzer()
+    else:
+        instance = FinBERTSentimentAnalyzer(os.path.join(entry['path'], entry['model_file']))
+    print("FinBERT model loaded successfully!")
+    return instance
+
+# FinBERT analyzer, loaded once under the slot's lock and hot-swappable
+analyzer_slot = ModelSlot(SENTIMENT_MODEL, load_analyzer,
+                          lambda instance: instance.analyze("Quarterly revenue grew.", use_lime=False))
+MODEL_SLOTS = {slot.name: slot for slot in (predictor_slot, analyzer_slot)}
 
 def get_analyzer():
     """Get or create the FinBERT analyzer instance (thread-safe)"""
-    global analyzer
-    if analyzer is None:
-        with analyzer_lock:
-            # Double-check locking pattern
-            if analyzer is None:
-                print("Initializing FinBERT model...")
-                analyzer = FinBERTSentimentAnalyzer()
-                print("FinBERT model loaded successfully!")
-    return analyzer
+    return analyzer_slot.get()
 
 # Register blueprints
 app.register_blueprint(optimization_bp, url_prefix='/api/portfolio')
@@ -58,9 +70,18 @@ def health_check():
         'version': '1.0.0',
         'endpoints': [
             '/api/portfolio/optimize (POST)',
+            '/api/portfolio/frontier (POST)',
+            '/api/portfolio/backtest (POST)',
+            '/api/portfolio/simulate (POST)',
+            '/api/portfolio/stress-test (POST)',
+            '/api/portfolio/stress-test/scenarios (GET)',
+            '/api/portfolio/jobs/<job_id> (GET, DELETE)',
             '/api/sentiment/analyze (POST)',
             '/api/sentiment/batch (POST)',
-            '/api/price/predict (POST)'
+            '/api/price/predict (POST)',
+            '/api/price/forecast-batch (POST)',
+            '/api/admin/models (GET)',
+            '/api/admin/models/<name>/activate (POST)'
         ]
     })
 
@@ -72,7 +93,8 @@ def analyze_sentiment():
     Request body:
     {
         "text": "Your financial text here",
-        "title": "Optional title"
+        "title": "Optional title",
+        "ticker": "AAPL"  // Optional: records the score for Black-Litterman views
     }
     
     Response:
@@ -102,6 +124,7 @@ def analyze_sentiment():
         
         text = data.get('text', '').strip()
         title = data.get('title', '').strip()
+        ticker = str(data.get('ticker') or '').strip().upper()
         
         if not text:
             return jsonify({
@@ -115,6 +138,9 @@ def analyze_sentiment():
         sentiment_analyzer = get_analyzer()
         result = sentiment_analyzer.analyze(full_text)
         
+        if ticker:
+            signal_cache.record_sentiment(ticker, result['score'], result['confidence'])
+        
         return jsonify(result), 200
         
     except Exception as e:
@@ -130,12 +156,15 @@ def analyze_batch():
     
     Request body:
     {
+        "ticker": "AAPL",  // Optional: default ticker for items without one
         "items": [
-            {"text": "Text 1", "title": "Title 1"},
+            {"text": "Text 1", "title": "Title 1", "ticker": "AAPL"},
             {"text": "Text 2", "title": "Title 2"}
         ]
     }
     
+    Scores of items with a ticker are recorded for Black-Litterman views.
+    
     Response:
     {
         "results": [...]
@@ -159,9 +188,11 @@ def analyze_batch():
         
         # Get analyzer
         sentiment_analyzer = get_analyzer()
+        default_ticker = str(data.get('ticker') or '').strip().upper()
         
         # Analyze each item
         results = []
+        signals = []
         for item in items:
             if not isinstance(item, dict) or 'text' not in item:
                 results.append({
@@ -184,12 +215,17 @@ def analyze_batch():
             try:
                 result = sentiment_analyzer.analyze(full_text)
                 results.append(result)
+                ticker = str(item.get('ticker') or default_ticker).strip().upper()
+                if ticker:
+                    signals.append({'ticker': ticker, 'score': result['score'], 'confidence': result['confidence']})
             except Exception as e:
                 print(f"Error analyzing item: {str(e)}")
                 results.append({
                     'error': f'Failed to analyze: {str(e)}'
                 })
         
+        signal_cache.record_sentiments(signals)
+        
         return jsonify({
             'results': results
         }), 200
@@ -214,6 +250,27 @@ def get_keywords():
             'error': f'Failed to get keywords: {str(e)}'
         }), 500
 
+def _record_forecast(symbol, result, history=None):
+    """
+    Keep the forecast's total return for Black-Litterman views
+
+    Its dispersion comes from the Monte Carlo interval when there is one,
+    else from the volatility of the lookback window in history. Without
+    either the forecast is kept but does not become a view.
+    """
+    predictions = result.get('predictions') or []
+    if predictions and result.get('current_price'):
+        current_price = result['current_price']
+        expected_return = predictions[-1]['price'] / current_price - 1
+        return_std = None
+        if 'interval' in result:
+            return_std = interval_return_std(current_price, predictions[-1]['lower'], predictions[-1]['upper'],
+                                             result['interval']['percentiles'])
+        elif history is not None:
+            return_std = volatility_return_std(history[-result['lookback_days']:], len(predictions))
+        signal_cache.record_forecast(symbol, expected_return, len(predictions), result.get('confidence', 0.5),
+                                     return_std)
+
 @app.route('/api/price/predict', methods=['POST'])
 def predict_price():
     """
@@ -224,18 +281,23 @@ def predict_price():
         "symbol": "AAPL",
         "historical_prices": [150.2, 151.3, ...],  // Array of closing prices
         "forecast_days": 5,      // 1-10 days to predict
-        "lookback_days": 60      // 30-120 days to use for prediction
+        "lookback_days": 60,     // 30-120 days to use for prediction
+        "model": "lstm",         // Optional: "lstm" | "xgboost" | "ensemble"
+        "mc_samples": 100,       // Optional: Monte Carlo dropout samples for intervals (0 = off)
+        "explain": true          // Optional: SHAP feature importances (slower; default false)
     }
     
     Request body (Option 2 - fetch via yfinance):
     {
         "symbol": "AAPL",
-        "days": 5  // 1-5 days
+        "days": 5,  // 1-5 days
+        "model": "lstm"
     }
     
     Response:
     {
         "symbol": "AAPL",
+        "model": "lstm",
         "current_price": 150.25,
         "lookback_days": 60,
         "forecast_days": 5,
@@ -245,7 +307,8 @@ def predict_price():
                 "date": "2025-10-27",
                 "price": 151.50,
                 "change": 1.25,
-                "change_percent": 0.83
+                "change_percent": 0.83,
+                "mean": 151.40, "lower": 148.90, "upper": 153.80  // With mc_samples (p5 / p95)
             },
             ...
         ],
@@ -269,6 +332,12 @@ def predict_price():
             }), 400
         
         symbol = data.get('symbol', '').strip().upper()
+        backend = data.get('model', 'lstm')
+        
+        if backend not in FORECAST_BACKENDS:
+            return jsonify({
+                'error': f'model must be one of: {", ".join(FORECAST_BACKENDS)}'
+            }), 400
         
         # Check if historical data is provided
         historical_prices = data.get('historical_prices')
@@ -277,6 +346,8 @@ def predict_price():
             # Use provided historical data (preferred method)
             forecast_days = data.get('forecast_days', 5)
             lookback_days = data.get('lookback_days', 60)
+            mc_samples = data.get('mc_samples', 0)
+            explain = data.get('explain', False)
             
             # Validate parameters
             if not isinstance(forecast_days, int) or forecast_days < 1 or forecast_days > 10:
@@ -289,6 +360,21 @@ def predict_price():
                     'error': 'lookback_days must be an integer between 30 and 120'
                 }), 400
             
+            if not isinstance(mc_samples, int) or mc_samples < 0 or mc_samples > MAX_MC_SAMPLES:
+                return jsonify({
+                    'error': f'mc_samples must be an integer between 0 and {MAX_MC_SAMPLES}'
+                }), 400
+            
+            if mc_samples and backend == 'xgboost':
+                return jsonify({
+                    'error': 'mc_samples needs model "lstm" or "ensemble" (Monte Carlo dropout)'
+                }), 400
+            
+            if not isinstance(explain, bool):
+                return jsonify({
+                    'error': 'explain must be true or false'
+                }), 400
+            
             if not isinstance(historical_prices, list) or len(historical_prices) < lookback_days:
                 return jsonify({
                     'error': f'historical_prices must be an array with at least {lookback_days} values'
@@ -296,7 +382,7 @@ def predict_price():
             
             print(f"\n📊 Price prediction for {symbol}")
             print(f"   Using provided data: {len(historical_prices)} prices")
-            print(f"   Lookback: {lookback_days} days, Forecast: {forecast_days} days")
+            print(f"   Lookback: {lookback_days} days, Forecast: {forecast_days} days, Model: {backend}")
             
             # Get predictor and make prediction
             predictor = get_predictor()
@@ -304,9 +390,13 @@ def predict_price():
                 symbol, 
                 historical_prices, 
                 forecast_days, 
-                lookback_days
+                lookback_days,
+                backend,
+                mc_samples,
+                explain
             )
             
+            _record_forecast(symbol, result, historical_prices)
             print(f"✅ Prediction successful for {symbol}")
             return jsonify(result), 200
             
@@ -323,8 +413,9 @@ def predict_price():
             print(f"   Forecast: {days} days")
             
             predictor = get_predictor()
-            result = predictor.predict_with_explanation(symbol, days)
+            result = predictor.predict_with_explanation(symbol, days, backend)
             
+            _record_forecast(symbol, result)
             print(f"✅ Prediction successful for {symbol}")
             return jsonify(result), 200
         
@@ -359,6 +450,160 @@ def predict_price():
                 'error': f'Prediction failed: {error_msg}'
             }), 500
 
+@app.route('/api/price/forecast-batch', methods=['POST'])
+def forecast_batch():
+    """
+    Forecast returns for many symbols in one batched model call per day
+    
+    Request body:
+    {
+        "historical_prices": {"AAPL": [150.2, ...], "MSFT": [...]},  // Closing prices per symbol
+                                 // (>= lookback_days each; >= 60 for "xgboost" / "ensemble")
+        "forecast_days": 5,      // 1-10 days to predict
+        "lookback_days": 60,     // 30-120 days to use for prediction
+        "model": "lstm"          // Optional: "lstm" | "xgboost" | "ensemble"
+    }
+    
+    "xgboost" runs without loading the LSTM (one in-place XGBoost prediction
+    over all symbols per day), for high-volume screens.
+    
+    Forecasts are recorded for Black-Litterman views
+    (expected_returns_method "black_litterman" on /api/portfolio/optimize).
+    
+    Response:
+    {
+        "forecasts": {"AAPL": {"current_price", "forecast_price", "expected_return", "confidence"}, ...}
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('historical_prices'), dict) or not data['historical_prices']:
+            return jsonify({
+                'error': 'historical_prices must be a non-empty object of symbol -> prices'
+            }), 400
+        
+        forecast_days = data.get('forecast_days', 5)
+        lookback_days = data.get('lookback_days', 60)
+        backend = data.get('model', 'lstm')
+        
+        if not isinstance(forecast_days, int) or forecast_days < 1 or forecast_days > 10:
+            return jsonify({
+                'error': 'forecast_days must be an integer between 1 and 10'
+            }), 400
+        
+        if not isinstance(lookback_days, int) or lookback_days < 30 or lookback_days > 120:
+            return jsonify({
+                'error': 'lookback_days must be an integer between 30 and 120'
+            }), 400
+        
+        if backend not in FORECAST_BACKENDS:
+            return jsonify({
+                'error': f'model must be one of: {", ".join(FORECAST_BACKENDS)}'
+            }), 400
+        
+        histories = {}
+        for symbol, prices in data['historical_prices'].items():
+            if not isinstance(prices, list):
+                return jsonify({
+                    'error': f'historical_prices for {symbol} must be an array of prices'
+                }), 400
+            histories[str(symbol).strip().upper()] = prices
+        
+        # XGBoost (alone or in the ensemble) needs its full training window
+        if backend == 'xgboost':
+            forecaster = get_xgb_forecaster()
+            needed = forecaster.window_size
+        else:
+            forecaster = get_predictor()
+            needed = forecaster.history_needed(lookback_days, backend)
+        short = [symbol for symbol, prices in histories.items() if len(prices) < needed]
+        if short:
+            return jsonify({
+                'error': f'model "{backend}" needs at least {needed} prices per symbol; too few for: {", ".join(short)}'
+            }), 400
+        
+        if backend == 'xgboost':
+            forecasts = forecaster.forecast_returns(histories, forecast_days)
+        else:
+            forecasts = forecaster.forecast_returns(histories, forecast_days, lookback_days, backend)
+        
+        return jsonify({
+            'model': backend,
+            'forecast_days': forecast_days,
+            'lookback_days': lookback_days,
+            'forecasts': forecasts
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'error': f'Data error: {str(e)}'
+        }), 400
+    except Exception as e:
+        print(f"❌ Error in forecast_batch: {str(e)}")
+        return jsonify({
+            'error': f'Forecast failed: {str(e)}'
+        }), 500
+
+def _admin_denied():
+    """Error response unless the request carries the admin token"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 403
+    if request.headers.get('Authorization', '') != f'Bearer {ADMIN_TOKEN}':
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+@app.route('/api/admin/models', methods=['GET'])
+def list_models():
+    """Registered versions (with metadata) and the version each model is serving"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify({
+        'models': {name: {**model_registry.summary(name), **slot.status()} for name, slot in MODEL_SLOTS.items()}
+    }), 200
+
+@app.route('/api/admin/models/<name>/activate', methods=['POST'])
+def activate_model(name):
+    """
+    Serve another registered version without downtime
+    
+    The version is loaded and warmed up in the background; requests keep
+    using the current version until it is swapped in. Poll GET
+    /api/admin/models for the swap state.
+    
+    Request body:
+    {
+        "version": "v2"
+    }
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    slot = MODEL_SLOTS.get(name)
+    if slot is None:
+        return jsonify({
+            'error': f'Unknown model {name}. Use one of: {", ".join(MODEL_SLOTS)}'
+        }), 404
+    
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not isinstance(version, str) or not version:
+        return jsonify({
+            'error': 'Missing required field: version'
+        }), 400
+    
+    try:
+        status = slot.activate(version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    print(f"🔄 Loading {name} {version} in the background")
+    return jsonify(status), 202
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV', 'production') == 'development'
@@ -0,0 +1,371 @@
+"""
+Walk-Forward Backtesting for Portfolio Optimizer Strategies
+Run: python backtest.py --tickers AAPL MSFT GOOGL AMZN --objectives max_sharpe hrp
+
+At every rebalance date the optimizer objectives are solved on the trailing
+lookback window; NAV, turnover and drawdown are then computed with array
+operations over the whole price matrix.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolio_optimizer import PortfolioOptimizer, OBJECTIVES, DEFAULT_RISK_FREE_RATE, MIN_DATA_POINTS_FOR_COVARIANCE
+from rolling_covariance import RollingCovariance, ROLLING_COVARIANCE_METHODS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_LOOKBACK_DAYS = 252
+DEFAULT_REBALANCE_DAYS = 21
+DEFAULT_OBJECTIVES = ('max_sharpe', 'min_volatility', 'hrp')
+DEFAULT_COVARIANCE_METHOD = 'ledoit_wolf'
+DEFAULT_EXP_COV_SPAN = 180
+BACKTEST_MAX_WORKERS = int(os.environ.get('BACKTEST_MAX_WORKERS', os.cpu_count() or 1))
+
+
+def rebalance_positions(n_prices: int, lookback: int, rebalance_every: int) -> np.ndarray:
+    """
+    Price-row indices at which the portfolio is rebalanced
+
+    The first rebalance needs lookback returns behind it and every rebalance
+    needs at least one later price to be evaluated on.
+    """
+    return np.arange(lookback, n_prices - 1, rebalance_every)
+
+
+def rolling_window_inputs(simple_returns: np.ndarray,
+                          log_returns: np.ndarray,
+                          positions: np.ndarray,
+                          lookback: int,
+                          covariance_method: str = DEFAULT_COVARIANCE_METHOD,
+                          span: float = DEFAULT_EXP_COV_SPAN,
+                          frequency: int = TRADING_DAYS_PER_YEAR) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Annualized (mu, S) for the lookback window ending at each rebalance
+
+    Return row j is the move from price row j to j + 1, so the window for a
+    rebalance at price row p is return rows [p - lookback, p). Covariance
+    (any of ROLLING_COVARIANCE_METHODS) is updated incrementally between
+    rebalances; mu comes from cumulative log returns (geometric mean, as in
+    ReturnMoments.mean_return).
+    """
+    if covariance_method not in ROLLING_COVARIANCE_METHODS:
+        raise ValueError(f"covariance_method must be one of: {', '.join(ROLLING_COVARIANCE_METHODS)}")
+    span = min(span, lookback - 1) if covariance_method == 'exp_cov' else None
+
+    def new_rolling():
+        return RollingCovariance(simple_returns.shape[1], span=span)
+
+    cumulative_log = np.vstack([np.zeros(log_returns.shape[1]), np.cumsum(log_returns, axis=0)])
+    rolling = new_rolling()
+
+    inputs = []
+    window_start = window_end = 0
+    for position in positions:
+        start = position - lookback
+        if start >= window_end:
+            # No overlap with the previous window: start afresh
+            rolling = new_rolling()
+            rolling.add(simple_returns[start:position])
+        else:
+            rolling.add(simple_returns[window_end:position])
+            rolling.drop(simple_returns[window_start:start])
+        window_start, window_end = start, position
+
+        mu = np.expm1((cumulative_log[position] - cumulative_log[start]) / lookback * frequency)
+        cov = rolling.estimate(covariance_method, frequency)
+        inputs.append((mu, cov))
+    return inputs
+
+
+def _solve_rebalance(task: Tuple) -> Dict[str, Optional[np.ndarray]]:
+    """Solve every objective for one rebalance window (runs in a worker process)"""
+    window_prices, mu, cov, objectives, options = task
+    tickers = window_prices.columns.tolist()
+
+    optimizer = PortfolioOptimizer(tickers)
+    optimizer.prices = window_prices
+    optimizer.tickers = tickers
+    optimizer.mu = pd.Series(mu, index=tickers)
+    optimizer.S = pd.DataFrame(cov, index=tickers, columns=tickers)
+
+    weights = {}
+    for objective in objectives:
+        try:
+            result = optimizer.optimize_portfolio(objective=objective, **options)
+            weights[objective] = pd.Series(result['weights']).reindex(tickers).fillna(0.0).to_numpy()
+        except Exception as e:
+            logger.warning(f"{objective} failed for window ending {window_prices.index[-1]}: {e}")
+            weights[objective] = None
+    return weights
+
+
+def simulate_portfolio(prices: np.ndarray,
+                       positions: np.ndarray,
+                       weights: np.ndarray,
+                       transaction_cost_bps: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    NAV, drifted weights and turnover of a periodically rebalanced portfolio
+
+    Between rebalances the portfolio holds fixed shares, so the value at row t
+    relative to the last rebalance p_k is sum_i w_ki * P_ti / P_pk,i. Every
+    quantity is computed for all rows at once.
+
+    Args:
+        prices: Price matrix (T x N)
+        positions: Rebalance price-row indices (K,)
+        weights: Target weights at each rebalance (K x N)
+        transaction_cost_bps: Cost charged on traded notional at each rebalance
+
+    Returns:
+        Dict with nav (from positions[0] to the last row), turnover (K,) and costs (K,)
+    """
+    first = positions[0]
+    rows = np.arange(first + 1, prices.shape[0])
+    segment = np.searchsorted(positions, rows, side='left') - 1
+
+    growth = (weights[segment] * prices[rows] / prices[positions[segment]]).sum(axis=1)
+
+    # Pre-trade drifted weights at each rebalance after the first
+    growth_at_rebalance = growth[positions[1:] - first - 1]
+    drifted = weights[:-1] * prices[positions[1:]] / prices[positions[:-1]] / growth_at_rebalance[:, None]
+    traded = np.abs(weights[1:] - drifted).sum(axis=1)
+    traded = np.concatenate([[np.abs(weights[0]).sum()], traded])
+
+    costs = traded * transaction_cost_bps / 1e4
+    nav_at_rebalance = np.cumprod(np.concatenate([[1.0], growth_at_rebalance]) * (1.0 - costs))
+
+    nav = np.empty(len(rows) + 1)
+    nav[0] = nav_at_rebalance[0]
+    nav[1:] = nav_at_rebalance[segment] * growth
+    nav[positions - first] = nav_at_rebalance
+
+    return {'nav': nav, 'turnover': traded / 2, 'costs': costs}
+
+
+def performance_metrics(nav: np.ndarray,
+                        turnover: np.ndarray,
+                        risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+                        frequency: int = TRADING_DAYS_PER_YEAR) -> Dict:
+    """Annualized return/volatility, Sharpe, drawdown and turnover from a NAV path"""
+    daily = nav[1:] / nav[:-1] - 1
+    years = len(daily) / frequency
+    annual_return = nav[-1] / nav[0]
+    annual_return = annual_return ** (1 / years) - 1 if years > 0 else 0.0
+    annual_volatility = float(daily.std(ddof=1) * np.sqrt(frequency)) if len(daily) > 1 else 0.0
+    drawdown = nav / np.maximum.accumulate(nav) - 1
+
+    return {
+        'total_return': float(nav[-1] / nav[0] - 1),
+        'annual_return': float(annual_return),
+        'annual_volatility': annual_volatility,
+        'sharpe_ratio': float((annual_return - risk_free_rate) / annual_volatility) if annual_volatility > 1e-12 else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'average_turnover': float(turnover[1:].mean()) if len(turnover) > 1 else 0.0,
+        'annual_turnover': float(turnover[1:].sum() / years) if years > 0 else 0.0
+    }
+
+
+def backtest(prices: pd.DataFrame,
+             objectives: Sequence[str] = DEFAULT_OBJECTIVES,
+             lookback: int = DEFAULT_LOOKBACK_DAYS,
+             rebalance_every: int = DEFAULT_REBALANCE_DAYS,
+             covariance_method: str = DEFAULT_COVARIANCE_METHOD,
+             weight_bounds: Tuple[float, float] = (0, 1),
+             risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+             target_return: Optional[float] = None,
+             target_risk: Optional[float] = None,
+             gamma: float = 0.1,
+             transaction_cost_bps: float = 0.0,
+             n_workers: int = 1) -> Dict:
+    """
+    Walk-forward backtest of optimizer objectives on a price matrix
+
+    Args:
+        prices: Price DataFrame (dates x tickers)
+        objectives: Objectives from OBJECTIVES to compare
+        lookback: Trading days of history used at each rebalance
+        rebalance_every: Trading days between rebalances
+        covariance_method: 'ledoit_wolf', 'sample_cov' or 'exp_cov', updated incrementally per window
+        weight_bounds, risk_free_rate, target_return, target_risk, gamma: Passed to optimize_portfolio
+        transaction_cost_bps: Cost in basis points on traded notional
+        n_workers: Worker processes for the per-window solves (1 solves in-process)
+
+    Returns:
+        Dictionary with rebalance dates and per-objective NAV, weights and metrics
+    """
+    unknown = [o for o in objectives if o not in OBJECTIVES]
+    if unknown:
+        raise ValueError(f"Unknown objective(s): {', '.join(unknown)}")
+    if lookback < MIN_DATA_POINTS_FOR_COVARIANCE:
+        raise ValueError(f"lookback must be at least {MIN_DATA_POINTS_FOR_COVARIANCE} trading days")
+    if rebalance_every < 1:
+        raise ValueError("rebalance_every must be at least 1")
+
+    prices = prices.reindex(columns=sorted(prices.columns)).ffill().bfill().dropna(axis=1, how='any')
+    if prices.shape[0] < lookback + 2:
+        raise ValueError(f"Need more than {lookback + 1} price rows for lookback {lookback}, have {prices.shape[0]}")
+
+    tickers = prices.columns.tolist()
+    price_values = prices.to_numpy(dtype=np.float64)
+    log_returns = np.diff(np.log(price_values), axis=0)
+    simple_returns = np.expm1(log_returns)
+
+    positions = rebalance_positions(len(prices), lookback, rebalance_every)
+    logger.info(f"Backtesting {', '.join(objectives)} on {len(tickers)} tickers: "
+                f"{len(positions)} rebalances, lookback {lookback}, every {rebalance_every} days")
+
+    window_inputs = rolling_window_inputs(simple_returns, log_returns, positions, lookback, covariance_method)
+    options = {
+        'weight_bounds': weight_bounds,
+        'risk_free_rate': risk_free_rate,
+        'target_return': target_return,
+        'target_risk': target_risk,
+        'gamma': gamma
+    }
+    tasks = [
+        (prices.iloc[position - lookback:position + 1], mu, cov, list(objectives), options)
+        for position, (mu, cov) in zip(positions, window_inputs)
+    ]
+
+    n_workers = max(1, min(int(n_workers), len(tasks)))
+    if n_workers > 1:
+        chunksize = max(1, math.ceil(len(tasks) / (n_workers * 4)))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            solved = list(executor.map(_solve_rebalance, tasks, chunksize=chunksize))
+    else:
+        solved = [_solve_rebalance(task) for task in tasks]
+
+    equal_weight = np.full(len(tickers), 1.0 / len(tickers))
+    dates = prices.index[positions[0]:]
+    results = {}
+
+    for objective in objectives:
+        # A failed window keeps the previous weights (equal weight before the first success)
+        weights = np.empty((len(positions), len(tickers)))
+        failed = 0
+        previous = equal_weight
+        for k, window in enumerate(solved):
+            if window[objective] is None:
+                failed += 1
+            else:
+                previous = window[objective]
+            weights[k] = previous
+
+        simulation = simulate_portfolio(price_values, positions, weights, transaction_cost_bps)
+        metrics = performance_metrics(simulation['nav'], simulation['turnover'], risk_free_rate)
+        metrics['failed_rebalances'] = failed
+
+        results[objective] = {
+            'metrics': metrics,
+            'nav': {str(d.date()): round(float(v), 6) for d, v in zip(dates, simulation['nav'])},
+            'rebalances': [
+                {
+                    'date': str(prices.index[p].date()),
+                    'turnover': round(float(t), 6),
+                    'weights': {tickers[i]: round(float(w), 6) for i, w in enumerate(weights[k]) if abs(w) > 1e-4}
+                }
+                for k, (p, t) in enumerate(zip(positions, simulation['turnover']))
+            ]
+        }
+
+    return {
+        'tickers': tickers,
+        'start_date': str(dates[0].date()),
+        'end_date': str(dates[-1].date()),
+        'rebalance_count': len(positions),
+        'results': results
+    }
+
+
+def run_walk_forward_backtest(tickers: List[str],
+                              years: int = 5,
+                              prices: Optional[pd.DataFrame] = None,
+                              **kwargs) -> Dict:
+    """
+    High-level backtest: fetch history (unless prices is given) and run backtest
+
+    Returns:
+        {'status': 'success', 'parameters', **backtest result} or an error dict
+    """
+    try:
+        optimizer = PortfolioOptimizer(tickers, prices_df=prices)
+        history = optimizer.fetch_historical_data(years=years)
+        result = backtest(history, **kwargs)
+
+        parameters = {'initial_tickers': tickers, 'years': years}
+        parameters.update({k: v for k, v in kwargs.items()})
+        return {'status': 'success', 'parameters': parameters, **result}
+
+    except (ValueError, ConnectionError) as ve:
+        error_type = type(ve).__name__
+        logger.error(f"Backtest failed ({error_type}): {str(ve)}")
+        return {'status': 'error', 'message': str(ve), 'error_type': error_type}
+    except Exception as e:
+        logger.error(f"Unexpected backtest error: {e}", exc_info=True)
+        return {'status': 'error', 'message': 'An unexpected internal error occurred.', 'error_type': type(e).__name__}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of portfolio optimizer objectives')
+    parser.add_argument('--tickers', nargs='+', help='Tickers to backtest (fetched from Yahoo Finance)')
+    parser.add_argument('--prices-csv', help='Wide CSV of prices (date index, one column per ticker) instead of fetching')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--objectives', nargs='+', default=list(DEFAULT_OBJECTIVES), choices=OBJECTIVES)
+    parser.add_argument('--lookback', type=int, default=DEFAULT_LOOKBACK_DAYS)
+    parser.add_argument('--rebalance-every', type=int, default=DEFAULT_REBALANCE_DAYS)
+    parser.add_argument('--covariance-method', default=DEFAULT_COVARIANCE_METHOD, choices=ROLLING_COVARIANCE_METHODS)
+    parser.add_argument('--cost-bps', type=float, default=0.0)
+    parser.add_argument('--risk-free-rate', type=float, default=DEFAULT_RISK_FREE_RATE)
+    parser.add_argument('--workers', type=int, default=BACKTEST_MAX_WORKERS)
+    parser.add_argument('--output', help='Write the full JSON result to this path')
+    args = parser.parse_args()
+
+    price_frame = None
+    if args.prices_csv:
+        price_frame = pd.read_csv(args.prices_csv, index_col=0, parse_dates=True)
+    tickers = args.tickers or (price_frame.columns.tolist() if price_frame is not None else None)
+    if not tickers:
+        parser.error('Provide --tickers or --prices-csv')
+
+    result = run_walk_forward_backtest(
+        tickers,
+        years=args.years,
+        prices=price_frame,
+        objectives=args.objectives,
+        lookback=args.lookback,
+        rebalance_every=args.rebalance_every,
+        covariance_method=args.covariance_method,
+        risk_free_rate=args.risk_free_rate,
+        transaction_cost_bps=args.cost_bps,
+        n_workers=args.workers
+    )
+
+    if result['status'] != 'success':
+        print(f"Backtest failed: {result['message']}")
+        raise SystemExit(1)
+
+    print("=" * 92)
+    print(f"WALK-FORWARD BACKTEST {result['start_date']} -> {result['end_date']} ({result['rebalance_count']} rebalances)")
+    print("=" * 92)
+    print(f"{'objective':<16} {'total':>9} {'annual':>9} {'vol':>8} {'sharpe':>7} {'max dd':>9} {'turnover/yr':>12} {'failed':>7}")
+    for objective, block in result['results'].items():
+        m = block['metrics']
+        print(f"{objective:<16} {m['total_return']:>9.2%} {m['annual_return']:>9.2%} {m['annual_volatility']:>8.2%} "
+              f"{m['sharpe_ratio']:>7.2f} {m['max_drawdown']:>9.2%} {m['annual_turnover']:>12.2f} {m['failed_rebalances']:>7}")
+    print("=" * 92)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Full results written to {args.output}")
@@ -0,0 +1,126 @@
+"""
+Benchmark: Concurrent Price Forecasts from Many Request Threads
+Run: python benchmark_concurrency.py [--threads 1 4 16] [--requests 50] [--modes predict concurrent serialized]
+
+Uses synthetic random-walk prices so it runs offline.
+1. Cold start: all threads ask a fresh LazyEngine for the predictor at once;
+   reports how many predictors were built (must be 1) and the wait.
+2. Inference: each thread runs --requests forecasts (lookback 60, 5 days)
+   through model.predict (the old path) or KerasInference in each mode;
+   reports throughput, p50 / p95 latency, and the max difference from a
+   single-threaded reference.
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from engine_lifecycle import INFERENCE_MODES, KerasInference, LazyEngine
+from price_predictor import LSTMPricePredictor
+from windowing import rollout
+
+LOOKBACK_DAYS = 60
+FORECAST_DAYS = 5
+
+
+def synthetic_windows(n_windows: int, lookback: int = LOOKBACK_DAYS, seed: int = 42) -> np.ndarray:
+    """Random-walk price windows, one per request"""
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, size=(n_windows, lookback)), axis=1))
+
+
+def run_threads(n_threads: int, work) -> float:
+    """Start n_threads running work(thread_index) at once; returns wall seconds"""
+    barrier = threading.Barrier(n_threads)
+
+    def target(index):
+        barrier.wait()
+        work(index)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def cold_start(n_threads: int):
+    """Concurrent first requests against a fresh engine"""
+    engine = LazyEngine(LSTMPricePredictor, name='benchmark predictor')
+    predictors = [None] * n_threads
+
+    def work(index):
+        predictors[index] = engine.get()
+
+    wall = run_threads(n_threads, work)
+    return engine.constructions, len(set(map(id, predictors))), wall, predictors[0]
+
+
+def run_case(predictor: LSTMPricePredictor, mode: str, n_threads: int, n_requests: int,
+             windows: np.ndarray, reference: np.ndarray):
+    """Time n_threads x n_requests single-symbol forecasts"""
+    if mode == 'predict':
+        def predict(inputs):
+            return predictor.model.predict(inputs, verbose=0)
+    else:
+        predict = KerasInference(predictor.model, mode)
+    # Trace / build the predict function before timing
+    rollout(predict, predictor.normalizer, windows[:1], FORECAST_DAYS, predictor.horizon)
+
+    latencies = [[] for _ in range(n_threads)]
+    forecasts = np.empty((n_threads, n_requests, FORECAST_DAYS))
+
+    def work(index):
+        for i in range(n_requests):
+            start = time.perf_counter()
+            forecasts[index, i] = rollout(predict, predictor.normalizer, windows[i:i + 1],
+                                          FORECAST_DAYS, predictor.horizon)[0]
+            latencies[index].append(time.perf_counter() - start)
+
+    wall = run_threads(n_threads, work)
+    latencies = np.concatenate(latencies)
+    return {
+        'throughput': n_threads * n_requests / wall,
+        'p50_ms': np.percentile(latencies, 50) * 1000,
+        'p95_ms': np.percentile(latencies, 95) * 1000,
+        'max_diff': float(np.max(np.abs(forecasts - reference[np.newaxis])))
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent LSTM inference benchmark')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=50, help='Forecasts per thread')
+    parser.add_argument('--modes', nargs='+', default=['predict', *INFERENCE_MODES],
+                        choices=['predict', *INFERENCE_MODES])
+    args = parser.parse_args()
+
+    constructions, distinct, wall, predictor = cold_start(max(args.threads))
+    print("=" * 72)
+    print("COLD START")
+    print("=" * 72)
+    print(f"{max(args.threads)} concurrent first requests: {constructions} predictor(s) built, "
+          f"{distinct} distinct instance(s), {wall:.2f}s until all were served")
+
+    windows = synthetic_windows(args.requests)
+    reference = rollout(KerasInference(predictor.model), predictor.normalizer, windows,
+                        FORECAST_DAYS, predictor.horizon)
+
+    print("=" * 72)
+    print("CONCURRENT INFERENCE")
+    print("=" * 72)
+    print(f"{'threads':>7} {'mode':<11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max diff':>10}")
+    for n_threads in args.threads:
+        for mode in args.modes:
+            try:
+                stats = run_case(predictor, mode, n_threads, args.requests, windows, reference)
+                print(f"{n_threads:>7} {mode:<11} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.2f} "
+                      f"{stats['p95_ms']:>9.2f} {stats['max_diff']:>10.2e}")
+            except Exception as e:
+                print(f"{n_threads:>7} {mode:<11} failed: {e}")
+
+    print("=" * 72)
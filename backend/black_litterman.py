@@ -0,0 +1,179 @@
+"""
+Black-Litterman Expected Returns
+Blends an equilibrium prior with views built from cached sentiment and
+forecast signals, using the closed-form posterior mean
+"""
+
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Scale of prior uncertainty relative to the return covariance
+BL_TAU = float(os.environ.get('BL_TAU', 0.05))
+# Risk aversion for the equilibrium (reverse-optimized) prior
+BL_RISK_AVERSION = float(os.environ.get('BL_RISK_AVERSION', 2.5))
+TRADING_DAYS_PER_YEAR = 252
+# Annual return tilt for a sentiment score of +/-1
+SENTIMENT_RETURN_SPREAD = 0.10
+# Number of scored texts at which sentiment confidence reaches half its mean confidence
+SENTIMENT_PRIOR_COUNT = 5.0
+# Annualized forecast views are clipped to +/- this
+MAX_VIEW_RETURN = 0.5
+# Signals older than this are ignored; younger ones lose confidence with age
+MAX_SIGNAL_AGE_DAYS = float(os.environ.get('BL_MAX_SIGNAL_AGE_DAYS', 30))
+FORECAST_HALF_LIFE_DAYS = 5.0
+MIN_VIEW_CONFIDENCE = 0.01
+MAX_VIEW_CONFIDENCE = 0.99
+
+
+def equilibrium_prior(cov: np.ndarray,
+                      market_weights: Optional[np.ndarray] = None,
+                      risk_aversion: float = BL_RISK_AVERSION,
+                      risk_free_rate: float = 0.0) -> np.ndarray:
+    """
+    Market-implied returns pi = delta * S w + rf
+
+    Without market caps the universe is taken as equally weighted.
+    """
+    n = cov.shape[0]
+    weights = np.full(n, 1.0 / n) if market_weights is None else np.asarray(market_weights, dtype=float)
+    return risk_aversion * cov @ weights + risk_free_rate
+
+
+def build_views(prior: pd.Series, signals: pd.DataFrame, variances: pd.Series,
+                tau: float = BL_TAU) -> pd.DataFrame:
+    """
+    Absolute views (one row per ticker and signal source) from a signal snapshot
+
+    Computed for all tickers at once from the snapshot columns.
+
+    Forecasts: the horizon return r and its dispersion s are annualized
+    linearly (x 252 / horizon), not compounded, so a few days' move does
+    not saturate at MAX_VIEW_RETURN. The view's confidence is the share of
+    the prior's variance tau * sigma_ii^2 in the total, against the
+    annualized forecast variance; with the omega of posterior_returns the
+    view variance is then exactly that forecast variance, and the
+    posterior moves from the prior toward the view by that share. Short,
+    noisy forecasts barely move it. Forecasts without a dispersion are
+    skipped.
+
+    Sentiment tilts the prior by SENTIMENT_RETURN_SPREAD x score, with
+    confidence from the model's own confidence and the amount of evidence.
+
+    Both lose confidence with the signal's age.
+
+    Args:
+        prior: Prior expected returns indexed by ticker
+        signals: SignalCache.snapshot for the same tickers
+        variances: Annual return variances sigma_ii^2 indexed by ticker
+        tau: Prior uncertainty scale
+
+    Returns:
+        DataFrame with columns ticker, source, view_return, confidence
+    """
+    signals = signals.reindex(prior.index)
+    prior_variance = tau * variances.reindex(prior.index)
+
+    annualize = TRADING_DAYS_PER_YEAR / signals['forecast_horizon_days'].clip(lower=1)
+    forecast_return = (signals['forecast_return'] * annualize).clip(-MAX_VIEW_RETURN, MAX_VIEW_RETURN)
+    forecast_variance = (signals['forecast_return_std'] * annualize) ** 2
+    forecast_confidence = prior_variance / (prior_variance + forecast_variance)
+    forecast_confidence = forecast_confidence * 0.5 ** (signals['forecast_age_days'] / FORECAST_HALF_LIFE_DAYS)
+    forecast_confidence = forecast_confidence.where(signals['forecast_age_days'] <= MAX_SIGNAL_AGE_DAYS)
+
+    sentiment_return = prior + SENTIMENT_RETURN_SPREAD * signals['sentiment_score']
+    count = signals['sentiment_count']
+    sentiment_confidence = signals['sentiment_confidence'] * count / (count + SENTIMENT_PRIOR_COUNT)
+    sentiment_confidence = sentiment_confidence.where(signals['sentiment_age_days'] <= MAX_SIGNAL_AGE_DAYS)
+
+    views = pd.concat([
+        pd.DataFrame({'source': 'forecast', 'view_return': forecast_return, 'confidence': forecast_confidence}),
+        pd.DataFrame({'source': 'sentiment', 'view_return': sentiment_return, 'confidence': sentiment_confidence})
+    ]).rename_axis('ticker').reset_index()
+
+    views = views[views['view_return'].notna() & (views['confidence'] >= MIN_VIEW_CONFIDENCE)]
+    views['confidence'] = views['confidence'].clip(upper=MAX_VIEW_CONFIDENCE)
+    return views.reset_index(drop=True)
+
+
+def posterior_returns(prior: np.ndarray,
+                      cov: np.ndarray,
+                      view_assets: np.ndarray,
+                      view_returns: np.ndarray,
+                      view_confidences: np.ndarray,
+                      tau: float = BL_TAU) -> np.ndarray:
+    """
+    Closed-form Black-Litterman posterior mean for absolute views
+
+    mu = pi + tau S P' (tau P S P' + Omega)^-1 (Q - P pi), where P picks one
+    asset per view, so P S P' and S P' are plain index slices of S. View
+    variances follow the confidence c of each view:
+    omega = tau * sigma_ii^2 * (1 - c) / c, which puts a view with c = 0.5 on
+    equal footing with the prior.
+
+    Args:
+        prior: Prior returns pi (N,)
+        cov: Return covariance S (N x N)
+        view_assets: Asset index of each view (K,)
+        view_returns: View returns Q (K,)
+        view_confidences: Confidence of each view in (0, 1) (K,)
+        tau: Prior uncertainty scale
+
+    Returns:
+        Posterior expected returns (N,)
+    """
+    if len(view_assets) == 0:
+        return np.asarray(prior, dtype=float).copy()
+
+    view_assets = np.asarray(view_assets, dtype=int)
+    confidences = np.asarray(view_confidences, dtype=float)
+    prior_cov = tau * cov
+    omega = prior_cov[view_assets, view_assets] * (1.0 - confidences) / confidences
+
+    view_cov = prior_cov[np.ix_(view_assets, view_assets)] + np.diag(omega)
+    surprise = np.asarray(view_returns, dtype=float) - prior[view_assets]
+    return prior + prior_cov[:, view_assets] @ np.linalg.solve(view_cov, surprise)
+
+
+def black_litterman_returns(cov: pd.DataFrame,
+                            signals: pd.DataFrame,
+                            risk_free_rate: float = 0.0,
+                            tau: float = BL_TAU,
+                            risk_aversion: float = BL_RISK_AVERSION) -> Tuple[pd.Series, Dict]:
+    """
+    Posterior expected returns for the tickers of cov
+
+    Returns:
+        (posterior Series, summary dict with the prior and the views used)
+    """
+    tickers = cov.index.tolist()
+    cov_values = cov.to_numpy(dtype=np.float64)
+    prior = pd.Series(equilibrium_prior(cov_values, risk_aversion=risk_aversion, risk_free_rate=risk_free_rate),
+                      index=tickers)
+
+    views = build_views(prior, signals, pd.Series(np.diag(cov_values), index=tickers), tau)
+    view_assets = prior.index.get_indexer(views['ticker'])
+    posterior = posterior_returns(
+        prior.to_numpy(), cov_values, view_assets,
+        views['view_return'].to_numpy(), views['confidence'].to_numpy(), tau
+    )
+    logger.info(f"Black-Litterman posterior from {len(views)} views on {views['ticker'].nunique()} of {len(tickers)} tickers")
+
+    summary = {
+        'tau': tau,
+        'risk_aversion': risk_aversion,
+        'view_count': int(len(views)),
+        'views': [
+            {'ticker': row.ticker, 'source': row.source,
+             'view_return': float(row.view_return), 'confidence': float(row.confidence)}
+            for row in views.itertuples(index=False)
+        ],
+        'prior': {t: float(v) for t, v in prior.items()}
+    }
+    return pd.Series(posterior, index=tickers), summary
+
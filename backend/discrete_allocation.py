@@ -0,0 +1,242 @@
+"""
+Discrete Share Allocation
+Converts continuous portfolio weights into whole-share positions
+"""
+
+import numpy as np
+import pandas as pd
+import cvxpy as cp
+from typing import Dict, Optional, Tuple
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+ALLOCATION_METHODS = ('greedy', 'lp')
+DEFAULT_ALLOCATION_METHOD = 'greedy'
+
+# Wall-clock budget for the opt-in integer program (seconds)
+LP_TIME_LIMIT_SECONDS = float(os.environ.get('DISCRETE_ALLOCATION_LP_TIME_LIMIT', 5))
+# Mixed-integer solvers in order of preference, each with the keyword arguments
+# that apply its time limit. Newer cvxpy releases expose HiGHS directly; older
+# releases (the pinned 1.3) reach it through SCIPY, i.e. scipy's HiGHS linprog.
+_MIP_SOLVER_TIME_LIMITS = {
+    'HIGHS': lambda seconds: {'time_limit': seconds},
+    'SCIPY': lambda seconds: {'scipy_options': {'time_limit': seconds}},
+    'SCIP': lambda seconds: {'scip_params': {'limits/time': seconds}},
+    'CBC': lambda seconds: {'maximumSeconds': int(math.ceil(seconds))},
+}
+MIP_SOLVER = next((name for name in _MIP_SOLVER_TIME_LIMITS if name in cp.installed_solvers()), None)
+
+
+def largest_remainder_shares(weights: np.ndarray, prices: np.ndarray, budget: float) -> Tuple[np.ndarray, float]:
+    """
+    Long-only whole-share allocation by largest-remainder rounding
+
+    Every asset first gets floor(w * budget / price) shares. Leftover cash then
+    buys one extra share per asset, visiting assets in order of their
+    fractional share remainder and skipping any that are no longer affordable.
+    One sort dominates, so the cost is O(n log n).
+
+    Args:
+        weights: Non-negative weights summing to 1 (n,)
+        prices: Latest share prices (n,)
+        budget: Cash to invest
+
+    Returns:
+        (shares, leftover_cash)
+    """
+    exact_shares = weights * budget / prices
+    shares = np.floor(exact_shares)
+    leftover = budget - float(shares @ prices)
+
+    fractional = exact_shares - shares
+    order = np.argsort(-fractional, kind='stable')
+    order = order[fractional[order] > 0]
+
+    # Candidates are visited in priority order; the vectorized prefix handles
+    # the common case where the first few extras are all affordable
+    affordable = np.cumsum(prices[order]) <= leftover
+    n_prefix = int(np.argmin(affordable)) if not affordable.all() else len(order)
+    prefix = order[:n_prefix]
+    shares[prefix] += 1
+    leftover -= float(prices[prefix].sum())
+
+    cheapest_remaining = prices[order[n_prefix:]].min() if n_prefix < len(order) else np.inf
+    if leftover >= cheapest_remaining:
+        for idx in order[n_prefix:]:
+            if prices[idx] <= leftover:
+                shares[idx] += 1
+                leftover -= prices[idx]
+
+    return shares.astype(np.int64), leftover
+
+
+def lp_shares(weights: np.ndarray,
+              prices: np.ndarray,
+              budget: float,
+              time_limit: float = LP_TIME_LIMIT_SECONDS,
+              initial_shares: Optional[np.ndarray] = None) -> Optional[Tuple[np.ndarray, float]]:
+    """
+    Long-only allocation minimizing absolute value deviation plus leftover cash
+
+    Same integer program as pypfopt's lp_portfolio, solved under a time limit.
+    Without a mixed-integer solver that honours a time limit, it is skipped.
+
+    Returns:
+        (shares, leftover_cash), or None if no integer solution was found in time
+    """
+    if MIP_SOLVER is None:
+        logger.warning("No time-limited mixed-integer solver installed; skipping integer allocation")
+        return None
+
+    n_assets = len(prices)
+    x = cp.Variable(n_assets, integer=True)
+    deviation = cp.Variable(n_assets)
+    leftover = budget - prices @ x
+    target_values = weights * budget
+
+    constraints = [
+        target_values - cp.multiply(x, prices) <= deviation,
+        target_values - cp.multiply(x, prices) >= -deviation,
+        leftover >= 0,
+        x >= 0
+    ]
+    problem = cp.Problem(cp.Minimize(cp.sum(deviation) + leftover), constraints)
+
+    if initial_shares is not None:
+        x.value = initial_shares.astype(float)
+
+    try:
+        problem.solve(solver=MIP_SOLVER, warm_start=initial_shares is not None,
+                      **_MIP_SOLVER_TIME_LIMITS[MIP_SOLVER](float(time_limit)))
+    except cp.error.SolverError as e:
+        logger.warning(f"Integer allocation solve failed: {e}")
+        return None
+
+    if x.value is None:
+        logger.warning(f"Integer allocation returned no solution (status: {problem.status})")
+        return None
+
+    shares = np.maximum(np.rint(x.value), 0).astype(np.int64)
+    return shares, budget - float(shares @ prices)
+
+
+def _allocate_long(weights: np.ndarray,
+                   prices: np.ndarray,
+                   budget: float,
+                   method: str,
+                   time_limit: float) -> Tuple[np.ndarray, float, str]:
+    """Allocate one long-only book; returns (shares, leftover, method actually used)"""
+    shares, leftover = largest_remainder_shares(weights, prices, budget)
+    if method != 'lp':
+        return shares, leftover, 'greedy'
+
+    refined = lp_shares(weights, prices, budget, time_limit=time_limit, initial_shares=shares)
+    if refined is None:
+        return shares, leftover, 'greedy'
+
+    # Keep the LP only if it actually improves the LP objective
+    def deviation(candidate_shares, candidate_leftover):
+        return np.abs(weights * budget - candidate_shares * prices).sum() + candidate_leftover
+
+    if deviation(*refined) <= deviation(shares, leftover):
+        return refined[0], refined[1], 'lp'
+    return shares, leftover, 'greedy'
+
+
+def allocation_tracking_error(weights: pd.Series,
+                              shares: pd.Series,
+                              prices: pd.Series,
+                              portfolio_value: float,
+                              cov_matrix: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Compare the realized share weights with the continuous target weights
+
+    Realized weights are share values over portfolio_value, so leftover cash
+    counts as an uninvested (zero weight) position.
+
+    Returns:
+        Dict with weight_rmse, max_weight_deviation and, when cov_matrix is
+        given, the annualized ex-ante tracking_error sqrt(d' S d)
+    """
+    realized = (shares * prices / portfolio_value).reindex(weights.index).fillna(0.0)
+    diff = realized - weights
+
+    metrics = {
+        'weight_rmse': float(np.sqrt(np.mean(diff.values ** 2))),
+        'max_weight_deviation': float(np.abs(diff.values).max()) if len(diff) else 0.0,
+        'tracking_error': None
+    }
+    if cov_matrix is not None:
+        common = [t for t in diff.index if t in cov_matrix.index]
+        d = diff.reindex(common).values
+        variance = float(d @ cov_matrix.loc[common, common].values @ d)
+        metrics['tracking_error'] = float(np.sqrt(max(variance, 0.0)))
+    return metrics
+
+
+def allocate_shares(weights: Dict[str, float],
+                    latest_prices: pd.Series,
+                    portfolio_value: float,
+                    short_ratio: Optional[float] = None,
+                    method: str = DEFAULT_ALLOCATION_METHOD,
+                    time_limit: float = LP_TIME_LIMIT_SECONDS) -> Tuple[Dict[str, int], float, str]:
+    """
+    Convert continuous weights into whole shares
+
+    Long and short books are allocated separately as in pypfopt: the long book
+    gets portfolio_value and the short book portfolio_value * short_ratio
+    (short_ratio defaults to the total short weight).
+
+    Args:
+        weights: {ticker: weight}
+        latest_prices: Latest prices indexed by ticker
+        portfolio_value: Total value to allocate
+        short_ratio: Short book size as a fraction of portfolio_value
+        method: 'greedy' (largest remainder) or 'lp' (greedy refined by a time-limited integer program)
+        time_limit: LP time limit in seconds
+
+    Returns:
+        (shares per ticker without zero positions, leftover cash, method used)
+    """
+    if method not in ALLOCATION_METHODS:
+        raise ValueError(f"Unknown allocation method: {method}. Expected one of {ALLOCATION_METHODS}")
+    if short_ratio is not None and short_ratio < 0:
+        raise ValueError("short_ratio must be non-negative")
+
+    w = pd.Series(weights, dtype=float)
+    prices = latest_prices.reindex(w.index).astype(float)
+    if prices.isna().any() or (prices <= 0).any():
+        raise ValueError("Latest prices must be positive for every weighted ticker")
+
+    longs = w[w > 0]
+    shorts = -w[w < 0]
+    if short_ratio is None:
+        short_ratio = float(shorts.sum())
+
+    books = [(longs, portfolio_value, 1)]
+    if not shorts.empty:
+        books.append((shorts, portfolio_value * short_ratio, -1))
+
+    allocation = {}
+    leftover_total = 0.0
+    methods_used = set()
+
+    for book, budget, sign in books:
+        if book.empty or book.sum() <= 0 or budget <= 0:
+            leftover_total += max(budget, 0.0)
+            continue
+        normalized = (book / book.sum()).values
+        shares, leftover, used = _allocate_long(
+            normalized, prices[book.index].values, budget, method, time_limit
+        )
+        methods_used.add(used)
+        leftover_total += leftover
+        for ticker, n_shares in zip(book.index, shares):
+            if n_shares != 0:
+                allocation[ticker] = sign * int(n_shares)
+
+    method_used = 'lp' if methods_used == {'lp'} else ('mixed' if len(methods_used) > 1 else 'greedy')
+    return allocation, leftover_total, method_used
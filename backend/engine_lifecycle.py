@@ -0,0 +1,157 @@
+"""
+Engine Lifecycle
+Locked lazy construction of shared engines (models, forecasters, compiled
+inference functions) and thread-safe Keras inference
+
+Concurrency model
+-----------------
+Flask's threaded server and gunicorn's gthread workers serve requests from
+many threads of one process; each process builds its own engines.
+
+* Construction: LazyEngine builds an engine at most once per process. The
+  first callers wait on its lock while one of them builds, so a burst of
+  first requests loads TensorFlow and the weights once instead of once per
+  thread.
+* Keras inference: model.predict is not meant for concurrent callers (it
+  builds its predict function lazily, unguarded, and a tf.data pipeline per
+  call, which also costs milliseconds on single-window batches).
+  KerasInference traces the forward pass once into a concrete function whose
+  batch and time dimensions are free. A concrete function is reentrant, so
+  every request thread calls the same one and TensorFlow runs the calls in
+  parallel outside the GIL; per-thread copies would only duplicate graphs.
+  KERAS_INFERENCE_MODE=serialized runs one forward pass at a time instead
+  (e.g. to bound peak memory on small hosts).
+* TFLite: an interpreter is not reentrant; LiteLSTM locks per interpreter.
+* XGBoost: Booster.inplace_predict is thread-safe.
+* Hot swap: model_registry.ModelSlot rebinds the served instance; threads
+  already holding the old instance finish their request with it.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+INFERENCE_MODES = ('concurrent', 'serialized')
+KERAS_INFERENCE_MODE = os.environ.get('KERAS_INFERENCE_MODE', 'concurrent')
+
+
+class LazyEngine(Generic[T]):
+    """
+    An object built on first use, exactly once, however many threads ask
+
+    A failed build is not cached: the exception reaches the caller that
+    triggered it and the next get() tries again.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        self._factory = factory
+        self.name = name or getattr(factory, '__name__', 'engine')
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.constructions = 0
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                # Double-checked: another thread may have built it while we waited
+                if self._instance is None:
+                    logger.info(f"Building {self.name}")
+                    self._instance = self._factory()
+                    self.constructions += 1
+                instance = self._instance
+        return instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def reset(self) -> None:
+        """Drop the instance; the next get() builds a new one"""
+        with self._lock:
+            self._instance = None
+
+
+class DerivedModelCache(Generic[T]):
+    """
+    Objects derived from models (compiled functions, MC dropout twins), for
+    the few models in recent use
+
+    Entries are keyed by model identity and hold the model itself, so an id
+    reused after garbage collection never returns a stale entry. Builds run
+    outside the lock; if two threads race on the same model, the first
+    stored result wins.
+    """
+
+    def __init__(self, build: Callable[[Any], T], max_entries: int):
+        self._build = build
+        self.max_entries = max(1, int(max_entries))
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, model) -> Optional[T]:
+        entry = self._entries.get(id(model))
+        if entry is not None and entry[0] is model:
+            self._entries.move_to_end(id(model))
+            return entry[1]
+        return None
+
+    def get(self, model) -> T:
+        with self._lock:
+            derived = self._lookup(model)
+        if derived is not None:
+            return derived
+
+        built = self._build(model)
+        with self._lock:
+            derived = self._lookup(model)
+            if derived is None:
+                derived = built
+                self._entries[id(model)] = (model, built)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return derived
+
+
+class KerasInference:
+    """
+    Thread-safe forward pass of a Keras model (see the concurrency model above)
+
+    Call it like model.predict_on_batch: (N, T, features) in, numpy out.
+    Tracing happens on the first call, once, under a LazyEngine lock.
+    """
+
+    def __init__(self, model, mode: str = KERAS_INFERENCE_MODE):
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{mode}'. Use one of {INFERENCE_MODES}")
+        self.model = model
+        self.mode = mode
+        self._function = LazyEngine(self._trace, name=f"{model.name} forward pass")
+        self._lock = threading.Lock()
+
+    def _trace(self) -> Callable[[np.ndarray], np.ndarray]:
+        import tensorflow as tf
+
+        spec = tf.TensorSpec([None, None] + list(self.model.input_shape[2:]), tf.float32)
+        forward = tf.function(lambda x: self.model(x, training=False)).get_concrete_function(spec)
+        return lambda inputs: forward(tf.constant(inputs, dtype=tf.float32)).numpy()
+
+    def __call__(self, inputs: np.ndarray) -> np.ndarray:
+        function = self._function.get()
+        inputs = np.asarray(inputs, dtype=np.float32)
+        if self.mode == 'serialized':
+            with self._lock:
+                return function(inputs)
+        return function(inputs)
+
+    def predict(self, inputs: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """model.predict-compatible alias"""
+        return self(inputs)
@@ -0,0 +1,208 @@
+"""
+Vectorized Expected Return and Covariance Estimators
+Computes every supported estimator from one shared log-return matrix
+"""
+
+import numpy as np
+import pandas as pd
+from functools import cached_property
+from typing import List
+import logging
+
+from factor_risk import FactorRiskModel, DEFAULT_FACTOR_COUNT
+
+logger = logging.getLogger(__name__)
+
+EXPECTED_RETURNS_METHODS = ('mean', 'capm', 'ema', 'black_litterman')
+COVARIANCE_METHODS = ('ledoit_wolf', 'sample_cov', 'exp_cov', 'oracle_approximating', 'factor_model')
+
+
+def ewm_weights(n_obs: int, span: float) -> np.ndarray:
+    """
+    Normalized exponential weights matching pandas ewm(span=span, adjust=True)
+
+    Args:
+        n_obs: Number of observations (oldest first)
+        span: EWM span
+
+    Returns:
+        Weights of shape (n_obs,) summing to 1, newest observation weighted most
+    """
+    alpha = 2.0 / (span + 1.0)
+    weights = (1.0 - alpha) ** np.arange(n_obs - 1, -1, -1, dtype=np.float64)
+    return weights / weights.sum()
+
+
+def fix_nonpositive_semidefinite(matrix: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues (spectral fix) if matrix is not positive semidefinite"""
+    try:
+        np.linalg.cholesky(matrix + 1e-16 * np.eye(len(matrix)))
+        return matrix
+    except np.linalg.LinAlgError:
+        logger.warning("Covariance matrix is not positive semidefinite. Applying spectral fix.")
+        eigvals, eigvecs = np.linalg.eigh(matrix)
+        eigvals = np.where(eigvals > 0, eigvals, 0)
+        return (eigvecs * eigvals) @ eigvecs.T
+
+
+def ledoit_wolf_shrinkage(gram: np.ndarray, squared_gram_sum: float, n_obs: int) -> float:
+    """
+    Ledoit-Wolf shrinkage intensity towards a scaled identity target
+
+    Args:
+        gram: X'X of the demeaned returns (N x N)
+        squared_gram_sum: Sum of the entries of (X**2)'(X**2)
+        n_obs: Number of return observations T
+
+    Returns:
+        Shrinkage coefficient in [0, 1] (same definition as sklearn)
+    """
+    n_features = gram.shape[0]
+    emp_cov_trace = np.diag(gram) / n_obs
+    mu = emp_cov_trace.sum() / n_features
+    delta_ = np.sum(gram ** 2) / n_obs ** 2
+    beta = (squared_gram_sum / n_obs - delta_) / (n_features * n_obs)
+    delta = (delta_ - 2.0 * mu * emp_cov_trace.sum() + n_features * mu ** 2) / n_features
+    beta = min(beta, delta)
+    return 0.0 if beta == 0 else float(beta / delta)
+
+
+def shrink_to_identity(emp_cov: np.ndarray, shrinkage: float) -> np.ndarray:
+    """Blend the empirical covariance with trace(S)/N * I"""
+    mu = np.trace(emp_cov) / emp_cov.shape[0]
+    shrunk = (1.0 - shrinkage) * emp_cov
+    shrunk.flat[::emp_cov.shape[0] + 1] += shrinkage * mu
+    return shrunk
+
+
+class ReturnMoments:
+    """
+    Shared return statistics for one price window
+
+    Log returns are computed once from the price matrix; simple returns, the
+    demeaned returns and their Gram matrix are derived lazily and reused by
+    every estimator, so switching method never re-reads the prices.
+    """
+
+    def __init__(self, prices: pd.DataFrame, frequency: int = 252):
+        """
+        Args:
+            prices: Price DataFrame (dates x tickers), forward-filled
+            frequency: Periods per year used for annualization
+        """
+        if prices is None or prices.shape[0] < 2:
+            raise ValueError("Need at least 2 price rows to compute returns")
+
+        self.tickers: List[str] = prices.columns.tolist()
+        self.index = prices.index[1:]
+        self.frequency = frequency
+
+        log_prices = np.log(prices.to_numpy(dtype=np.float64))
+        self.log_returns = np.nan_to_num(np.diff(log_prices, axis=0))
+        self.n_obs, self.n_assets = self.log_returns.shape
+
+    @cached_property
+    def simple_returns(self) -> np.ndarray:
+        return np.expm1(self.log_returns)
+
+    @cached_property
+    def demeaned(self) -> np.ndarray:
+        returns = self.simple_returns
+        return returns - returns.mean(axis=0)
+
+    @cached_property
+    def gram(self) -> np.ndarray:
+        return self.demeaned.T @ self.demeaned
+
+    @cached_property
+    def squared_gram_sum(self) -> float:
+        # Sum of all entries of (X**2)'(X**2) collapses to sum_t (sum_i X_ti**2)**2
+        row_energy = np.einsum('ti,ti->t', self.demeaned, self.demeaned)
+        return float(row_energy @ row_energy)
+
+    def _series(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.tickers)
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=self.tickers, columns=self.tickers)
+
+    # --- Expected returns ---
+
+    def mean_return(self) -> pd.Series:
+        """Annualized geometric mean (CAGR) of returns"""
+        return self._series(np.expm1(self.log_returns.mean(axis=0) * self.frequency))
+
+    def ema_return(self, span: int = 500) -> pd.Series:
+        """Annualized exponentially-weighted mean of simple returns"""
+        weights = ewm_weights(self.n_obs, span)
+        return self._series((1.0 + weights @ self.simple_returns) ** self.frequency - 1.0)
+
+    def capm_return(self, risk_free_rate: float = 0.0) -> pd.Series:
+        """CAPM returns against the equally-weighted universe as market proxy"""
+        # Market return demeaned is the row mean of demeaned returns, so betas
+        # come straight from the Gram matrix
+        betas = self.gram.mean(axis=1) / self.gram.mean()
+        market = self.simple_returns.mean(axis=1)
+        market_return = np.expm1(np.log1p(market).sum() * self.frequency / self.n_obs)
+        return self._series(risk_free_rate + betas * (market_return - risk_free_rate))
+
+    def expected_returns(self, method: str = 'mean', **kwargs) -> pd.Series:
+        """Dispatch to an expected return estimator by name"""
+        if method == 'capm':
+            return self.capm_return(risk_free_rate=kwargs.get('risk_free_rate', 0.0))
+        if method == 'ema':
+            return self.ema_return(span=kwargs.get('span', 500))
+        if method == 'mean':
+            return self.mean_return()
+        raise ValueError(f"Unknown expected returns method: {method}")
+
+    # --- Covariance ---
+
+    def sample_cov(self) -> pd.DataFrame:
+        """Annualized sample covariance"""
+        cov = self.gram / (self.n_obs - 1) * self.frequency
+        return self._frame(fix_nonpositive_semidefinite(cov))
+
+    def exp_cov(self, span: int = 180) -> pd.DataFrame:
+        """Annualized exponentially-weighted covariance"""
+        weights = ewm_weights(self.n_obs, span)
+        cov = (self.demeaned * weights[:, None]).T @ self.demeaned * self.frequency
+        return self._frame(fix_nonpositive_semidefinite(cov))
+
+    def ledoit_wolf(self) -> pd.DataFrame:
+        """Annualized Ledoit-Wolf covariance shrunk towards constant variance"""
+        shrinkage = ledoit_wolf_shrinkage(self.gram, self.squared_gram_sum, self.n_obs)
+        cov = shrink_to_identity(self.gram / self.n_obs, shrinkage) * self.frequency
+        return self._frame(fix_nonpositive_semidefinite(cov))
+
+    def oracle_approximating(self) -> pd.DataFrame:
+        """Annualized Oracle Approximating Shrinkage covariance"""
+        emp_cov = self.gram / self.n_obs
+        n_features = self.n_assets
+        alpha = np.mean(emp_cov ** 2)
+        mu_squared = (np.trace(emp_cov) / n_features) ** 2
+        num = alpha + mu_squared
+        den = (self.n_obs + 1) * (alpha - mu_squared / n_features)
+        shrinkage = 1.0 if den == 0 else min(num / den, 1.0)
+        cov = shrink_to_identity(emp_cov, shrinkage) * self.frequency
+        return self._frame(fix_nonpositive_semidefinite(cov))
+
+    def factor_model(self, n_factors: int = DEFAULT_FACTOR_COUNT) -> FactorRiskModel:
+        """Statistical (PCA) factor risk model fitted from the shared Gram matrix"""
+        return FactorRiskModel.from_gram(
+            self.tickers, self.gram, self.n_obs, n_factors=n_factors, frequency=self.frequency
+        )
+
+    def covariance(self, method: str = 'ledoit_wolf', **kwargs) -> pd.DataFrame:
+        """Dispatch to a covariance estimator by name"""
+        if method == 'factor_model':
+            return self.factor_model(n_factors=kwargs.get('n_factors', DEFAULT_FACTOR_COUNT)).covariance()
+        if method == 'ledoit_wolf':
+            return self.ledoit_wolf()
+        if method == 'oracle_approximating':
+            return self.oracle_approximating()
+        if method == 'exp_cov':
+            return self.exp_cov(span=kwargs.get('span', 180))
+        if method == 'sample_cov':
+            return self.sample_cov()
+        raise ValueError(f"Unknown covariance method: {method}")
@@ -0,0 +1,82 @@
+"""
+Export the LSTM Price Model to TFLite for CPU Serving
+Run: python export_lightweight.py [--model models/sp500_lstm_model.h5] [--lookbacks 30 60 120] [--skip-parity]
+
+Writes one fixed-shape artifact per lookback next to the model (models/<name>.lite/),
+then checks numerical parity against the Keras model (batch sizes 1 and 32)
+and times both runtimes. Exits non-zero if any lookback exceeds the parity
+tolerance. Serve the artifacts with PRICE_MODEL_RUNTIME=tflite.
+"""
+
+import argparse
+import sys
+import time
+
+import joblib
+import numpy as np
+from tensorflow import keras
+
+from lite_runtime import LITE_LOOKBACKS, PARITY_ATOL, LiteLSTM, check_parity, export_tflite
+from model_metadata import read_model_metadata
+from windowing import WindowNormalizer
+
+MODEL_PATH = 'models/sp500_lstm_model.h5'
+SCALER_PATH = 'models/scaler.joblib'
+
+
+def time_predict(predict, inputs: np.ndarray, repeats: int = 20) -> float:
+    """Median seconds per call after one warmup call"""
+    predict(inputs)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(inputs)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the LSTM price model to TFLite')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--scaler', default=SCALER_PATH)
+    parser.add_argument('--lookbacks', type=int, nargs='+', default=list(LITE_LOOKBACKS))
+    parser.add_argument('--atol', type=float, default=PARITY_ATOL)
+    parser.add_argument('--skip-parity', action='store_true')
+    args = parser.parse_args()
+
+    model = keras.models.load_model(args.model, compile=False)
+    print(f"Exporting {args.model} for {len(args.lookbacks)} lookbacks...")
+    paths = export_tflite(model, args.model, args.lookbacks)
+    print(f"✅ Wrote {len(paths)} artifacts to {LiteLSTM(args.model).directory}")
+
+    if args.skip_parity:
+        sys.exit(0)
+
+    metadata = read_model_metadata(args.model)
+    if metadata['normalization'] == 'window_relative':
+        normalizer = WindowNormalizer('window_relative')
+    else:
+        normalizer = WindowNormalizer.from_scaler(joblib.load(args.scaler))
+
+    lite_model = LiteLSTM(args.model)
+    rows = check_parity(model, lite_model, normalizer, args.lookbacks, atol=args.atol)
+
+    print("=" * 44)
+    print("KERAS vs TFLITE PARITY")
+    print("=" * 44)
+    print(f"{'lookback':>8} {'batch':>6} {'max abs error':>15} {'ok':>6}")
+    for row in rows:
+        print(f"{row['lookback']:>8} {row['batch']:>6} {row['max_abs_error']:>15.2e} {str(row['ok']):>6}")
+    print("=" * 44)
+
+    inputs = np.random.default_rng(0).normal(0, 0.05, size=(1, args.lookbacks[0], 1)).astype(np.float32)
+    keras_s = time_predict(lambda x: model.predict(x, verbose=0), inputs)
+    lite_s = time_predict(lite_model.predict, inputs)
+    print(f"Single-window latency (lookback {args.lookbacks[0]}): "
+          f"keras {keras_s * 1000:.2f} ms, tflite {lite_s * 1000:.2f} ms")
+
+    failed = [row for row in rows if not row['ok']]
+    if failed:
+        print(f"❌ {len(failed)} cases exceed atol={args.atol:g}")
+        sys.exit(1)
+    print(f"✅ All {len(rows)} cases within atol={args.atol:g}")
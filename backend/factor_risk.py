@@ -0,0 +1,192 @@
+"""
+Statistical Factor Risk Model
+PCA factors plus diagonal idiosyncratic risk, with sparse portfolio optimization
+"""
+
+import numpy as np
+import pandas as pd
+import cvxpy as cp
+import scipy.sparse as sp
+from typing import List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FACTOR_COUNT = 10
+MIN_SPECIFIC_VARIANCE = 1e-8
+SOLVED_STATUSES = (cp.OPTIMAL, cp.OPTIMAL_INACCURATE)
+# Interior-point solver copes better than OSQP with the homogenized max_sharpe form
+DEFAULT_SOLVER = cp.CLARABEL if cp.CLARABEL in cp.installed_solvers() else None
+
+
+class FactorRiskModel:
+    """
+    Covariance of the form B diag(f) B' + diag(d)
+
+    B holds the N x K factor loadings, f the K factor variances and d the N
+    idiosyncratic variances (all annualized). Portfolio variance is
+    ||sqrt(f) * B'w||^2 + ||sqrt(d) * w||^2, which keeps solver problems at
+    O(N*K) non-zeros instead of the O(N^2) of a dense quadratic form.
+    """
+
+    def __init__(self,
+                 tickers: Sequence[str],
+                 loadings: np.ndarray,
+                 factor_variances: np.ndarray,
+                 specific_variances: np.ndarray):
+        self.tickers: List[str] = list(tickers)
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.factor_variances = np.asarray(factor_variances, dtype=float)
+        self.specific_variances = np.maximum(np.asarray(specific_variances, dtype=float), MIN_SPECIFIC_VARIANCE)
+
+    @classmethod
+    def from_gram(cls,
+                  tickers: Sequence[str],
+                  gram: np.ndarray,
+                  n_obs: int,
+                  n_factors: int = DEFAULT_FACTOR_COUNT,
+                  frequency: int = 252) -> 'FactorRiskModel':
+        """
+        Fit K principal-component factors from the Gram matrix of demeaned returns
+
+        Args:
+            tickers: Ticker names in Gram order
+            gram: X'X of the demeaned returns (N x N)
+            n_obs: Number of return observations T
+            n_factors: Number of factors K (clipped to N - 1)
+            frequency: Periods per year used for annualization
+        """
+        sample_cov = gram / (n_obs - 1) * frequency
+        n_assets = sample_cov.shape[0]
+        n_factors = max(1, min(int(n_factors), n_assets - 1))
+
+        eigvals, eigvecs = np.linalg.eigh(sample_cov)
+        top = np.argsort(eigvals)[::-1][:n_factors]
+        factor_variances = np.clip(eigvals[top], 0, None)
+        loadings = eigvecs[:, top]
+
+        explained = (loadings ** 2) @ factor_variances
+        specific_variances = np.diag(sample_cov) - explained
+
+        logger.info(f"Factor model: {n_factors} factors explain "
+                    f"{factor_variances.sum() / max(np.trace(sample_cov), 1e-12):.1%} of total variance")
+        return cls(tickers, loadings, factor_variances, specific_variances)
+
+    @property
+    def n_factors(self) -> int:
+        return self.loadings.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.loadings.nbytes + self.factor_variances.nbytes + self.specific_variances.nbytes
+
+    def subset(self, tickers: Sequence[str]) -> 'FactorRiskModel':
+        """Restrict the model to a subset of tickers"""
+        positions = [self.tickers.index(t) for t in tickers]
+        return FactorRiskModel(
+            tickers,
+            self.loadings[positions],
+            self.factor_variances,
+            self.specific_variances[positions]
+        )
+
+    def covariance(self) -> pd.DataFrame:
+        """Dense N x N covariance (for reporting; solvers should use risk_factor)"""
+        cov = (self.loadings * self.factor_variances) @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.specific_variances
+        return pd.DataFrame(cov, index=self.tickers, columns=self.tickers)
+
+    def risk_factor(self) -> sp.csr_matrix:
+        """Sparse (K + N) x N matrix R with R'R equal to the model covariance"""
+        factor_block = sp.csr_matrix(np.sqrt(self.factor_variances)[:, None] * self.loadings.T)
+        specific_block = sp.diags(np.sqrt(self.specific_variances), format='csr')
+        return sp.vstack([factor_block, specific_block], format='csr')
+
+    def portfolio_volatility(self, weights: np.ndarray) -> float:
+        exposures = self.loadings.T @ weights
+        variance = exposures ** 2 @ self.factor_variances + weights ** 2 @ self.specific_variances
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+def solve_factor_objective(risk_model: FactorRiskModel,
+                           mu: np.ndarray,
+                           objective: str,
+                           weight_bounds: Tuple[float, float] = (0, 1),
+                           market_neutral: bool = False,
+                           gamma: float = 0.0,
+                           risk_free_rate: float = 0.02,
+                           target_risk: Optional[float] = None,
+                           target_return: Optional[float] = None,
+                           solver: Optional[str] = None) -> np.ndarray:
+    """
+    Solve a mean-variance objective with portfolio variance expressed through factor exposures
+
+    Args:
+        risk_model: Factor risk model aligned with mu
+        mu: Expected annual returns (N,)
+        objective: 'max_sharpe', 'min_volatility', 'efficient_risk' or 'efficient_return'
+        weight_bounds: (min, max) bound applied to every weight
+        market_neutral: Weights sum to 0 instead of 1
+        gamma: L2 regularization strength
+        risk_free_rate: Used by max_sharpe
+        target_risk: Annual volatility ceiling for efficient_risk
+        target_return: Annual return floor for efficient_return
+
+    Returns:
+        Optimal weights (N,)
+    """
+    mu = np.asarray(mu, dtype=float)
+    n_assets = len(mu)
+    lower, upper = weight_bounds
+    risk_factor = risk_model.risk_factor()
+    w = cp.Variable(n_assets)
+    budget = 0 if market_neutral else 1
+
+    if objective == 'max_sharpe':
+        if market_neutral:
+            raise ValueError("max_sharpe does not support market_neutral portfolios")
+        if np.max(mu) <= risk_free_rate:
+            raise ValueError("At least one asset must have an expected return exceeding the risk-free rate")
+        # Homogenized problem: w = y / kappa
+        kappa = cp.Variable(nonneg=True)
+        objective_expr = cp.sum_squares(risk_factor @ w)
+        if gamma > 0:
+            objective_expr = objective_expr + gamma * cp.sum_squares(w)
+        constraints = [
+            (mu - risk_free_rate) @ w == 1,
+            cp.sum(w) == kappa,
+            w >= lower * kappa,
+            w <= upper * kappa
+        ]
+        problem = cp.Problem(cp.Minimize(objective_expr), constraints)
+    else:
+        constraints = [cp.sum(w) == budget, w >= lower, w <= upper]
+        variance = cp.sum_squares(risk_factor @ w)
+        regularization = gamma * cp.sum_squares(w) if gamma > 0 else 0
+
+        if objective == 'min_volatility':
+            problem = cp.Problem(cp.Minimize(variance + regularization), constraints)
+        elif objective == 'efficient_return':
+            if target_return is None:
+                raise ValueError("target_return required")
+            problem = cp.Problem(cp.Minimize(variance + regularization), constraints + [mu @ w >= target_return])
+        elif objective == 'efficient_risk':
+            if target_risk is None:
+                raise ValueError("target_risk required")
+            constraints.append(cp.norm(risk_factor @ w, 2) <= target_risk)
+            problem = cp.Problem(cp.Maximize(mu @ w - regularization), constraints)
+        else:
+            raise ValueError(f"Unknown objective: {objective}")
+
+    try:
+        problem.solve(solver=solver or DEFAULT_SOLVER)
+    except cp.error.SolverError as e:
+        raise ValueError(f"Factor model solve failed: {e}")
+
+    if problem.status not in SOLVED_STATUSES or w.value is None:
+        raise ValueError(f"Factor model optimization is {problem.status} for objective {objective}")
+
+    weights = np.array(w.value)
+    if objective == 'max_sharpe':
+        weights = weights / kappa.value
+    return weights
@@ -0,0 +1,183 @@
+"""
+Efficient Frontier Sweep
+Traces the frontier with one parameterized cvxpy problem, warm-started point to point
+"""
+
+import numpy as np
+import cvxpy as cp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_CUTOFF = 1e-4
+SOLVED_STATUSES = (cp.OPTIMAL, cp.OPTIMAL_INACCURATE)
+
+
+def covariance_factor(cov: np.ndarray) -> np.ndarray:
+    """
+    Return F such that F'F = cov, so w'cov w = ||F w||^2
+
+    Uses Cholesky when possible and falls back to an eigen-decomposition for
+    singular (positive semidefinite) matrices.
+    """
+    try:
+        return np.linalg.cholesky(cov).T
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        return np.sqrt(np.clip(eigvals, 0, None))[:, None] * eigvecs.T
+
+
+class FrontierProblem:
+    """
+    Maximize return subject to a volatility ceiling
+
+    The target volatility is a cvxpy Parameter, so the problem is compiled once
+    and every subsequent solve reuses the canonicalization and warm-starts from
+    the previous solution.
+    """
+
+    def __init__(self,
+                 mu: np.ndarray,
+                 cov: np.ndarray,
+                 weight_bounds: Tuple[float, float] = (0, 1),
+                 market_neutral: bool = False,
+                 gamma: float = 0.0,
+                 solver: Optional[str] = None,
+                 risk_factor=None):
+        """
+        Args:
+            mu: Expected annual returns (N,)
+            cov: Annual covariance matrix (N x N); unused when risk_factor is given
+            weight_bounds: (min, max) bound applied to every weight
+            market_neutral: Weights sum to 0 instead of 1
+            gamma: L2 regularization strength
+            solver: Optional cvxpy solver name
+            risk_factor: Optional (dense or sparse) R with R'R = covariance, e.g. from a factor model
+        """
+        self.mu = np.asarray(mu, dtype=float)
+        self.solver = solver
+        n_assets = len(self.mu)
+
+        self.risk_factor = risk_factor if risk_factor is not None else covariance_factor(np.asarray(cov, dtype=float))
+        self.weights = cp.Variable(n_assets)
+        self.target_volatility = cp.Parameter(nonneg=True)
+
+        self.risk_exposures = self.risk_factor @ self.weights
+        self.volatility = cp.norm(self.risk_exposures, 2)
+
+        self.constraints = [
+            cp.sum(self.weights) == (0 if market_neutral else 1),
+            self.weights >= weight_bounds[0],
+            self.weights <= weight_bounds[1]
+        ]
+        objective = self.mu @ self.weights
+        if gamma > 0:
+            objective = objective - gamma * cp.sum_squares(self.weights)
+
+        self.problem = cp.Problem(
+            cp.Maximize(objective),
+            self.constraints + [self.volatility <= self.target_volatility]
+        )
+
+    def _solve(self, problem: cp.Problem) -> Optional[np.ndarray]:
+        try:
+            problem.solve(solver=self.solver, warm_start=True)
+        except cp.error.SolverError as e:
+            logger.warning(f"Frontier solve failed: {e}")
+            return None
+        if problem.status not in SOLVED_STATUSES or self.weights.value is None:
+            return None
+        return np.array(self.weights.value)
+
+    def solve(self, target_volatility: float) -> Optional[np.ndarray]:
+        """Solve for the max-return portfolio at a target volatility"""
+        self.target_volatility.value = max(float(target_volatility), 0.0)
+        return self._solve(self.problem)
+
+    def volatility_range(self) -> Tuple[float, float]:
+        """Volatility of the minimum-variance and maximum-return portfolios"""
+        min_var = self._solve(cp.Problem(cp.Minimize(cp.sum_squares(self.risk_exposures)), self.constraints))
+        max_ret = self._solve(cp.Problem(cp.Maximize(self.mu @ self.weights), self.constraints))
+        if min_var is None or max_ret is None:
+            raise ValueError("Could not bound the efficient frontier with the given constraints")
+        return self.portfolio_volatility(min_var), self.portfolio_volatility(max_ret)
+
+    def portfolio_volatility(self, weights: np.ndarray) -> float:
+        return float(np.linalg.norm(self.risk_factor @ weights))
+
+
+def _solve_frontier_chunk(args: Tuple) -> List[Optional[np.ndarray]]:
+    """Solve a contiguous run of targets with one warm-started problem (process pool entry point)"""
+    mu, cov, weight_bounds, market_neutral, gamma, solver, risk_factor, targets = args
+    problem = FrontierProblem(mu, cov, weight_bounds, market_neutral, gamma, solver, risk_factor)
+    return [problem.solve(target) for target in targets]
+
+
+def sweep_frontier(mu: np.ndarray,
+                   cov: np.ndarray,
+                   tickers: Sequence[str],
+                   n_points: int = 50,
+                   weight_bounds: Tuple[float, float] = (0, 1),
+                   market_neutral: bool = False,
+                   gamma: float = 0.0,
+                   risk_free_rate: float = 0.02,
+                   n_workers: int = 1,
+                   solver: Optional[str] = None,
+                   risk_factor=None) -> Dict:
+    """
+    Trace the efficient frontier over evenly spaced target volatilities
+
+    Args:
+        mu: Expected annual returns (N,)
+        cov: Annual covariance matrix (N x N)
+        tickers: Ticker names matching mu / cov order
+        n_points: Number of frontier points
+        weight_bounds: (min, max) bound applied to every weight
+        market_neutral: Weights sum to 0 instead of 1
+        gamma: L2 regularization strength
+        risk_free_rate: Used for the Sharpe ratio of each point
+        n_workers: Processes to spread contiguous runs of points over (1 = in-process)
+        solver: Optional cvxpy solver name
+        risk_factor: Optional R with R'R = covariance (e.g. sparse factor model form)
+
+    Returns:
+        Dictionary with the volatility range and a list of frontier points
+    """
+    mu = np.asarray(mu, dtype=float)
+
+    problem = FrontierProblem(mu, cov, weight_bounds, market_neutral, gamma, solver, risk_factor)
+    min_vol, max_vol = problem.volatility_range()
+    targets = np.linspace(min_vol, max_vol, n_points) if max_vol - min_vol > 1e-9 else np.array([min_vol])
+    logger.info(f"Sweeping {len(targets)} frontier points between {min_vol:.2%} and {max_vol:.2%} volatility")
+
+    n_workers = max(1, min(int(n_workers or 1), len(targets)))
+    if n_workers == 1:
+        solutions = [problem.solve(target) for target in targets]
+    else:
+        chunks = np.array_split(targets, n_workers)
+        jobs = [(mu, cov, weight_bounds, market_neutral, gamma, solver, problem.risk_factor, chunk) for chunk in chunks]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            solutions = [w for chunk_result in executor.map(_solve_frontier_chunk, jobs) for w in chunk_result]
+
+    points = []
+    for target, weights in zip(targets, solutions):
+        if weights is None:
+            logger.warning(f"No solution at target volatility {target:.4f}")
+            continue
+        expected_return = float(mu @ weights)
+        volatility = problem.portfolio_volatility(weights)
+        points.append({
+            'target_volatility': float(target),
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'sharpe_ratio': (expected_return - risk_free_rate) / volatility if volatility > 1e-9 else 0,
+            'weights': {t: float(w) for t, w in zip(tickers, weights) if abs(w) > WEIGHT_CUTOFF}
+        })
+
+    return {
+        'min_volatility': min_vol,
+        'max_volatility': max_vol,
+        'points': points
+    }
@@ -0,0 +1,193 @@
+"""
+Hierarchical Risk Parity
+Clustering (correlation, linkage, quasi-diagonal order) kept separate from the
+recursive bisection so the expensive part can be cached per universe and window
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as sch
+import scipy.spatial.distance as ssd
+
+logger = logging.getLogger(__name__)
+
+HRP_LINKAGE_METHOD = 'ward'
+# Opt-in: a window may reuse the tree of an earlier window of the same universe
+# that ended at most this many days before it (0 = exact windows only). The
+# tree changes slowly, and only the covariance is refreshed in between.
+HRP_CLUSTERING_REUSE_DAYS = int(os.environ.get('HRP_CLUSTERING_REUSE_DAYS', 0))
+# Recent windows remembered per universe for that reuse
+MAX_CLUSTERING_WINDOWS = 16
+
+
+class HRPClustering:
+    """
+    Correlation, linkage tree and quasi-diagonal leaf order of a return window
+
+    volatility holds the per-period (unannualized) standard deviations, so
+    together with corr it reproduces the sample covariance HRPOpt uses.
+    """
+
+    def __init__(self,
+                 tickers: List[str],
+                 corr: np.ndarray,
+                 volatility: np.ndarray,
+                 linkage: np.ndarray,
+                 order: np.ndarray):
+        self.tickers = list(tickers)
+        self.corr = corr
+        self.volatility = volatility
+        self.linkage = linkage
+        self.order = order
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.corr.nbytes + self.volatility.nbytes + self.linkage.nbytes + self.order.nbytes)
+
+    @property
+    def ordered_tickers(self) -> List[str]:
+        return [self.tickers[i] for i in self.order]
+
+    def covariance(self) -> np.ndarray:
+        """Per-period sample covariance rebuilt from corr and volatility"""
+        return self.corr * np.outer(self.volatility, self.volatility)
+
+    def correlation_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.corr, index=self.tickers, columns=self.tickers)
+
+
+def build_clustering(tickers: List[str],
+                     sample_cov: np.ndarray,
+                     linkage_method: str = HRP_LINKAGE_METHOD) -> HRPClustering:
+    """
+    Cluster assets on the correlation distance sqrt((1 - corr) / 2)
+
+    Args:
+        tickers: Asset names in sample_cov order
+        sample_cov: Per-period sample covariance of returns (N x N)
+        linkage_method: Any scipy linkage method (HRPOpt uses 'ward' here)
+
+    Returns:
+        HRPClustering for the window
+    """
+    if linkage_method not in sch._LINKAGE_METHODS:
+        raise ValueError("linkage_method must be one recognised by scipy")
+
+    volatility = np.sqrt(np.diag(sample_cov))
+    if np.any(volatility <= 0):
+        flat = [t for t, v in zip(tickers, volatility) if v <= 0]
+        raise ValueError(f"Zero return variance for: {', '.join(flat)}")
+
+    corr = sample_cov / np.outer(volatility, volatility)
+    distance = np.sqrt(np.clip((1.0 - corr) / 2.0, 0.0, 1.0))
+    linkage = sch.linkage(ssd.squareform(distance, checks=False), linkage_method)
+    # leaves_list is the same left-to-right pre-order HRPOpt takes from to_tree
+    order = sch.leaves_list(linkage)
+    return HRPClustering(tickers, corr, volatility, linkage, order)
+
+
+def clustering_window_key(index: pd.Index) -> Tuple[pd.Timestamp, pd.Timestamp, int]:
+    """Exact identity of a price window: first date, last date and row count"""
+    return pd.Timestamp(index[0]), pd.Timestamp(index[-1]), len(index)
+
+
+class ClusteringWindows:
+    """
+    Thread-safe record of the windows clustered per scope (universe, linkage)
+
+    Lets a window find an earlier one whose tree it may reuse. Only windows
+    ending on or before the requesting window's end qualify, so a backtest
+    step never sees a tree built from later prices.
+    """
+
+    def __init__(self, max_windows: int = MAX_CLUSTERING_WINDOWS):
+        self.max_windows = max_windows
+        self._windows: Dict[Hashable, List[Tuple]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, scope: Hashable, window: Tuple) -> None:
+        with self._lock:
+            windows = self._windows.setdefault(scope, [])
+            if window not in windows:
+                windows.append(window)
+                del windows[:-self.max_windows]
+
+    def reusable(self, scope: Hashable, window: Tuple, reuse_days: int) -> List[Tuple]:
+        """
+        Recorded windows whose tree window may reuse, latest end first
+
+        A candidate ends on or before window's end and at most reuse_days
+        before it, and starts within reuse_days of window's start.
+        """
+        start, end, _ = window
+        reuse = pd.Timedelta(days=reuse_days)
+        with self._lock:
+            candidates = [w for w in self._windows.get(scope, [])
+                          if end - reuse <= w[1] <= end and abs(w[0] - start) <= reuse]
+        return sorted(candidates, key=lambda w: w[1], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+# Windows with a cached clustering, shared by optimizer instances
+clustering_windows = ClusteringWindows()
+
+
+def recursive_bisection(cov: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    HRP weights by recursively halving the quasi-diagonal order
+
+    Each half gets capital in inverse proportion to the variance of its
+    inverse-variance portfolio. Only this step depends on the covariance.
+
+    Args:
+        cov: Covariance matrix (N x N), in the clustering's ticker order
+        order: Quasi-diagonal leaf order (N,)
+
+    Returns:
+        Weights (N,) in the covariance's ticker order
+    """
+    inverse_variance = 1.0 / np.diag(cov)
+
+    def cluster_variance(items: np.ndarray) -> float:
+        w = inverse_variance[items]
+        w = w / w.sum()
+        return float(w @ cov[np.ix_(items, items)] @ w)
+
+    weights = np.ones(len(order))
+    clusters = [np.asarray(order)]
+    while clusters:
+        halves = [half for items in clusters if len(items) > 1
+                  for half in (items[:len(items) // 2], items[len(items) // 2:])]
+        for first, second in zip(halves[::2], halves[1::2]):
+            first_variance = cluster_variance(first)
+            second_variance = cluster_variance(second)
+            alpha = 1 - first_variance / (first_variance + second_variance)
+            weights[first] *= alpha
+            weights[second] *= 1 - alpha
+        clusters = halves
+    return weights
+
+
+def hrp_weights(clustering: HRPClustering, cov: Optional[np.ndarray] = None) -> pd.Series:
+    """
+    HRP weights from a (possibly cached) clustering
+
+    Args:
+        clustering: Clustering of the universe
+        cov: Covariance to allocate with; defaults to the clustering's own
+            sample covariance, which matches HRPOpt.optimize
+
+    Returns:
+        Weights indexed by ticker, sorted by ticker as HRPOpt returns them
+    """
+    cov = clustering.covariance() if cov is None else np.asarray(cov, dtype=np.float64)
+    weights = recursive_bisection(cov, clustering.order)
+    return pd.Series(weights, index=clustering.tickers).sort_index()
@@ -0,0 +1,177 @@
+"""
+Lightweight LSTM Runtime
+Exports the Keras price model to TFLite (one fixed-shape artifact per lookback)
+and serves it through the standalone TFLite interpreter, without importing
+TensorFlow or Keras
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from windowing import WindowNormalizer
+
+logger = logging.getLogger(__name__)
+
+# Optional shared artifact directory; by default artifacts sit next to the model
+# (models/foo.lite/), so they travel with it into the model registry
+LITE_MODELS_DIR = os.environ.get('LITE_MODELS_DIR', '')
+# Every lookback_days the price API accepts gets its own fixed-shape artifact
+LITE_LOOKBACKS = tuple(range(30, 121))
+LITE_NUM_THREADS = int(os.environ.get('LITE_NUM_THREADS', 1))
+# Max absolute difference in model output (normalized units) tolerated by the parity check
+PARITY_ATOL = 1e-4
+
+_ARTIFACT_PATTERN = re.compile(r'^lookback_(\d+)\.tflite$')
+
+
+def lite_model_dir(model_path: str, directory: str = LITE_MODELS_DIR) -> str:
+    """models/sp500_lstm_model.h5 -> models/sp500_lstm_model.lite (or <directory>/sp500_lstm_model)"""
+    if directory:
+        return os.path.join(directory, os.path.splitext(os.path.basename(model_path))[0])
+    return os.path.splitext(model_path)[0] + '.lite'
+
+
+def _load_interpreter(path: str):
+    """TFLite interpreter from tflite_runtime, falling back to the one bundled with TensorFlow"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        # Full TensorFlow works too, but then nothing is saved on memory or import time
+        from tensorflow.lite import Interpreter
+    interpreter = Interpreter(model_path=path, num_threads=LITE_NUM_THREADS)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def export_tflite(model, model_path: str, lookbacks: Sequence[int] = LITE_LOOKBACKS) -> List[str]:
+    """
+    Convert a Keras model into one TFLite artifact per lookback
+
+    Each artifact has a fixed (batch, lookback, 1) input with a resizable
+    batch dimension, so the runtime never retraces and can still batch
+    windows across symbols or Monte Carlo samples.
+
+    Args:
+        model: Loaded Keras model
+        model_path: Path the model was loaded from (names the artifact directory)
+        lookbacks: Window lengths to export
+
+    Returns:
+        Paths of the written artifacts
+    """
+    import tensorflow as tf
+
+    directory = lite_model_dir(model_path)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for lookback in lookbacks:
+        forward = tf.function(lambda x: model(x, training=False))
+        concrete = forward.get_concrete_function(tf.TensorSpec([None, lookback, 1], tf.float32))
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+        path = os.path.join(directory, f"lookback_{lookback:03d}.tflite")
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        paths.append(path)
+    return paths
+
+
+class LiteLSTM:
+    """
+    Keras-compatible predict() over the exported TFLite artifacts of a model
+
+    Interpreters are created on first use of each lookback. An interpreter is
+    not thread-safe, so each has its own lock; its input is only resized when
+    the batch size changes.
+    """
+
+    def __init__(self, model_path: str, directory: Optional[str] = None):
+        self.directory = directory or lite_model_dir(model_path)
+        self._paths: Dict[int, str] = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                match = _ARTIFACT_PATTERN.match(name)
+                if match:
+                    self._paths[int(match.group(1))] = os.path.join(self.directory, name)
+        if not self._paths:
+            raise FileNotFoundError(f"No TFLite artifacts in {self.directory}. Run: python export_lightweight.py")
+
+        self._interpreters: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        # Load one interpreter up front so a broken export fails at startup
+        self._interpreter(self.lookbacks[0])
+        logger.info(f"TFLite model loaded from {self.directory} "
+                    f"(lookbacks {self.lookbacks[0]}-{self.lookbacks[-1]})")
+
+    @property
+    def lookbacks(self) -> List[int]:
+        return sorted(self._paths)
+
+    def _interpreter(self, lookback: int) -> tuple:
+        with self._lock:
+            entry = self._interpreters.get(lookback)
+            if entry is None:
+                path = self._paths.get(lookback)
+                if path is None:
+                    raise ValueError(f"No lightweight model exported for lookback_days={lookback} "
+                                     f"(available: {self.lookbacks[0]}-{self.lookbacks[-1]})")
+                entry = (_load_interpreter(path), threading.Lock())
+                self._interpreters[lookback] = entry
+            return entry
+
+    def predict(self, inputs: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """
+        Args:
+            inputs: (N, lookback, 1) normalized windows
+            verbose: Ignored (Keras signature)
+
+        Returns:
+            (N, outputs) model outputs
+        """
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        batch, lookback = inputs.shape[:2]
+        interpreter, lock = self._interpreter(lookback)
+        with lock:
+            input_detail = interpreter.get_input_details()[0]
+            if input_detail['shape'][0] != batch:
+                interpreter.resize_tensor_input(input_detail['index'], [batch, lookback, 1])
+                interpreter.allocate_tensors()
+            interpreter.set_tensor(input_detail['index'], inputs)
+            interpreter.invoke()
+            return interpreter.get_tensor(interpreter.get_output_details()[0]['index']).copy()
+
+    predict_on_batch = predict
+
+
+def check_parity(model,
+                 lite_model: LiteLSTM,
+                 normalizer: WindowNormalizer,
+                 lookbacks: Optional[Sequence[int]] = None,
+                 batch_sizes: Sequence[int] = (1, 32),
+                 atol: float = PARITY_ATOL,
+                 seed: int = 0) -> List[Dict]:
+    """
+    Compare Keras and TFLite outputs on random-walk price windows
+
+    Windows are normalized the way the model was trained, so the inputs
+    cover the range the model sees in serving.
+
+    Returns:
+        One row per (lookback, batch size) with max_abs_error and ok
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for lookback in lookbacks or lite_model.lookbacks:
+        for batch in batch_sizes:
+            prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(batch, lookback)), axis=1))
+            inputs, _ = normalizer.normalize(prices)
+            inputs = inputs.astype(np.float32)
+            expected = model.predict(inputs, verbose=0)
+            actual = lite_model.predict(inputs)
+            error = float(np.max(np.abs(expected - actual)))
+            rows.append({'lookback': lookback, 'batch': batch, 'max_abs_error': error, 'ok': error <= atol})
+    return rows
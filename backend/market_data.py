@@ -0,0 +1,362 @@
+"""
+Market Data Caches
+Latest-quote cache so allocation does not refetch prices, an in-memory cache of
+the per-ticker histories optimize requests download, and an on-disk daily
+close store holding long histories (e.g. for stress-test scenario windows)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+# A quote older than this (measured from its bar date) is refreshed before use
+QUOTE_MAX_AGE_DAYS = float(os.environ.get('QUOTE_MAX_AGE_DAYS', 5))
+QUOTE_REFRESH_PERIOD = '5d'
+PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_store'))
+# First date pulled for tickers new to the store (covers the 2008 crisis)
+PRICE_STORE_START = os.environ.get('PRICE_STORE_START', '2007-01-01')
+# Downloaded histories kept in memory (one per ticker, ~10 KB each for 5 years)
+HISTORY_CACHE_MAX_TICKERS = int(os.environ.get('HISTORY_CACHE_MAX_TICKERS', 2000))
+
+
+class QuoteCache:
+    """
+    Thread-safe map ticker -> (price, as_of, fetched_at)
+
+    as_of is the timestamp of the bar the price came from and drives
+    staleness; fetched_at is when we learned it. Quotes are filled in bulk
+    from history pulls via update_from_prices, so an optimize request that
+    just fetched history can allocate without touching the network again.
+    """
+
+    def __init__(self, max_age_days: float = QUOTE_MAX_AGE_DAYS):
+        self.max_age_days = max_age_days
+        self._quotes: Dict[str, Tuple[float, pd.Timestamp, float]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def update_from_prices(self, prices: pd.DataFrame) -> int:
+        """
+        Record the last valid price of every column, keeping the newer quote per ticker
+
+        Args:
+            prices: Raw (not forward-filled) price DataFrame, dates x tickers
+
+        Returns:
+            Number of tickers whose quote was recorded or advanced
+        """
+        if prices is None or prices.empty:
+            return 0
+
+        valid = prices.notna()
+        has_value = valid.any(axis=0)
+        if not has_value.any():
+            return 0
+        columns = has_value[has_value].index
+        # Last valid row per column, found by scanning the reversed mask once
+        last_positions = len(prices) - 1 - valid[columns].to_numpy()[::-1].argmax(axis=0)
+        values = prices[columns].to_numpy()[last_positions, range(len(columns))]
+        as_of = prices.index[last_positions]
+
+        fetched_at = time.time()
+        updated = 0
+        with self._lock:
+            for ticker, price, stamp in zip(columns, values, as_of):
+                ticker = str(ticker).upper()
+                stamp = pd.Timestamp(stamp)
+                if stamp.tzinfo is not None:
+                    stamp = stamp.tz_localize(None)
+                current = self._quotes.get(ticker)
+                if current is None or stamp >= current[1]:
+                    self._quotes[ticker] = (float(price), stamp, fetched_at)
+                    updated += 1
+        return updated
+
+    def get(self, ticker: str, max_age_days: Optional[float] = None) -> Optional[float]:
+        """Return a fresh price for ticker or None if unknown or stale"""
+        fresh, _ = self.lookup([ticker], max_age_days)
+        return fresh.get(str(ticker).upper())
+
+    def lookup(self,
+               tickers: Iterable[str],
+               max_age_days: Optional[float] = None) -> Tuple[pd.Series, List[str]]:
+        """
+        Split tickers into fresh cached quotes and ones needing a refresh
+
+        Returns:
+            (Series of fresh prices indexed by ticker, list of missing or stale tickers)
+        """
+        max_age = pd.Timedelta(days=self.max_age_days if max_age_days is None else max_age_days)
+        now = pd.Timestamp.now()
+        fresh = {}
+        stale = []
+
+        with self._lock:
+            for ticker in tickers:
+                ticker = str(ticker).upper()
+                quote = self._quotes.get(ticker)
+                if quote is not None and now - quote[1] <= max_age:
+                    fresh[ticker] = quote[0]
+                    self._hits += 1
+                else:
+                    stale.append(ticker)
+                    self._misses += 1
+
+        return pd.Series(fresh, dtype=float), stale
+
+    def refresh(self, tickers: List[str]) -> int:
+        """Fetch the last few days for tickers in one bulk request and record the quotes"""
+        if not tickers:
+            return 0
+        logger.info(f"Refreshing quotes for {len(tickers)} tickers: {', '.join(tickers)}")
+        try:
+            data = yf.download(
+                tickers, period=QUOTE_REFRESH_PERIOD, auto_adjust=False,
+                progress=False, group_by='column', threads=True
+            )
+        except Exception as e:
+            logger.warning(f"Quote refresh failed: {e}")
+            return 0
+        if data is None or data.empty:
+            return 0
+
+        field = 'Adj Close' if 'Adj Close' in data.columns.get_level_values(0) else 'Close'
+        closes = data[field]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+        return self.update_from_prices(closes)
+
+    def latest_prices(self, tickers: List[str], max_age_days: Optional[float] = None) -> pd.Series:
+        """
+        Latest prices for tickers, touching the network only for missing or stale quotes
+
+        Stale quotes are still used (with a warning) if the refresh cannot
+        produce a newer one; tickers never seen are left out.
+        """
+        fresh, stale = self.lookup(tickers, max_age_days)
+        if not stale:
+            return fresh
+
+        self.refresh(stale)
+        refreshed, still_stale = self.lookup(stale, max_age_days)
+        prices = pd.concat([fresh, refreshed])
+
+        with self._lock:
+            fallback = {t: self._quotes[t][0] for t in still_stale if t in self._quotes}
+        if fallback:
+            logger.warning(f"Using stale quotes for: {', '.join(fallback)}")
+            prices = pd.concat([prices, pd.Series(fallback, dtype=float)])
+        return prices
+
+    def as_of(self, ticker: str) -> Optional[pd.Timestamp]:
+        with self._lock:
+            quote = self._quotes.get(str(ticker).upper())
+        return quote[1] if quote is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'tickers': len(self._quotes),
+                'max_age_days': self.max_age_days,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+# Process-wide quote cache shared by optimizer instances
+quote_cache = QuoteCache()
+
+
+class HistoryCache:
+    """
+    Thread-safe LRU map ticker -> (start, end, price frame) of downloaded histories
+
+    An entry only serves the exact date window it was downloaded for. The
+    optimizer's window ends today, so repeat requests on the same day skip
+    the per-ticker downloads (and their retries), and the next day's first
+    request fetches fresh data.
+    """
+
+    def __init__(self, max_tickers: int = HISTORY_CACHE_MAX_TICKERS):
+        self.max_tickers = max(1, int(max_tickers))
+        self._histories: 'OrderedDict[str, Tuple[str, str, pd.DataFrame]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, ticker: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        """Cached history of ticker for exactly [start, end], or None"""
+        ticker = str(ticker).upper()
+        with self._lock:
+            entry = self._histories.get(ticker)
+            if entry is None or entry[:2] != (start, end):
+                self._misses += 1
+                return None
+            self._histories.move_to_end(ticker)
+            self._hits += 1
+            return entry[2]
+
+    def put(self, ticker: str, start: str, end: str, history: pd.DataFrame) -> None:
+        """Store a ticker's history for [start, end] (callers must not modify it afterwards)"""
+        with self._lock:
+            self._histories[str(ticker).upper()] = (start, end, history)
+            self._histories.move_to_end(str(ticker).upper())
+            while len(self._histories) > self.max_tickers:
+                self._histories.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histories.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'tickers': len(self._histories),
+                'max_tickers': self.max_tickers,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+# Process-wide history cache shared by optimizer instances
+history_cache = HistoryCache()
+
+
+class PriceStore:
+    """
+    Daily closes per ticker, persisted as one CSV (Date, Close) per ticker
+
+    Tickers are pulled once from PRICE_STORE_START in a single bulk download
+    and then served from memory / disk. Series are stored raw (not filled),
+    so a ticker's history starts at its first real close.
+    """
+
+    def __init__(self, directory: str = PRICE_STORE_DIR, start: str = PRICE_STORE_START):
+        self.directory = directory
+        self.start = start
+        self._series: Dict[str, pd.Series] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str) -> str:
+        safe = ''.join(c if c.isalnum() or c in '-_.^=' else '_' for c in ticker)
+        return os.path.join(self.directory, f"{safe}.csv")
+
+    def _load(self, ticker: str) -> Optional[pd.Series]:
+        series = self._series.get(ticker)
+        if series is None and os.path.exists(self._path(ticker)):
+            frame = pd.read_csv(self._path(ticker), index_col=0, parse_dates=True)
+            series = frame.iloc[:, 0].rename(ticker)
+            self._series[ticker] = series
+        return series
+
+    def update_from_prices(self, prices: pd.DataFrame) -> int:
+        """
+        Merge price columns into the store (new dates win) and persist them
+
+        Args:
+            prices: Raw price DataFrame, dates x tickers
+
+        Returns:
+            Number of tickers written
+        """
+        if prices is None or prices.empty:
+            return 0
+        index = pd.DatetimeIndex(prices.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        with self._lock:
+            for column in prices.columns:
+                ticker = str(column).upper()
+                new = pd.Series(prices[column].to_numpy(), index=index, name=ticker).dropna()
+                if new.empty:
+                    continue
+                current = self._load(ticker)
+                if current is not None:
+                    new = pd.concat([current[~current.index.isin(new.index)], new]).sort_index()
+                self._series[ticker] = new
+                new.rename_axis('Date').to_frame('Close').to_csv(self._path(ticker))
+                written += 1
+        return written
+
+    def import_csv(self, path: str) -> int:
+        """Load a yfinance-style CSV (Price / Ticker / Date header rows) into the store"""
+        data = pd.read_csv(path, header=[0, 1], index_col=0, skiprows=[2], parse_dates=True)
+        field = 'Adj Close' if 'Adj Close' in data.columns.get_level_values(0) else 'Close'
+        return self.update_from_prices(data[field])
+
+    def fetch(self, tickers: List[str], start: Optional[str] = None) -> int:
+        """Download full daily histories for tickers in one bulk request and store them"""
+        if not tickers:
+            return 0
+        logger.info(f"Fetching stored histories for {len(tickers)} tickers: {', '.join(tickers)}")
+        try:
+            data = yf.download(
+                tickers, start=start or self.start, auto_adjust=False,
+                progress=False, group_by='column', threads=True
+            )
+        except Exception as e:
+            logger.warning(f"Price store fetch failed: {e}")
+            return 0
+        if data is None or data.empty:
+            return 0
+
+        field = 'Adj Close' if 'Adj Close' in data.columns.get_level_values(0) else 'Close'
+        closes = data[field]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+        return self.update_from_prices(closes)
+
+    def history(self,
+                tickers: Iterable[str],
+                start: Optional[str] = None,
+                end: Optional[str] = None,
+                fetch_missing: bool = True) -> pd.DataFrame:
+        """
+        Stored closes for tickers (dates x tickers, NaN where a ticker has no close)
+
+        Tickers absent from the store are downloaded first when fetch_missing
+        is set; ones that still have no data are left out.
+        """
+        tickers = list(dict.fromkeys(str(t).upper() for t in tickers))
+        with self._lock:
+            missing = [t for t in tickers if self._load(t) is None]
+        if missing and fetch_missing:
+            self.fetch(missing)
+
+        with self._lock:
+            columns = {t: self._load(t) for t in tickers}
+        columns = {t: s for t, s in columns.items() if s is not None}
+        if not columns:
+            return pd.DataFrame()
+        prices = pd.DataFrame(columns).sort_index()
+        return prices.loc[start:end]
+
+    def tickers(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith('.csv'))
+
+    def clear(self) -> None:
+        """Drop the in-memory copies (files on disk are kept)"""
+        with self._lock:
+            self._series.clear()
+
+
+# Process-wide on-disk history store
+price_store = PriceStore()
@@ -0,0 +1,43 @@
+"""
+Price Model Metadata
+Sidecar JSON next to each saved price model describing how to feed it
+"""
+
+import json
+import os
+from typing import Dict
+
+from windowing import NORMALIZATIONS
+
+# Models saved before metadata existed were trained on the global MinMaxScaler
+DEFAULT_MODEL_METADATA = {
+    'normalization': 'minmax',
+    'window_size': 60,
+    # Days predicted per forward pass (1 = one-step model, rolled out recursively)
+    'horizon': 1
+}
+
+
+def metadata_path(model_path: str) -> str:
+    """models/foo.h5 -> models/foo.meta.json (also safe for .json models)"""
+    return os.path.splitext(model_path)[0] + '.meta.json'
+
+
+def read_model_metadata(model_path: str) -> Dict:
+    """Metadata of a saved model, falling back to DEFAULT_MODEL_METADATA"""
+    metadata = dict(DEFAULT_MODEL_METADATA)
+    path = metadata_path(model_path)
+    if os.path.exists(path):
+        with open(path) as f:
+            metadata.update(json.load(f))
+    if metadata['normalization'] not in NORMALIZATIONS:
+        raise ValueError(f"{path}: unknown normalization '{metadata['normalization']}'")
+    return metadata
+
+
+def write_model_metadata(model_path: str, **fields) -> str:
+    """Write the sidecar metadata for a saved model and return its path"""
+    path = metadata_path(model_path)
+    with open(path, 'w') as f:
+        json.dump({**DEFAULT_MODEL_METADATA, **fields}, f, indent=2)
+    return path
@@ -0,0 +1,345 @@
+"""
+Model Registry
+Versioned model directories with metadata, and slots that hot-swap the served
+model version without blocking requests
+Run: python model_registry.py list [NAME]
+     python model_registry.py register NAME --model PATH [--scaler PATH] [--activate]
+     python model_registry.py activate NAME VERSION
+
+Layout: <REGISTRY_DIR>/<name>/<version>/ holds the artifacts plus
+metadata.json, and <REGISTRY_DIR>/<name>/CURRENT names the active version.
+A running server switches versions through the admin endpoint; the CLI's
+activate only takes effect on the next start.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from engine_lifecycle import LazyEngine
+from lite_runtime import lite_model_dir
+from model_metadata import metadata_path
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(MODELS_DIR, 'registry'))
+
+# Registered model names served by the API
+PRICE_MODEL = 'price_lstm'
+SENTIMENT_MODEL = 'finbert'
+
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+_VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+
+def _check_name(value: str, kind: str) -> str:
+    if not isinstance(value, str) or not _NAME_PATTERN.match(value) or value.startswith('.'):
+        raise ValueError(f"Invalid model {kind}: {value!r}")
+    return value
+
+
+def _write_atomic(path: str, content: str) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk
+
+    Versions are immutable directories named v1, v2, ... and are written
+    under a temporary name then renamed, so a reader never sees a partial
+    version. Switching versions rewrites the CURRENT pointer atomically.
+    """
+
+    def __init__(self, root: str = REGISTRY_DIR):
+        self.root = root
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, _check_name(name, 'name'))
+
+    def versions(self, name: str) -> List[str]:
+        """Registered versions of a model, oldest first"""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        found = [v for v in os.listdir(model_dir) if _VERSION_PATTERN.match(v)]
+        return sorted(found, key=lambda v: int(_VERSION_PATTERN.match(v).group(1)))
+
+    def current_version(self, name: str) -> Optional[str]:
+        """Active version of a model, or None if it has none"""
+        path = os.path.join(self._model_dir(name), 'CURRENT')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            version = f.read().strip()
+        return version or None
+
+    def get(self, name: str, version: Optional[str] = None) -> Optional[Dict]:
+        """
+        Metadata of a version (default: the active one)
+
+        Returns:
+            metadata.json contents plus 'path' (the version directory), or
+            None when no version is active
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            return None
+        version_dir = os.path.join(self._model_dir(name), _check_name(version, 'version'))
+        path = os.path.join(version_dir, 'metadata.json')
+        if not os.path.exists(path):
+            raise ValueError(f"Unknown version {version} of model {name}")
+        with open(path) as f:
+            metadata = json.load(f)
+        metadata['path'] = version_dir
+        return metadata
+
+    def register(self, name: str, files: Dict[str, str], metadata: Optional[Dict] = None,
+                 activate: bool = False) -> str:
+        """
+        Copy artifacts into a new version
+
+        Args:
+            name: Model name
+            files: Artifact name in the version directory -> source file or directory
+            metadata: Extra metadata (window size, normalization, training metrics, ...)
+            activate: Make the new version the active one
+
+        Returns:
+            The new version
+        """
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        for artifact in files:
+            _check_name(artifact, 'artifact')
+
+        existing = self.versions(name)
+        number = int(_VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1
+        version = f"v{number}"
+        staging = os.path.join(model_dir, f".{version}.tmp{os.getpid()}")
+        os.makedirs(staging)
+        try:
+            for artifact, source in files.items():
+                target = os.path.join(staging, artifact)
+                if os.path.isdir(source):
+                    shutil.copytree(source, target)
+                else:
+                    shutil.copy2(source, target)
+            with open(os.path.join(staging, 'metadata.json'), 'w') as f:
+                json.dump({**(metadata or {}),
+                           'name': name,
+                           'version': version,
+                           'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           'files': sorted(files)}, f, indent=2)
+            os.rename(staging, os.path.join(model_dir, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logger.info(f"Registered {name} {version}")
+        if activate:
+            self.set_current(name, version)
+        return version
+
+    def set_current(self, name: str, version: str) -> None:
+        """Point CURRENT at an existing version"""
+        self.get(name, version)
+        _write_atomic(os.path.join(self._model_dir(name), 'CURRENT'), version + '\n')
+
+    def summary(self, name: str) -> Dict:
+        """Active version and metadata of every version, for listings"""
+        versions = []
+        for version in self.versions(name):
+            metadata = self.get(name, version)
+            metadata.pop('path')
+            versions.append(metadata)
+        return {'name': name, 'current': self.current_version(name), 'versions': versions}
+
+
+def register_model(name: str,
+                   model_path: str,
+                   scaler_path: Optional[str] = None,
+                   metrics: Optional[Dict] = None,
+                   activate: bool = False,
+                   registry: Optional['ModelRegistry'] = None) -> str:
+    """
+    Register a saved model (a file, or a directory such as a HuggingFace save_pretrained)
+
+    The model is stored as model<ext>, with its .meta.json sidecar (window
+    size, normalization, horizon, training metrics), TFLite exports and
+    fine-tuned ticker heads when it has them; the sidecar's fields are also
+    copied into the version metadata.
+
+    Returns:
+        The new version
+    """
+    registry = registry or model_registry
+    model_file = 'model' + ('' if os.path.isdir(model_path) else os.path.splitext(model_path)[1])
+    files = {model_file: model_path}
+    metadata = {'model_file': model_file, 'source': os.path.abspath(model_path)}
+
+    sidecar = metadata_path(model_path)
+    if not os.path.isdir(model_path) and os.path.exists(sidecar):
+        files[metadata_path(model_file)] = sidecar
+        with open(sidecar) as f:
+            metadata.update(json.load(f))
+    lite_dir = lite_model_dir(model_path)
+    if os.path.isdir(lite_dir):
+        # TFLite exports (export_lightweight.py), for PRICE_MODEL_RUNTIME=tflite
+        files['model.lite'] = lite_dir
+    # Fine-tuned per-ticker heads (ticker_models.ticker_models_dir; not imported
+    # here, since that module loads Keras)
+    tickers_dir = os.path.splitext(model_path)[0] + '.tickers'
+    if os.path.isdir(tickers_dir):
+        files['model.tickers'] = tickers_dir
+    if scaler_path:
+        files['scaler.joblib'] = scaler_path
+    if metrics:
+        metadata['metrics'] = {**metadata.get('metrics', {}), **metrics}
+    return registry.register(name, files, metadata, activate)
+
+
+class ModelSlot:
+    """
+    The served instance of a registered model
+
+    get() returns the current instance; the first call loads the active
+    version (or the loader's legacy default when nothing is registered)
+    under a lock. activate() loads and warms another version on a
+    background thread and only then rebinds the reference, so requests keep
+    using the old instance and never wait on the load. Requests already
+    holding the old instance finish with it. Both versions are resident
+    while a swap is in flight.
+    """
+
+    def __init__(self,
+                 name: str,
+                 loader: Callable[[Optional[Dict]], Any],
+                 warmup: Optional[Callable[[Any], None]] = None,
+                 registry: Optional[ModelRegistry] = None):
+        """
+        Args:
+            name: Registered model name
+            loader: Builds an instance from version metadata (None = legacy default)
+            warmup: Runs a representative call on a fresh instance before it is served
+            registry: Registry to load from (default: model_registry)
+        """
+        self.name = name
+        self._loader = loader
+        self._warmup = warmup
+        self._registry = registry
+        # (version, instance), replaced as a whole so readers see a consistent pair
+        self._current = None
+        self._initial = LazyEngine(self._load_active, name=f"{name} model")
+        self._lock = threading.Lock()
+        self._swap = {'state': 'idle', 'version': None, 'error': None}
+        self._swap_thread = None
+
+    @property
+    def registry(self) -> ModelRegistry:
+        return self._registry or model_registry
+
+    def _load_active(self) -> tuple:
+        entry = self.registry.get(self.name)
+        return entry and entry['version'], self._loader(entry)
+
+    def get(self) -> Any:
+        current = self._current
+        if current is None:
+            initial = self._initial.get()
+            with self._lock:
+                # A swap that finished first takes precedence
+                if self._current is None:
+                    self._current = initial
+                current = self._current
+        return current[1]
+
+    @property
+    def version(self) -> Optional[str]:
+        """Served version (None before the first load or for the legacy default)"""
+        current = self._current
+        return current[0] if current else None
+
+    def activate(self, version: str) -> Dict:
+        """
+        Start loading version in the background and swap it in when warm
+
+        Raises:
+            ValueError: Unknown version
+            RuntimeError: Another swap is still in progress
+        """
+        entry = self.registry.get(self.name, version)
+        with self._lock:
+            if self._swap_thread is not None and self._swap_thread.is_alive():
+                raise RuntimeError(f"{self.name} is already loading {self._swap['version']}")
+            self._swap = {'state': 'loading', 'version': version, 'error': None, 'started_at': time.time()}
+            self._swap_thread = threading.Thread(target=self._load_and_swap, args=(entry,),
+                                                 name=f"model-swap-{self.name}", daemon=True)
+            self._swap_thread.start()
+        return self.status()
+
+    def _load_and_swap(self, entry: Dict) -> None:
+        version = entry['version']
+        try:
+            instance = self._loader(entry)
+            if self._warmup is not None:
+                self._warmup(instance)
+            self._current = (version, instance)
+            self.registry.set_current(self.name, version)
+            self._swap = {**self._swap, 'state': 'ready', 'finished_at': time.time()}
+            logger.info(f"{self.name} now serving {version}")
+        except Exception as e:
+            logger.exception(f"Loading {self.name} {version} failed; still serving {self.version}")
+            self._swap = {**self._swap, 'state': 'failed', 'error': str(e), 'finished_at': time.time()}
+
+    def status(self) -> Dict:
+        return {
+            'name': self.name,
+            'serving': self.version,
+            'loaded': self._current is not None,
+            'swap': dict(self._swap)
+        }
+
+
+# Global registry instance
+model_registry = ModelRegistry()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help='Show versions and their metadata')
+    list_parser.add_argument('name', nargs='?')
+    register_parser = commands.add_parser('register', help='Copy a saved model into a new version')
+    register_parser.add_argument('name', help=f'e.g. {PRICE_MODEL} or {SENTIMENT_MODEL}')
+    register_parser.add_argument('--model', required=True, help='Model file or save_pretrained directory')
+    register_parser.add_argument('--scaler', help='Fitted scaler (legacy minmax price models)')
+    register_parser.add_argument('--activate', action='store_true')
+    activate_parser = commands.add_parser('activate', help='Set the version loaded on the next start')
+    activate_parser.add_argument('name')
+    activate_parser.add_argument('version')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        names = [args.name] if args.name else sorted(
+            n for n in (os.listdir(REGISTRY_DIR) if os.path.isdir(REGISTRY_DIR) else []) if not n.startswith('.'))
+        for name in names:
+            print(json.dumps(model_registry.summary(name), indent=2))
+    elif args.command == 'register':
+        version = register_model(args.name, args.model, args.scaler, activate=args.activate)
+        print(f"✅ Registered {args.name} {version}{' (active)' if args.activate else ''}")
+        if not args.activate:
+            print(f"   Serve it with: POST /api/admin/models/{args.name}/activate {{\"version\": \"{version}\"}}")
+    else:
+        model_registry.set_current(args.name, args.version)
+        print(f"✅ {args.name} {args.version} will be loaded on the next start")
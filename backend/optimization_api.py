@@ -71,16 +71,104 @@
 
 from flask import Blueprint, request, jsonify
 # Assuming portfolio_optimizer.py is in the same directory or accessible via Python path
-from portfolio_optimizer import run_portfolio_optimization
+from portfolio_optimizer import run_portfolio_optimization, run_frontier_sweep, OBJECTIVES
+from estimators import EXPECTED_RETURNS_METHODS, COVARIANCE_METHODS
+from factor_risk import DEFAULT_FACTOR_COUNT
+from rebalance import REBALANCE_OBJECTIVES, DEFAULT_TURNOVER_COST
+from discrete_allocation import ALLOCATION_METHODS, DEFAULT_ALLOCATION_METHOD, LP_TIME_LIMIT_SECONDS
+from optimization_jobs import job_manager, QueueFullError
+from rolling_covariance import ROLLING_COVARIANCE_METHODS
+from backtest import run_walk_forward_backtest, DEFAULT_OBJECTIVES, DEFAULT_LOOKBACK_DAYS, DEFAULT_REBALANCE_DAYS
+from simulation import (run_portfolio_simulation, SIMULATION_METHODS, DEFAULT_PATHS, DEFAULT_HORIZON_DAYS,
+                        DEFAULT_BLOCK_SIZE, DEFAULT_CONFIDENCE_LEVELS)
+from stress_test import run_stress_test, HISTORICAL_SCENARIOS, FACTOR_PROXIES
 import logging
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+MAX_FRONTIER_POINTS = 200
+MAX_FACTORS = 100
+MAX_LP_TIME_LIMIT = 60
+MAX_TURNOVER_COST = 0.1
+MAX_FRONTIER_WORKERS = os.cpu_count() or 1
+MAX_BACKTEST_YEARS = 20
+MAX_SIMULATION_PATHS = int(os.environ.get('MAX_SIMULATION_PATHS', 1_000_000))
+MAX_SIMULATION_HORIZON_DAYS = 2520
+MAX_STRESS_PORTFOLIOS = 50
+MAX_FACTOR_SHOCKS = 100
+
 # Create Blueprint
 optimization_bp = Blueprint('optimization', __name__, url_prefix='/api/portfolio') # Added URL prefix
 
+
+def _error(message, status_code=400):
+    return jsonify({'status': 'error', 'message': message}), status_code
+
+
+def _parse_common_params(data):
+    """
+    Validate the fields shared by the portfolio endpoints.
+
+    Returns:
+        (params, None) on success or (None, error_response) on invalid input.
+    """
+    if not data:
+        return None, _error('Request body must be JSON.')
+
+    tickers = data.get('tickers')
+    if not tickers or not isinstance(tickers, list) or len(tickers) == 0:
+        return None, _error('`tickers` array is required and cannot be empty.')
+    if not all(isinstance(t, str) for t in tickers):
+        return None, _error('All items in `tickers` must be strings.')
+
+    # --- Extract Parameters with Defaults & Type Checking ---
+    predicted_returns = data.get('predicted_returns')
+    market_neutral = data.get('market_neutral', False)
+    weight_bounds_input = data.get('weight_bounds', [0, 1]) # Accept list or tuple
+    risk_free_rate = data.get('risk_free_rate', 0.02)
+    expected_returns_method = data.get('expected_returns_method', 'mean')
+    covariance_method = data.get('covariance_method', 'ledoit_wolf')
+    n_factors = data.get('n_factors', DEFAULT_FACTOR_COUNT)
+
+    # --- More Specific Validation ---
+    if predicted_returns is not None and not isinstance(predicted_returns, dict):
+        return None, _error('`predicted_returns` must be a dictionary (object) if provided.')
+    if not isinstance(market_neutral, bool):
+        return None, _error('`market_neutral` must be a boolean.')
+    if not isinstance(weight_bounds_input, (list, tuple)) or len(weight_bounds_input) != 2 or not all(isinstance(v, (int, float)) for v in weight_bounds_input):
+        return None, _error('`weight_bounds` must be an array/tuple of two numbers [min, max].')
+    if not isinstance(risk_free_rate, (int, float)):
+        return None, _error('`risk_free_rate` must be a number.')
+    if expected_returns_method not in EXPECTED_RETURNS_METHODS:
+        return None, _error(f"`expected_returns_method` must be one of: {', '.join(EXPECTED_RETURNS_METHODS)}.")
+    if covariance_method not in COVARIANCE_METHODS:
+        return None, _error(f"`covariance_method` must be one of: {', '.join(COVARIANCE_METHODS)}.")
+    if not isinstance(n_factors, int) or isinstance(n_factors, bool) or not 1 <= n_factors <= MAX_FACTORS:
+        return None, _error(f'`n_factors` must be an integer between 1 and {MAX_FACTORS}.')
+
+    return {
+        'tickers': tickers,
+        'predicted_returns': predicted_returns,
+        'market_neutral': market_neutral,
+        'weight_bounds': tuple(weight_bounds_input), # Convert to tuple for PyPortfolioOpt
+        'risk_free_rate': risk_free_rate,
+        'expected_returns_method': expected_returns_method,
+        'covariance_method': covariance_method,
+        'n_factors': n_factors
+    }, None
+
+
+def _result_response(result):
+    if result.get('status') == 'error':
+        # Use 400 for input/validation errors, 500 for unexpected internal errors
+        status_code = 400 if result.get('error_type') in ('ValueError', 'ConnectionError') else 500
+        return jsonify(result), status_code
+    return jsonify(result), 200 # OK status
+
+
 @optimization_bp.route('/optimize', methods=['POST'])
 def optimize():
     """
@@ -92,95 +180,521 @@ def optimize():
         "predicted_returns": {"AAPL": 0.15, ...},          // Optional: Dictionary string -> float
         "objective": "max_sharpe" | "min_volatility" |     // Optional: string, default 'max_sharpe'
                      "efficient_risk" | "efficient_return" | "hrp",
+        "objectives": ["max_sharpe", "hrp", ...],          // Optional: list of objectives solved together on shared inputs;
+                                                           //           response then has one block per objective under 'results'
         "target_return": 0.20,                             // Optional: float (required for efficient_return)
         "target_risk": 0.15,                               // Optional: float (required for efficient_risk)
         "market_neutral": false,                           // Optional: boolean, default false
         "weight_bounds": [0, 1],                           // Optional: List/Tuple [min, max], default [0, 1]
         "portfolio_value": 10000,                          // Optional: float, default 10000
         "risk_free_rate": 0.02,                            // Optional: float, default 0.02
-        "expected_returns_method": "mean" | "capm" | "ema",// Optional: string, default 'mean' (used if predicted_returns is missing/invalid)
+        "expected_returns_method": "mean" | "capm" | "ema" | // Optional: string, default 'mean' (used if predicted_returns is missing/invalid);
+                                   "black_litterman",      //           'black_litterman' blends an equilibrium prior with views from
+                                                           //           cached sentiment scores and price forecasts
         "covariance_method": "ledoit_wolf" | "sample_cov" | // Optional: string, default 'ledoit_wolf'
-                             "exp_cov" | "oracle_approximating"
+                             "exp_cov" | "oracle_approximating" |
+                             "factor_model",
+        "n_factors": 10,                                   // Optional: int 1-100, PCA factors for 'factor_model', default 10
+        "allocation_method": "greedy" | "lp",              // Optional: string, default 'greedy' (largest-remainder rounding);
+                                                           //           'lp' refines it with a time-limited integer program
+        "lp_time_limit": 5,                                // Optional: seconds for the 'lp' refinement, default 5 (max 60)
+        "current_holdings": {"AAPL": 10, ...},             // Optional: shares currently held. Switches to a turnover-aware
+                                                           //           rebalance; response has a trade list under 'rebalance'
+        "cash": 0,                                         // Optional: uninvested cash alongside current_holdings, default 0
+        "turnover_cost": 0.001,                            // Optional: penalty per unit of traded weight, default 0.001 (10 bps)
+        "async": false                                     // Optional: boolean, default false. When true the run is queued
+                                                           //           and a job id is returned (poll /jobs/<job_id>)
     }
 
     Returns:
-        JSON response with optimization results or error details.
+        JSON response with optimization results or error details
+        (202 with a job id in async mode).
     """
     try:
         data = request.get_json()
 
         # --- Basic Validation ---
-        if not data:
-            return jsonify({'status': 'error', 'message': 'Request body must be JSON.'}), 400
-
-        tickers = data.get('tickers')
-        if not tickers or not isinstance(tickers, list) or len(tickers) == 0:
-            return jsonify({'status': 'error', 'message': '`tickers` array is required and cannot be empty.'}), 400
-        if not all(isinstance(t, str) for t in tickers):
-             return jsonify({'status': 'error', 'message': 'All items in `tickers` must be strings.'}), 400
+        params, error_response = _parse_common_params(data)
+        if error_response:
+            return error_response
 
-        # --- Extract Parameters with Defaults & Type Checking ---
-        predicted_returns = data.get('predicted_returns')
         objective = data.get('objective', 'max_sharpe')
+        objectives = data.get('objectives')
         target_return = data.get('target_return')
         target_risk = data.get('target_risk')
-        market_neutral = data.get('market_neutral', False)
-        weight_bounds_input = data.get('weight_bounds', [0, 1]) # Accept list or tuple
         portfolio_value = data.get('portfolio_value', 10000)
-        risk_free_rate = data.get('risk_free_rate', 0.02)
-        expected_returns_method = data.get('expected_returns_method', 'mean')
-        covariance_method = data.get('covariance_method', 'ledoit_wolf')
+        allocation_method = data.get('allocation_method', DEFAULT_ALLOCATION_METHOD)
+        current_holdings = data.get('current_holdings')
+        cash = data.get('cash', 0)
+        turnover_cost = data.get('turnover_cost', DEFAULT_TURNOVER_COST)
+        lp_time_limit = data.get('lp_time_limit', LP_TIME_LIMIT_SECONDS)
+        run_async = data.get('async', False)
 
-        # --- More Specific Validation ---
-        if predicted_returns is not None and not isinstance(predicted_returns, dict):
-             return jsonify({'status': 'error', 'message': '`predicted_returns` must be a dictionary (object) if provided.'}), 400
+        if not isinstance(run_async, bool):
+             return _error('`async` must be a boolean.')
         if not isinstance(objective, str):
-             return jsonify({'status': 'error', 'message': '`objective` must be a string.'}), 400
-        if objective == 'efficient_return' and (target_return is None or not isinstance(target_return, (int, float))):
-            return jsonify({'status': 'error', 'message': '`target_return` (number) is required for efficient_return objective.'}), 400
-        if objective == 'efficient_risk' and (target_risk is None or not isinstance(target_risk, (int, float))):
-             return jsonify({'status': 'error', 'message': '`target_risk` (number) is required for efficient_risk objective.'}), 400
-        if not isinstance(market_neutral, bool):
-             return jsonify({'status': 'error', 'message': '`market_neutral` must be a boolean.'}), 400
-        if not isinstance(weight_bounds_input, (list, tuple)) or len(weight_bounds_input) != 2 or not all(isinstance(v, (int, float)) for v in weight_bounds_input):
-             return jsonify({'status': 'error', 'message': '`weight_bounds` must be an array/tuple of two numbers [min, max].'}), 400
-        weight_bounds = tuple(weight_bounds_input) # Convert to tuple for PyPortfolioOpt
+             return _error('`objective` must be a string.')
+        if objectives is not None and (not isinstance(objectives, list) or len(objectives) == 0 or not all(isinstance(o, str) for o in objectives)):
+             return _error('`objectives` must be a non-empty array of strings if provided.')
+        requested_objectives = objectives if objectives is not None else [objective]
+        unknown = [o for o in requested_objectives if o not in OBJECTIVES]
+        if unknown:
+             return _error(f"Unknown objective(s): {', '.join(unknown)}. Must be one of: {', '.join(OBJECTIVES)}.")
+        if 'efficient_return' in requested_objectives and (target_return is None or not isinstance(target_return, (int, float))):
+            return _error('`target_return` (number) is required for efficient_return objective.')
+        if 'efficient_risk' in requested_objectives and (target_risk is None or not isinstance(target_risk, (int, float))):
+             return _error('`target_risk` (number) is required for efficient_risk objective.')
         if not isinstance(portfolio_value, (int, float)) or portfolio_value <= 0:
-             return jsonify({'status': 'error', 'message': '`portfolio_value` must be a positive number.'}), 400
-        if not isinstance(risk_free_rate, (int, float)):
-             return jsonify({'status': 'error', 'message': '`risk_free_rate` must be a number.'}), 400
-        # Add validation for method strings if needed
+             return _error('`portfolio_value` must be a positive number.')
+        if allocation_method not in ALLOCATION_METHODS:
+             return _error(f"Invalid `allocation_method`. Must be one of: {', '.join(ALLOCATION_METHODS)}.")
+        if isinstance(lp_time_limit, bool) or not isinstance(lp_time_limit, (int, float)) or not 0 < lp_time_limit <= MAX_LP_TIME_LIMIT:
+             return _error(f'`lp_time_limit` must be a number in (0, {MAX_LP_TIME_LIMIT}].')
+        if current_holdings is not None:
+            if not isinstance(current_holdings, dict) or not current_holdings or \
+                    not all(isinstance(n, (int, float)) and not isinstance(n, bool) and n >= 0 for n in current_holdings.values()):
+                return _error('`current_holdings` must be a non-empty object of ticker -> non-negative share count.')
+            if objectives is not None:
+                return _error('`current_holdings` cannot be combined with `objectives`.')
+            if objective not in REBALANCE_OBJECTIVES:
+                return _error(f"Rebalancing from `current_holdings` supports: {', '.join(REBALANCE_OBJECTIVES)}.")
+            if params['market_neutral']:
+                return _error('`current_holdings` cannot be combined with `market_neutral`.')
+        if isinstance(cash, bool) or not isinstance(cash, (int, float)) or cash < 0:
+             return _error('`cash` must be a non-negative number.')
+        if isinstance(turnover_cost, bool) or not isinstance(turnover_cost, (int, float)) or not 0 <= turnover_cost <= MAX_TURNOVER_COST:
+             return _error(f'`turnover_cost` must be a number in [0, {MAX_TURNOVER_COST}].')
 
         # Log the request details
-        logger.info(f"Received optimization request for tickers: {', '.join(tickers)}. Objective: {objective}. Predicted returns provided: {'Yes' if predicted_returns else 'No'}.")
+        logger.info(f"Received optimization request for tickers: {', '.join(params['tickers'])}. Objective: {', '.join(requested_objectives)}. Predicted returns provided: {'Yes' if params['predicted_returns'] else 'No'}.")
 
-        # --- Run Optimization ---
-        result = run_portfolio_optimization(
-            tickers=tickers,
-            predicted_returns=predicted_returns,
+        run_params = dict(
             objective=objective,
+            objectives=objectives,
             target_return=target_return,
             target_risk=target_risk,
-            market_neutral=market_neutral,
-            weight_bounds=weight_bounds,
             portfolio_value=portfolio_value,
-            risk_free_rate=risk_free_rate,
-            expected_returns_method=expected_returns_method,
-            covariance_method=covariance_method
+            allocation_method=allocation_method,
+            lp_time_limit=lp_time_limit,
+            current_holdings=current_holdings,
+            cash=cash,
+            turnover_cost=turnover_cost,
+            **params
         )
 
+        if run_async:
+            try:
+                job, coalesced = job_manager.submit(run_params)
+            except QueueFullError as e:
+                return _error(str(e), 429)
+            return jsonify({
+                'status': 'accepted',
+                'job_id': job.id,
+                'job_status': job.status,
+                'coalesced': coalesced
+            }), 202
+
+        # --- Run Optimization ---
+        result = run_portfolio_optimization(**run_params)
+
         # --- Handle Response ---
-        if result.get('status') == 'error':
-             # Use 400 for input/validation errors, 500 for unexpected internal errors
-             status_code = 400 if isinstance(result.get('original_exception'), (ValueError, ConnectionError)) else 500
-             return jsonify(result), status_code
-        else:
-            return jsonify(result), 200 # OK status
+        return _result_response(result)
 
     except Exception as e:
         logger.exception("An unexpected error occurred in the /optimize endpoint.") # Logs traceback
         return jsonify({'status': 'error', 'message': f'An internal server error occurred: {str(e)}'}), 500
 
+
+@optimization_bp.route('/frontier', methods=['POST'])
+def frontier():
+    """
+    Endpoint to trace the efficient frontier in a single request.
+
+    Request JSON Body Schema:
+    {
+        "tickers": ["AAPL", "MSFT", ...],                  // Required: List of strings
+        "n_points": 50,                                    // Optional: int 2-200, default 50
+        "n_workers": 1,                                    // Optional: int, processes to spread points over, default 1
+        ... plus predicted_returns, market_neutral, weight_bounds, risk_free_rate,
+            expected_returns_method and covariance_method as for /optimize
+    }
+
+    Returns:
+        JSON response with one risk/return/weights entry per frontier point.
+    """
+    try:
+        data = request.get_json()
+
+        params, error_response = _parse_common_params(data)
+        if error_response:
+            return error_response
+
+        n_points = data.get('n_points', 50)
+        n_workers = data.get('n_workers', 1)
+
+        if not isinstance(n_points, int) or isinstance(n_points, bool) or not 2 <= n_points <= MAX_FRONTIER_POINTS:
+            return _error(f'`n_points` must be an integer between 2 and {MAX_FRONTIER_POINTS}.')
+        if not isinstance(n_workers, int) or isinstance(n_workers, bool) or not 1 <= n_workers <= MAX_FRONTIER_WORKERS:
+            return _error(f'`n_workers` must be an integer between 1 and {MAX_FRONTIER_WORKERS}.')
+
+        logger.info(f"Received frontier request for tickers: {', '.join(params['tickers'])}. Points: {n_points}.")
+
+        result = run_frontier_sweep(n_points=n_points, n_workers=n_workers, **params)
+        return _result_response(result)
+
+    except Exception as e:
+        logger.exception("An unexpected error occurred in the /frontier endpoint.")
+        return jsonify({'status': 'error', 'message': f'An internal server error occurred: {str(e)}'}), 500
+
+
+@optimization_bp.route('/backtest', methods=['POST'])
+def backtest():
+    """
+    Endpoint to walk-forward backtest optimizer objectives on historical prices.
+
+    Request JSON Body Schema:
+    {
+        "tickers": ["AAPL", "MSFT", ...],                  // Required: List of strings
+        "objectives": ["max_sharpe", "hrp", ...],          // Optional: default ["max_sharpe", "min_volatility", "hrp"]
+        "years": 5,                                        // Optional: int 1-20, history to fetch, default 5
+        "lookback": 252,                                   // Optional: int, trading days per estimation window, default 252
+        "rebalance_every": 21,                             // Optional: int, trading days between rebalances, default 21
+        "covariance_method": "ledoit_wolf" | "sample_cov" | // Optional: string, default 'ledoit_wolf'; updated incrementally
+                             "exp_cov",                    //           between rebalances
+        "transaction_cost_bps": 0,                         // Optional: number, cost on traded notional, default 0
+        "target_return": 0.20,                             // Optional: float (required for efficient_return)
+        "target_risk": 0.15,                               // Optional: float (required for efficient_risk)
+        "n_workers": 1,                                    // Optional: int, processes for the rebalance solves, default 1
+        ... plus weight_bounds and risk_free_rate as for /optimize
+    }
+
+    Returns:
+        JSON response with per-objective metrics (return, volatility, Sharpe,
+        max drawdown, turnover), the NAV path and the weights at each rebalance.
+    """
+    try:
+        data = request.get_json()
+
+        params, error_response = _parse_common_params(data)
+        if error_response:
+            return error_response
+
+        objectives = data.get('objectives', list(DEFAULT_OBJECTIVES))
+        years = data.get('years', 5)
+        lookback = data.get('lookback', DEFAULT_LOOKBACK_DAYS)
+        rebalance_every = data.get('rebalance_every', DEFAULT_REBALANCE_DAYS)
+        transaction_cost_bps = data.get('transaction_cost_bps', 0)
+        target_return = data.get('target_return')
+        target_risk = data.get('target_risk')
+        n_workers = data.get('n_workers', 1)
+
+        if not isinstance(objectives, list) or len(objectives) == 0 or not all(isinstance(o, str) for o in objectives):
+            return _error('`objectives` must be a non-empty array of strings.')
+        unknown = [o for o in objectives if o not in OBJECTIVES]
+        if unknown:
+            return _error(f"Unknown objective(s): {', '.join(unknown)}. Must be one of: {', '.join(OBJECTIVES)}.")
+        if 'efficient_return' in objectives and not isinstance(target_return, (int, float)):
+            return _error('`target_return` (number) is required for efficient_return objective.')
+        if 'efficient_risk' in objectives and not isinstance(target_risk, (int, float)):
+            return _error('`target_risk` (number) is required for efficient_risk objective.')
+        if params['covariance_method'] not in ROLLING_COVARIANCE_METHODS:
+            return _error(f"Backtests support `covariance_method` in: {', '.join(ROLLING_COVARIANCE_METHODS)}.")
+        if not isinstance(years, int) or isinstance(years, bool) or not 1 <= years <= MAX_BACKTEST_YEARS:
+            return _error(f'`years` must be an integer between 1 and {MAX_BACKTEST_YEARS}.')
+        if not isinstance(lookback, int) or isinstance(lookback, bool) or lookback < 1:
+            return _error('`lookback` must be a positive integer.')
+        if not isinstance(rebalance_every, int) or isinstance(rebalance_every, bool) or rebalance_every < 1:
+            return _error('`rebalance_every` must be a positive integer.')
+        if isinstance(transaction_cost_bps, bool) or not isinstance(transaction_cost_bps, (int, float)) or transaction_cost_bps < 0:
+            return _error('`transaction_cost_bps` must be a non-negative number.')
+        if not isinstance(n_workers, int) or isinstance(n_workers, bool) or not 1 <= n_workers <= MAX_FRONTIER_WORKERS:
+            return _error(f'`n_workers` must be an integer between 1 and {MAX_FRONTIER_WORKERS}.')
+
+        logger.info(f"Received backtest request for tickers: {', '.join(params['tickers'])}. Objectives: {', '.join(objectives)}.")
+
+        result = run_walk_forward_backtest(
+            params['tickers'],
+            years=years,
+            objectives=objectives,
+            lookback=lookback,
+            rebalance_every=rebalance_every,
+            covariance_method=params['covariance_method'],
+            weight_bounds=params['weight_bounds'],
+            risk_free_rate=params['risk_free_rate'],
+            target_return=target_return,
+            target_risk=target_risk,
+            transaction_cost_bps=transaction_cost_bps,
+            n_workers=n_workers
+        )
+        return _result_response(result)
+
+    except Exception as e:
+        logger.exception("An unexpected error occurred in the /backtest endpoint.")
+        return jsonify({'status': 'error', 'message': f'An internal server error occurred: {str(e)}'}), 500
+
+
+@optimization_bp.route('/simulate', methods=['POST'])
+def simulate():
+    """
+    Endpoint to Monte Carlo simulate a portfolio and report its tail risk.
+
+    Request JSON Body Schema:
+    {
+        "weights": {"AAPL": 0.6, "MSFT": 0.4},             // Optional: weights to simulate (e.g. from /optimize);
+                                                           //           when omitted `tickers` are optimized first
+        "tickers": ["AAPL", "MSFT", ...],                  // Required unless `weights` is given
+        "objective": "max_sharpe",                         // Optional: objective used when `weights` is omitted
+        "target_return": 0.20,                             // Optional: float (for efficient_return)
+        "target_risk": 0.15,                               // Optional: float (for efficient_risk)
+        "method": "bootstrap" | "parametric",              // Optional: block bootstrap of history, or normal
+                                                           //           paths from mu and a Cholesky factor of S
+        "n_paths": 100000,                                 // Optional: int, default 100000
+        "horizon_days": 252,                               // Optional: int trading days, default 252
+        "block_size": 21,                                  // Optional: int days per bootstrap block, default 21
+        "confidence_levels": [0.95, 0.99],                 // Optional: VaR / CVaR levels
+        "portfolio_value": 10000,                          // Optional: number, adds VaR / CVaR in currency
+        "seed": 42,                                        // Optional: int, for reproducible paths
+        ... plus predicted_returns, weight_bounds, risk_free_rate, expected_returns_method,
+            covariance_method and n_factors as for /optimize
+    }
+
+    Returns:
+        JSON response with VaR / CVaR, probability of loss and the terminal
+        return and max drawdown distributions.
+    """
+    try:
+        data = request.get_json()
+
+        weights = data.get('weights') if data else None
+        if weights is not None:
+            if not isinstance(weights, dict) or len(weights) == 0:
+                return _error('`weights` must be a non-empty object of ticker -> weight.')
+            if not all(isinstance(w, (int, float)) and not isinstance(w, bool) for w in weights.values()):
+                return _error('All values in `weights` must be numbers.')
+            data = dict(data, tickers=data.get('tickers') or list(weights))
+
+        params, error_response = _parse_common_params(data)
+        if error_response:
+            return error_response
+
+        objective = data.get('objective', 'max_sharpe')
+        target_return = data.get('target_return')
+        target_risk = data.get('target_risk')
+        method = data.get('method', 'bootstrap')
+        n_paths = data.get('n_paths', DEFAULT_PATHS)
+        horizon_days = data.get('horizon_days', DEFAULT_HORIZON_DAYS)
+        block_size = data.get('block_size', DEFAULT_BLOCK_SIZE)
+        confidence_levels = data.get('confidence_levels', list(DEFAULT_CONFIDENCE_LEVELS))
+        portfolio_value = data.get('portfolio_value')
+        seed = data.get('seed')
+
+        if weights is None:
+            if objective not in OBJECTIVES:
+                return _error(f"Invalid objective. Must be one of: {', '.join(OBJECTIVES)}.")
+            if objective == 'efficient_return' and not isinstance(target_return, (int, float)):
+                return _error('`target_return` (number) is required for efficient_return objective.')
+            if objective == 'efficient_risk' and not isinstance(target_risk, (int, float)):
+                return _error('`target_risk` (number) is required for efficient_risk objective.')
+        if method not in SIMULATION_METHODS:
+            return _error(f"`method` must be one of: {', '.join(SIMULATION_METHODS)}.")
+        if not isinstance(n_paths, int) or isinstance(n_paths, bool) or not 1 <= n_paths <= MAX_SIMULATION_PATHS:
+            return _error(f'`n_paths` must be an integer between 1 and {MAX_SIMULATION_PATHS}.')
+        if not isinstance(horizon_days, int) or isinstance(horizon_days, bool) or not 1 <= horizon_days <= MAX_SIMULATION_HORIZON_DAYS:
+            return _error(f'`horizon_days` must be an integer between 1 and {MAX_SIMULATION_HORIZON_DAYS}.')
+        if not isinstance(block_size, int) or isinstance(block_size, bool) or block_size < 1:
+            return _error('`block_size` must be a positive integer.')
+        if (not isinstance(confidence_levels, list) or len(confidence_levels) == 0
+                or not all(isinstance(c, (int, float)) and not isinstance(c, bool) and 0 < c < 1 for c in confidence_levels)):
+            return _error('`confidence_levels` must be a non-empty array of numbers between 0 and 1.')
+        if portfolio_value is not None and (isinstance(portfolio_value, bool) or not isinstance(portfolio_value, (int, float)) or portfolio_value <= 0):
+            return _error('`portfolio_value` must be a positive number.')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+            return _error('`seed` must be a non-negative integer.')
+
+        logger.info(f"Received simulation request for tickers: {', '.join(params['tickers'])}. Method: {method}, paths: {n_paths}.")
+
+        result = run_portfolio_simulation(
+            params['tickers'],
+            weights=weights,
+            objective=objective,
+            optimize_params={
+                'target_return': target_return,
+                'target_risk': target_risk,
+                'market_neutral': params['market_neutral'],
+                'weight_bounds': params['weight_bounds']
+            },
+            method=method,
+            n_paths=n_paths,
+            horizon_days=horizon_days,
+            block_size=block_size,
+            confidence_levels=confidence_levels,
+            portfolio_value=portfolio_value,
+            seed=seed,
+            expected_returns_method=params['expected_returns_method'],
+            covariance_method=params['covariance_method'],
+            n_factors=params['n_factors'],
+            risk_free_rate=params['risk_free_rate'],
+            predicted_returns=params['predicted_returns']
+        )
+        return _result_response(result)
+
+    except Exception as e:
+        logger.exception("An unexpected error occurred in the /simulate endpoint.")
+        return jsonify({'status': 'error', 'message': f'An internal server error occurred: {str(e)}'}), 500
+
+
+def _is_weight_map(value):
+    return (isinstance(value, dict) and len(value) > 0 and all(isinstance(t, str) for t in value)
+            and all(isinstance(w, (int, float)) and not isinstance(w, bool) for w in value.values()))
+
+
+@optimization_bp.route('/stress-test', methods=['POST'])
+def stress_test():
+    """
+    Endpoint to replay historical crises and factor shocks on portfolios.
+
+    Request JSON Body Schema:
+    {
+        "portfolios": {"growth": {"AAPL": 0.6, "MSFT": 0.4}, ...}, // Optional: named weights (e.g. from /optimize)
+        "tickers": ["AAPL", "MSFT", ...],                  // Required unless `portfolios` is given
+        "objectives": ["max_sharpe", "hrp"],               // Optional: portfolios to optimize when `portfolios`
+                                                           //           is omitted, default ["max_sharpe"]
+        "scenarios": ["gfc_2008", "covid_crash_2020"],     // Optional: historical windows, default all
+        "factor_shocks": [                                 // Optional: user-defined shocks as proxy returns
+            {"name": "rates_up", "factors": {"rates": -0.15, "market": -0.05}}
+        ],
+        "portfolio_value": 10000,                          // Optional: number, scales the P&L, default 10000
+        ... plus target_return, target_risk, predicted_returns, weight_bounds, risk_free_rate,
+            expected_returns_method, covariance_method and n_factors as for /optimize
+    }
+
+    Returns:
+        JSON response with one row per scenario (return and P&L per
+        portfolio) and each portfolio's worst scenario.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return _error('Request body must be JSON.')
+
+        portfolios = data.get('portfolios')
+        objectives = data.get('objectives', ['max_sharpe'])
+        scenarios = data.get('scenarios')
+        factor_shocks = data.get('factor_shocks')
+        portfolio_value = data.get('portfolio_value', 10000)
+        target_return = data.get('target_return')
+        target_risk = data.get('target_risk')
+
+        if portfolios is not None:
+            if not isinstance(portfolios, dict) or not 1 <= len(portfolios) <= MAX_STRESS_PORTFOLIOS:
+                return _error(f'`portfolios` must be an object of 1 to {MAX_STRESS_PORTFOLIOS} named portfolios.')
+            if not all(_is_weight_map(w) for w in portfolios.values()):
+                return _error('Each portfolio must be a non-empty object of ticker -> weight.')
+            tickers = sorted({t for w in portfolios.values() for t in w})
+            data = dict(data, tickers=data.get('tickers') or tickers)
+
+        params, error_response = _parse_common_params(data)
+        if error_response:
+            return error_response
+
+        if portfolios is None:
+            if not isinstance(objectives, list) or len(objectives) == 0 or not all(isinstance(o, str) for o in objectives):
+                return _error('`objectives` must be a non-empty array of strings.')
+            unknown = [o for o in objectives if o not in OBJECTIVES]
+            if unknown:
+                return _error(f"Unknown objective(s): {', '.join(unknown)}. Must be one of: {', '.join(OBJECTIVES)}.")
+            if 'efficient_return' in objectives and not isinstance(target_return, (int, float)):
+                return _error('`target_return` (number) is required for efficient_return objective.')
+            if 'efficient_risk' in objectives and not isinstance(target_risk, (int, float)):
+                return _error('`target_risk` (number) is required for efficient_risk objective.')
+        if scenarios is not None:
+            if not isinstance(scenarios, list) or not all(isinstance(s, str) for s in scenarios):
+                return _error('`scenarios` must be an array of strings.')
+            unknown = [s for s in scenarios if s not in HISTORICAL_SCENARIOS]
+            if unknown:
+                return _error(f"Unknown scenario(s): {', '.join(unknown)}. Must be one of: {', '.join(HISTORICAL_SCENARIOS)}.")
+        if factor_shocks is not None:
+            if not isinstance(factor_shocks, list) or len(factor_shocks) > MAX_FACTOR_SHOCKS:
+                return _error(f'`factor_shocks` must be an array of at most {MAX_FACTOR_SHOCKS} shocks.')
+            names = set()
+            for shock in factor_shocks:
+                if (not isinstance(shock, dict) or not isinstance(shock.get('name'), str)
+                        or not _is_weight_map(shock.get('factors'))):
+                    return _error('Each factor shock needs a `name` and a non-empty `factors` object of factor -> return.')
+                unknown = [f for f in shock['factors'] if f not in FACTOR_PROXIES]
+                if unknown:
+                    return _error(f"Unknown factor(s): {', '.join(unknown)}. Must be one of: {', '.join(FACTOR_PROXIES)}.")
+                if shock['name'] in names or shock['name'] in HISTORICAL_SCENARIOS:
+                    return _error(f"Duplicate scenario name: {shock['name']}.")
+                names.add(shock['name'])
+        if isinstance(portfolio_value, bool) or not isinstance(portfolio_value, (int, float)) or portfolio_value <= 0:
+            return _error('`portfolio_value` must be a positive number.')
+
+        logger.info(f"Received stress test request for tickers: {', '.join(params['tickers'])}.")
+
+        result = run_stress_test(
+            params['tickers'],
+            portfolios=portfolios,
+            objectives=objectives,
+            scenarios=scenarios,
+            factor_shocks=factor_shocks,
+            portfolio_value=portfolio_value,
+            optimize_params={
+                'target_return': target_return,
+                'target_risk': target_risk,
+                'market_neutral': params['market_neutral'],
+                'weight_bounds': params['weight_bounds']
+            },
+            expected_returns_method=params['expected_returns_method'],
+            covariance_method=params['covariance_method'],
+            n_factors=params['n_factors'],
+            risk_free_rate=params['risk_free_rate'],
+            predicted_returns=params['predicted_returns']
+        )
+        return _result_response(result)
+
+    except Exception as e:
+        logger.exception("An unexpected error occurred in the /stress-test endpoint.")
+        return jsonify({'status': 'error', 'message': f'An internal server error occurred: {str(e)}'}), 500
+
+
+@optimization_bp.route('/stress-test/scenarios', methods=['GET'])
+def stress_test_scenarios():
+    """List the historical scenario library and the factors available for shocks."""
+    return jsonify({
+        'status': 'success',
+        'scenarios': [
+            {'name': name, 'start': start, 'end': end, 'description': description}
+            for name, (start, end, description) in HISTORICAL_SCENARIOS.items()
+        ],
+        'factors': FACTOR_PROXIES
+    }), 200
+
+
+@optimization_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll an async optimization job.
+
+    Returns:
+        JSON with status (queued | running | succeeded | failed | cancelled),
+        the current stage (fetching | estimating | solving | allocating),
+        progress (0-1) and the optimization result once finished.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return _error(f'Job {job_id} not found.', 404)
+    return jsonify(job.to_dict()), 200
+
+
+@optimization_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running optimization job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return _error(f'Job {job_id} not found.', 404)
+    return jsonify(job.to_dict()), 200
+
 # You would register this blueprint in your main Flask app:
 # from flask import Flask
 # from optimization_api import optimization_bp
@@ -0,0 +1,213 @@
+"""
+Background Job Queue for Portfolio Optimizations
+Runs long optimizations on a bounded executor so HTTP workers return immediately
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from portfolio_optimizer import run_portfolio_optimization, OptimizationCancelled, OPTIMIZATION_STAGES
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_WORKERS = int(os.environ.get('OPTIMIZATION_JOB_WORKERS', 2))
+JOB_MAX_QUEUED = int(os.environ.get('OPTIMIZATION_JOB_QUEUE_DEPTH', 16))
+JOB_RESULT_TTL_SECONDS = int(os.environ.get('OPTIMIZATION_JOB_RESULT_TTL', 3600))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its depth limit"""
+
+
+class OptimizationJob:
+    """State of one submitted optimization"""
+
+    def __init__(self, params: Dict, fingerprint: str):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.fingerprint = fingerprint
+        self.status = 'queued'
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def report_progress(self, stage: str) -> None:
+        """Progress callback handed to run_portfolio_optimization"""
+        if self.cancel_event.is_set():
+            raise OptimizationCancelled(f"Job {self.id} cancelled")
+        self.stage = stage
+
+    def to_dict(self) -> Dict:
+        stage_index = OPTIMIZATION_STAGES.index(self.stage) if self.stage in OPTIMIZATION_STAGES else -1
+        if self.status == 'succeeded':
+            progress = 1.0
+        else:
+            progress = max(stage_index, 0) / len(OPTIMIZATION_STAGES)
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(progress, 2),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+def request_fingerprint(params: Dict) -> str:
+    """Stable hash of optimization parameters, used to coalesce identical submissions"""
+    normalized = dict(params)
+    normalized['tickers'] = sorted(str(t).upper() for t in params.get('tickers', []))
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OptimizationJobManager:
+    """
+    Bounded background executor for run_portfolio_optimization
+
+    - At most max_workers jobs run at once and at most max_queued wait behind them
+    - Identical submissions while one is queued or running return the same job
+    - Queued jobs are cancelled immediately; running jobs stop at the next stage
+    """
+
+    def __init__(self,
+                 max_workers: int = JOB_MAX_WORKERS,
+                 max_queued: int = JOB_MAX_QUEUED,
+                 result_ttl: int = JOB_RESULT_TTL_SECONDS):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='optimization-job')
+        self._jobs: Dict[str, OptimizationJob] = {}
+        self._in_flight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, params: Dict) -> Tuple[OptimizationJob, bool]:
+        """
+        Queue an optimization
+
+        Args:
+            params: Keyword arguments for run_portfolio_optimization
+
+        Returns:
+            (job, coalesced) where coalesced is True if an identical job was already in flight
+
+        Raises:
+            QueueFullError: If the queue depth limit is reached
+        """
+        fingerprint = request_fingerprint(params)
+
+        with self._lock:
+            self._prune_finished()
+
+            existing_id = self._in_flight.get(fingerprint)
+            if existing_id is not None:
+                existing = self._jobs.get(existing_id)
+                if existing is not None and existing.status in ACTIVE_STATUSES and not existing.cancel_event.is_set():
+                    logger.info(f"Coalescing optimization request into job {existing.id}")
+                    return existing, True
+
+            active = sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+            if active >= self.max_workers + self.max_queued:
+                raise QueueFullError(f"Optimization queue is full ({active} jobs in flight)")
+
+            job = OptimizationJob(params, fingerprint)
+            self._jobs[job.id] = job
+            self._in_flight[fingerprint] = job.id
+            job.future = self._executor.submit(self._run, job)
+
+        logger.info(f"Queued optimization job {job.id}")
+        return job, False
+
+    def get(self, job_id: str) -> Optional[OptimizationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[OptimizationJob]:
+        """Request cancellation of a job; returns the job or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return job
+
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                self._finish(job, 'cancelled')
+            logger.info(f"Cancellation requested for job {job.id} ({job.status})")
+            return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'jobs': counts
+            }
+
+    def _run(self, job: OptimizationJob) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():
+                self._finish(job, 'cancelled')
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+
+        try:
+            result = run_portfolio_optimization(progress_callback=job.report_progress, **job.params)
+        except OptimizationCancelled:
+            with self._lock:
+                self._finish(job, 'cancelled')
+            return
+        except Exception as e:
+            logger.exception(f"Optimization job {job.id} crashed")
+            result = {'status': 'error', 'message': 'An unexpected internal error occurred.', 'error_type': type(e).__name__}
+
+        with self._lock:
+            job.result = result
+            if result.get('status') == 'error':
+                job.error = result.get('message')
+                self._finish(job, 'failed')
+            else:
+                self._finish(job, 'succeeded')
+
+    def _finish(self, job: OptimizationJob, status: str) -> None:
+        """Mark a job terminal (caller holds the lock)"""
+        job.status = status
+        job.finished_at = time.time()
+        if self._in_flight.get(job.fingerprint) == job.id:
+            del self._in_flight[job.fingerprint]
+
+    def _prune_finished(self) -> None:
+        """Forget terminal jobs older than the result TTL (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status not in ACTIVE_STATUSES and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Shared manager used by the optimization blueprint
+job_manager = OptimizationJobManager()
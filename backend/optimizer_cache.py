@@ -0,0 +1,155 @@
+"""
+In-process caches for portfolio optimizer inputs
+Memoizes estimator outputs keyed by ticker universe and price window
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for memoized mu / S estimates (0 disables the cache)
+ESTIMATOR_CACHE_MAX_BYTES = int(os.environ.get('ESTIMATOR_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Approximate the memory footprint of a cached value in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class SizedLRUCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values
+
+    Least recently used entries are evicted until the cache fits in max_bytes.
+    Values larger than the whole budget are never stored.
+    """
+
+    def __init__(self, max_bytes: int, name: str = 'cache'):
+        self.max_bytes = max(0, int(max_bytes))
+        self.name = name
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting least recently used entries as needed"""
+        size = estimate_nbytes(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+def universe_key(tickers) -> Tuple[str, ...]:
+    """Order-independent key for a ticker universe"""
+    return tuple(sorted(str(t).upper() for t in tickers))
+
+
+def price_window_fingerprint(prices: pd.DataFrame) -> Tuple:
+    """
+    Fingerprint a price window: date range, row count and a digest of the values
+
+    Args:
+        prices: Price DataFrame (dates x tickers)
+
+    Returns:
+        Hashable tuple identifying the window contents
+    """
+    if prices is None or prices.empty:
+        return ('empty',)
+
+    ordered = prices.reindex(columns=sorted(prices.columns))
+    values = np.ascontiguousarray(ordered.to_numpy(dtype=np.float64))
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+    return (
+        str(ordered.index[0]),
+        str(ordered.index[-1]),
+        int(ordered.shape[0]),
+        digest
+    )
+
+
+def estimator_cache_key(kind: str, prices: pd.DataFrame, method: str, params: Dict) -> Tuple:
+    """Build the cache key for an estimator result"""
+    return (
+        kind,
+        universe_key(prices.columns),
+        price_window_fingerprint(prices),
+        method,
+        tuple(sorted(params.items()))
+    )
+
+
+# Shared cache for expected returns and covariance estimates
+estimator_cache = SizedLRUCache(ESTIMATOR_CACHE_MAX_BYTES, name='estimators')
@@ -1813,16 +1813,29 @@
 import numpy as np
 import pandas as pd
 import yfinance as yf
-from pypfopt import EfficientFrontier, HRPOpt
+from pypfopt import EfficientFrontier
 from pypfopt import risk_models
-from pypfopt import expected_returns
 from pypfopt import objective_functions
-from pypfopt.discrete_allocation import DiscreteAllocation, get_latest_prices
+from pypfopt.discrete_allocation import get_latest_prices
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
 import time
 import requests
+from optimizer_cache import estimator_cache, estimator_cache_key, universe_key
+from estimators import ReturnMoments
+from frontier import sweep_frontier
+from factor_risk import solve_factor_objective, DEFAULT_FACTOR_COUNT
+from market_data import history_cache, quote_cache
+from rolling_covariance import rolling_covariance_store, ROLLING_COVARIANCE_METHODS
+from rebalance import solve_rebalance, build_trade_list, REBALANCE_OBJECTIVES, DEFAULT_TURNOVER_COST, TRADE_WEIGHT_TOLERANCE
+from black_litterman import black_litterman_returns
+from signals import signal_cache
+from hrp import (build_clustering, clustering_window_key, clustering_windows, hrp_weights, HRPClustering,
+                 HRP_CLUSTERING_REUSE_DAYS, HRP_LINKAGE_METHOD)
+from discrete_allocation import allocate_shares, allocation_tracking_error, DEFAULT_ALLOCATION_METHOD, LP_TIME_LIMIT_SECONDS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -1832,6 +1845,17 @@ DEFAULT_RISK_FREE_RATE = 0.02
 MIN_DATA_POINTS_FOR_COVARIANCE = 60
 YFINANCE_RETRIES = 3
 YFINANCE_RETRY_DELAY = 2
+# Slide stored covariance accumulators instead of re-estimating each window
+INCREMENTAL_COVARIANCE = os.environ.get('INCREMENTAL_COVARIANCE', '1') != '0'
+OBJECTIVES = ('max_sharpe', 'min_volatility', 'efficient_risk', 'efficient_return', 'hrp')
+MAX_OBJECTIVE_WORKERS = 4
+# Stages reported to progress callbacks, in order
+OPTIMIZATION_STAGES = ('fetching', 'estimating', 'solving', 'allocating')
+
+
+class OptimizationCancelled(Exception):
+    """Raised by a progress callback to abort a running optimization"""
+
 
 class PortfolioOptimizer:
     def __init__(self,
@@ -1859,6 +1883,10 @@ class PortfolioOptimizer:
         self.S = None
         self.ef = None
         self.hrp = None
+        self.black_litterman = None
+        self.risk_model = None
+        self._moments = None
+        self._moments_prices = None
 
         if self.predicted_returns is not None:
             self.predicted_returns.index = self.predicted_returns.index.str.upper()
@@ -1961,6 +1989,12 @@ class PortfolioOptimizer:
         failed_tickers = []
 
         for ticker in self.tickers:
+            # Repeat windows (same day) are served from memory
+            cached = history_cache.get(ticker, start_str, end_str)
+            if cached is not None:
+                all_data[ticker] = cached
+                continue
+
             success = False
             ticker_data = None
             
@@ -2006,7 +2040,9 @@ class PortfolioOptimizer:
                     logger.info(f"✓ Fetched {len(fallback_data)} rows for {ticker} via fallback")
                     success = True
             
-            if not success:
+            if success:
+                history_cache.put(ticker, start_str, end_str, all_data[ticker])
+            else:
                 logger.error(f"✗ Failed to fetch data for {ticker}")
                 failed_tickers.append(ticker)
 
@@ -2015,8 +2051,10 @@ class PortfolioOptimizer:
             logger.error(error_msg)
             raise ConnectionError(error_msg)
 
-        # Combine all successful ticker data
+        # Combine all successful ticker data; record each ticker's last close
+        # before filling so quotes keep their own bar dates
         self.prices = pd.concat(all_data.values(), axis=1)
+        quote_cache.update_from_prices(self.prices)
         self.prices = self.prices.ffill().bfill()
         self.prices = self.prices.dropna(axis=1, how='all')
         self.prices = self.prices.dropna(axis=0, how='all')
@@ -2033,7 +2071,12 @@ class PortfolioOptimizer:
         return self.prices
 
     def calculate_expected_returns(self, method: str = 'mean', **kwargs) -> pd.Series:
-        """Calculate expected returns"""
+        """
+        Calculate expected returns
+
+        'black_litterman' needs the covariance first; it is computed with the
+        covariance_method / n_factors kwargs when S is not set yet.
+        """
         if self.prices is None or self.prices.empty or self.prices.shape[0] < 2:
             logger.info("Fetching price data for expected returns...")
             self.fetch_historical_data()
@@ -2057,82 +2100,156 @@ class PortfolioOptimizer:
                 logger.info("Using predicted returns")
                 return self.mu
 
-        logger.info(f"Calculating historical returns: {method}")
+        if method == 'black_litterman':
+            return self._black_litterman_returns(**kwargs)
+
         freq = kwargs.get('frequency', 252)
+        params = {'frequency': freq}
+        if method == 'capm':
+            params['risk_free_rate'] = kwargs.get('risk_free_rate', DEFAULT_RISK_FREE_RATE)
+        elif method == 'ema':
+            params['span'] = kwargs.get('span', 20)
+
+        cache_key = estimator_cache_key('expected_returns', self.prices, method, params)
+        cached = estimator_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached historical returns: {method}")
+            self.mu = cached.copy()
+            return self.mu
+
+        logger.info(f"Calculating historical returns: {method}")
 
         try:
             if self.prices.shape[0] < 2:
                 raise ValueError(f"Need at least 2 data points, have {self.prices.shape[0]}")
 
+            moments = self._get_moments(freq)
             if method == 'capm':
-                risk_free_rate = kwargs.get('risk_free_rate', DEFAULT_RISK_FREE_RATE)
-                self.mu = expected_returns.capm_return(
-                    self.prices, risk_free_rate=risk_free_rate, frequency=freq
-                )
+                self.mu = moments.capm_return(risk_free_rate=params['risk_free_rate'])
             elif method == 'ema':
-                try:
-                    self.mu = expected_returns.ema_historical_return(
-                        self.prices, frequency=freq, span=kwargs.get('span', 20)
-                    )
-                except ValueError as e:
-                    logger.warning(f"EMA failed ({e}), using mean")
-                    self.mu = expected_returns.mean_historical_return(self.prices, frequency=freq)
+                self.mu = moments.ema_return(span=params['span'])
             else:
-                self.mu = expected_returns.mean_historical_return(self.prices, frequency=freq)
+                self.mu = moments.mean_return()
             
+            estimator_cache.put(cache_key, self.mu.copy())
             return self.mu
         except Exception as e:
             logger.error(f"Error calculating returns: {e}", exc_info=True)
             raise
 
+    def _black_litterman_returns(self, **kwargs) -> pd.Series:
+        """
+        Posterior returns from the equilibrium prior and cached signal views
+
+        Views come from one snapshot of the signal cache for the whole
+        universe; no sentiment or price model is called here. Signals change
+        between requests, so the result is not memoized.
+        """
+        if self.S is None:
+            self.calculate_covariance_matrix(
+                method=kwargs.get('covariance_method', 'ledoit_wolf'),
+                n_factors=kwargs.get('n_factors', DEFAULT_FACTOR_COUNT)
+            )
+        cov = self.S.loc[self.tickers, self.tickers]
+        self.mu, self.black_litterman = black_litterman_returns(
+            cov,
+            signal_cache.snapshot(self.tickers),
+            risk_free_rate=kwargs.get('risk_free_rate', DEFAULT_RISK_FREE_RATE)
+        )
+        return self.mu
+
     def calculate_covariance_matrix(self, method: str = 'ledoit_wolf', **kwargs) -> pd.DataFrame:
-        """Calculate covariance matrix"""
+        """
+        Calculate covariance matrix
+
+        sample_cov, exp_cov and constant-variance ledoit_wolf go through the
+        shared rolling covariance store (unless incremental=False), so a window
+        that moved forward by a few days only applies those days.
+        """
         if self.prices is None or self.prices.empty or self.prices.shape[0] < MIN_DATA_POINTS_FOR_COVARIANCE:
             logger.info(f"Fetching price data for covariance (need {MIN_DATA_POINTS_FOR_COVARIANCE} rows)...")
             self.fetch_historical_data()
             if self.prices is None or self.prices.empty or self.prices.shape[0] < MIN_DATA_POINTS_FOR_COVARIANCE:
                 raise ValueError(f"Insufficient data: {self.prices.shape[0]} rows")
 
-        logger.info(f"Calculating covariance: {method}")
         freq = kwargs.get('frequency', 252)
+        params = {'frequency': freq}
+        if method == 'ledoit_wolf':
+            params['shrinkage_target'] = kwargs.get('shrinkage_target', 'constant_variance')
+        elif method == 'exp_cov':
+            params['span'] = kwargs.get('span', 180)
+        elif method == 'factor_model':
+            params['n_factors'] = kwargs.get('n_factors', DEFAULT_FACTOR_COUNT)
+
+        self.risk_model = None
+        if method == 'factor_model':
+            # Keep the factor form for sparse solves; S is only its dense view
+            cache_key = estimator_cache_key('factor_model', self.prices, method, params)
+            self.risk_model = estimator_cache.get_or_compute(
+                cache_key, lambda: self._get_moments(freq).factor_model(n_factors=params['n_factors'])
+            )
+            self.S = self.risk_model.covariance()
+            return self.S
+
+        cache_key = estimator_cache_key('covariance', self.prices, method, params)
+        cached = estimator_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached covariance: {method}")
+            self.S = cached.copy()
+            return self.S
+
+        logger.info(f"Calculating covariance: {method}")
 
         try:
             if self.prices.shape[0] < 2:
                 raise ValueError(f"Need at least 2 data points, have {self.prices.shape[0]}")
 
-            if method == 'ledoit_wolf':
-                shrinkage_target = kwargs.get('shrinkage_target', 'constant_variance')
-                self.S = risk_models.CovarianceShrinkage(
-                    self.prices, frequency=freq
-                ).ledoit_wolf(shrinkage_target=shrinkage_target)
+            moments = self._get_moments(freq)
+            incremental = kwargs.get('incremental', INCREMENTAL_COVARIANCE)
+            if incremental and method in ROLLING_COVARIANCE_METHODS and \
+                    params.get('shrinkage_target', 'constant_variance') == 'constant_variance':
+                span = None
+                if method == 'exp_cov':
+                    span = min(params['span'], self.prices.shape[0] - 1)
+                cov = rolling_covariance_store.estimate(
+                    moments.tickers, moments.index, moments.simple_returns, method, frequency=freq, span=span
+                )
+                self.S = pd.DataFrame(cov, index=moments.tickers, columns=moments.tickers)
+            elif method == 'ledoit_wolf':
+                if params['shrinkage_target'] == 'constant_variance':
+                    self.S = moments.ledoit_wolf()
+                else:
+                    self.S = risk_models.CovarianceShrinkage(
+                        self.prices, frequency=freq
+                    ).ledoit_wolf(shrinkage_target=params['shrinkage_target'])
             elif method == 'oracle_approximating':
-                self.S = risk_models.CovarianceShrinkage(
-                    self.prices, frequency=freq
-                ).oracle_approximating()
+                self.S = moments.oracle_approximating()
             elif method == 'exp_cov':
-                span = kwargs.get('span', 180)
+                span = params['span']
                 effective_span = min(span, self.prices.shape[0] - 1)
                 if effective_span != span:
                     logger.warning(f"Reduced span from {span} to {effective_span}")
-                self.S = risk_models.exp_cov(self.prices, frequency=freq, span=effective_span)
+                self.S = moments.exp_cov(span=effective_span)
             else:
-                self.S = risk_models.sample_cov(self.prices, frequency=freq)
+                self.S = moments.sample_cov()
 
             if self.S.empty or self.S.isnull().values.any():
                 raise ValueError(f"Covariance matrix is empty or has NaNs")
 
+            estimator_cache.put(cache_key, self.S.copy())
             return self.S
         except Exception as e:
             logger.error(f"Error calculating covariance: {e}", exc_info=True)
             raise
 
-    def _get_returns(self):
-        """Helper to get returns"""
-        if self.prices is None or self.prices.empty or self.prices.shape[0] < 2:
-            self.fetch_historical_data()
-        if self.prices is None or self.prices.empty or self.prices.shape[0] < 2:
-            raise ValueError("Insufficient price data for returns")
-        return expected_returns.returns_from_prices(self.prices)
+    def _get_moments(self, frequency: int = 252) -> ReturnMoments:
+        """Shared return moments for the current price window (rebuilt when prices change)"""
+        if (self._moments is None
+                or self._moments_prices is not self.prices
+                or self._moments.frequency != frequency):
+            self._moments = ReturnMoments(self.prices, frequency=frequency)
+            self._moments_prices = self.prices
+        return self._moments
 
     def optimize_portfolio(
         self,
@@ -2149,37 +2266,19 @@ class PortfolioOptimizer:
             logger.warning("Using HRP optimization")
             return self.optimize_hrp()
 
-        try:
-            if self.mu is None:
-                self.calculate_expected_returns()
-            if self.S is None:
-                self.calculate_covariance_matrix()
-        except ValueError as e:
-            logger.error(f"Failed to calculate inputs: {e}")
-            raise
-
-        if self.mu is None or self.S is None or self.mu.empty or self.S.empty:
-            raise ValueError("Missing expected returns or covariance matrix")
-
-        valid_tickers = self.S.index.tolist()
-        self.mu = self.mu.reindex(valid_tickers)
-        
-        if self.mu.isnull().any():
-            nan_tickers = self.mu[self.mu.isnull()].index.tolist()
-            logger.warning(f"Dropping NaN tickers: {', '.join(nan_tickers)}")
-            self.mu = self.mu.dropna()
-            valid_tickers = self.mu.index.tolist()
-            if not valid_tickers:
-                raise ValueError("No valid tickers after removing NaNs")
-            self.S = self.S.loc[valid_tickers, valid_tickers]
-            self.tickers = valid_tickers
+        self._prepare_mean_variance_inputs()
 
         logger.info(f"Optimizing for {objective} with {len(self.tickers)} tickers")
         
         actual_bounds = (-1, 1) if market_neutral else weight_bounds
 
+        if self.risk_model is not None:
+            return self._optimize_factor_model(
+                objective, target_return, target_risk, market_neutral, actual_bounds, risk_free_rate, gamma
+            )
+
         try:
-            self.ef = EfficientFrontier(
+            ef = EfficientFrontier(
                 expected_returns=self.mu,
                 cov_matrix=self.S,
                 weight_bounds=actual_bounds
@@ -2189,35 +2288,35 @@ class PortfolioOptimizer:
             raise
 
         if market_neutral:
-            self.ef.add_constraint(lambda w: np.sum(w) == 0)
+            ef.add_constraint(lambda w: np.sum(w) == 0)
             logger.info("Added market neutral constraint")
 
         if gamma > 0:
             try:
-                self.ef.add_objective(objective_functions.L2_reg, gamma=gamma)
+                ef.add_objective(objective_functions.L2_reg, gamma=gamma)
                 logger.info(f"Added L2 regularization (gamma={gamma})")
             except Exception as e:
                 logger.warning(f"Failed to add L2 regularization: {e}")
 
         try:
             if objective == 'max_sharpe':
-                self.ef.max_sharpe(risk_free_rate=risk_free_rate)
+                ef.max_sharpe(risk_free_rate=risk_free_rate)
             elif objective == 'min_volatility':
-                self.ef.min_volatility()
+                ef.min_volatility()
             elif objective == 'efficient_risk':
                 if target_risk is None:
                     raise ValueError("target_risk required")
-                self.ef.efficient_risk(target_volatility=target_risk)
+                ef.efficient_risk(target_volatility=target_risk)
             elif objective == 'efficient_return':
                 if target_return is None:
                     raise ValueError("target_return required")
-                self.ef.efficient_return(target_return=target_return)
+                ef.efficient_return(target_return=target_return)
             else:
                 raise ValueError(f"Unknown objective: {objective}")
 
-            weights = self.ef.weights
-            cleaned_weights = self.ef.clean_weights(cutoff=1e-4)
-            expected_return, volatility, sharpe = self.ef.portfolio_performance(
+            self.ef = ef
+            cleaned_weights = ef.clean_weights(cutoff=1e-4)
+            expected_return, volatility, sharpe = ef.portfolio_performance(
                 verbose=False, risk_free_rate=risk_free_rate
             )
             
@@ -2234,23 +2333,222 @@ class PortfolioOptimizer:
             logger.error(f"Optimization failed: {e}", exc_info=True)
             raise
 
+    def optimize_objectives(
+        self,
+        objectives: List[str],
+        target_return: Optional[float] = None,
+        target_risk: Optional[float] = None,
+        market_neutral: bool = False,
+        weight_bounds: Tuple[float, float] = (0, 1),
+        risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+        portfolio_value: Optional[float] = None,
+        gamma: float = 0.1,
+        allocation_method: str = DEFAULT_ALLOCATION_METHOD,
+        lp_time_limit: float = LP_TIME_LIMIT_SECONDS,
+        progress_callback: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Solve several objectives concurrently on the same prices, mu and S.
+
+        Inputs are fetched and estimated once up front; each objective then
+        runs in its own thread. Once all are solved, progress_callback (if
+        given) is called with 'allocating' and the share allocations run the
+        same way; it may raise to stop before them. A failing objective
+        yields an error block instead of failing the whole request.
+
+        Returns:
+            Dictionary objective -> {'status', 'optimization', 'allocation'} or error block
+        """
+        if self.prices is None:
+            self.fetch_historical_data()
+        self._prepare_mean_variance_inputs()
+        if 'hrp' in objectives:
+            self._hrp_clustering()
+
+        short_ratio = 0.5 if market_neutral else None
+
+        def solve(objective: str) -> Dict:
+            try:
+                optimization_result = self.optimize_portfolio(
+                    objective=objective,
+                    target_return=target_return,
+                    target_risk=target_risk,
+                    market_neutral=market_neutral,
+                    weight_bounds=weight_bounds,
+                    risk_free_rate=risk_free_rate,
+                    gamma=gamma
+                )
+                return {'status': 'success', 'optimization': optimization_result}
+            except Exception as e:
+                logger.error(f"Objective {objective} failed: {e}")
+                return {'status': 'error', 'message': str(e), 'error_type': type(e).__name__}
+
+        def allocate(objective: str, block: Dict) -> Dict:
+            if block['status'] != 'success':
+                return block
+            try:
+                allocation = self.get_discrete_allocation(
+                    weights=block['optimization']['weights'],
+                    portfolio_value=portfolio_value,
+                    short_ratio=short_ratio,
+                    method=allocation_method,
+                    lp_time_limit=lp_time_limit
+                )
+                return {**block, 'allocation': allocation}
+            except Exception as e:
+                logger.error(f"Allocation for {objective} failed: {e}")
+                return {'status': 'error', 'message': str(e), 'error_type': type(e).__name__}
+
+        unique_objectives = list(dict.fromkeys(objectives))
+        with ThreadPoolExecutor(max_workers=min(MAX_OBJECTIVE_WORKERS, len(unique_objectives))) as executor:
+            blocks = list(executor.map(solve, unique_objectives))
+            if portfolio_value is not None:
+                if progress_callback is not None:
+                    progress_callback('allocating')
+                blocks = list(executor.map(allocate, unique_objectives, blocks))
+        return dict(zip(unique_objectives, blocks))
+
+    def _prepare_mean_variance_inputs(self) -> None:
+        """Ensure mu and S exist and are aligned on the same tickers"""
+        try:
+            if self.mu is None:
+                self.calculate_expected_returns()
+            if self.S is None:
+                self.calculate_covariance_matrix()
+        except ValueError as e:
+            logger.error(f"Failed to calculate inputs: {e}")
+            raise
+
+        if self.mu is None or self.S is None or self.mu.empty or self.S.empty:
+            raise ValueError("Missing expected returns or covariance matrix")
+
+        valid_tickers = self.S.index.tolist()
+        self.mu = self.mu.reindex(valid_tickers)
+        
+        if self.mu.isnull().any():
+            nan_tickers = self.mu[self.mu.isnull()].index.tolist()
+            logger.warning(f"Dropping NaN tickers: {', '.join(nan_tickers)}")
+            self.mu = self.mu.dropna()
+            valid_tickers = self.mu.index.tolist()
+            if not valid_tickers:
+                raise ValueError("No valid tickers after removing NaNs")
+            self.S = self.S.loc[valid_tickers, valid_tickers]
+            self.tickers = valid_tickers
+
+        if self.risk_model is not None and self.risk_model.tickers != valid_tickers:
+            self.risk_model = self.risk_model.subset(valid_tickers)
+
+    def efficient_frontier_sweep(
+        self,
+        n_points: int = 50,
+        market_neutral: bool = False,
+        weight_bounds: Tuple[float, float] = (0, 1),
+        risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+        gamma: float = 0.1,
+        n_workers: int = 1
+    ) -> Dict:
+        """Trace the efficient frontier over n_points target volatilities"""
+        self._prepare_mean_variance_inputs()
+
+        logger.info(f"Sweeping efficient frontier ({n_points} points) with {len(self.tickers)} tickers")
+        actual_bounds = (-1, 1) if market_neutral else weight_bounds
+
+        return sweep_frontier(
+            mu=self.mu.values,
+            cov=self.S.values,
+            tickers=self.S.index.tolist(),
+            n_points=n_points,
+            weight_bounds=actual_bounds,
+            market_neutral=market_neutral,
+            gamma=gamma,
+            risk_free_rate=risk_free_rate,
+            n_workers=n_workers,
+            risk_factor=self.risk_model.risk_factor() if self.risk_model is not None else None
+        )
+
+    def _optimize_factor_model(
+        self,
+        objective: str,
+        target_return: Optional[float],
+        target_risk: Optional[float],
+        market_neutral: bool,
+        weight_bounds: Tuple[float, float],
+        risk_free_rate: float,
+        gamma: float
+    ) -> Dict:
+        """Mean-variance solve with variance expressed through factor exposures"""
+        weights = solve_factor_objective(
+            self.risk_model,
+            self.mu.values,
+            objective,
+            weight_bounds=weight_bounds,
+            market_neutral=market_neutral,
+            gamma=gamma,
+            risk_free_rate=risk_free_rate,
+            target_risk=target_risk,
+            target_return=target_return
+        )
+
+        expected_return = float(self.mu.values @ weights)
+        volatility = self.risk_model.portfolio_volatility(weights)
+        sharpe = (expected_return - risk_free_rate) / volatility if volatility > 1e-9 else 0
+
+        logger.info(f"Factor model optimization successful. Return: {expected_return:.2%}, Vol: {volatility:.2%}, Sharpe: {sharpe:.2f}")
+
+        return {
+            'weights': {t: float(w) for t, w in zip(self.risk_model.tickers, weights) if abs(w) > 1e-4},
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'sharpe_ratio': sharpe
+        }
+
+    def _hrp_clustering(self, linkage_method: str = HRP_LINKAGE_METHOD) -> HRPClustering:
+        """
+        Correlation, linkage and quasi-diagonal order for the current window
+
+        Cached per universe and exact window (clustering_window_key). With
+        HRP_CLUSTERING_REUSE_DAYS set, a window may instead reuse the tree of
+        a recent earlier window that ends on or before its own end, and only
+        the recursive bisection uses the current covariance.
+        """
+        if self.prices is None or self.prices.empty or self.prices.shape[0] < 3:
+            self.fetch_historical_data()
+        if self.prices is None or self.prices.empty or self.prices.shape[0] < 3:
+            raise ValueError("Insufficient price data for returns")
+
+        scope = (universe_key(self.prices.columns), linkage_method)
+        window = clustering_window_key(self.prices.index)
+        clustering = estimator_cache.get(('hrp_clustering', *scope, window))
+        if clustering is None and HRP_CLUSTERING_REUSE_DAYS > 0:
+            for earlier in clustering_windows.reusable(scope, window, HRP_CLUSTERING_REUSE_DAYS):
+                clustering = estimator_cache.get(('hrp_clustering', *scope, earlier))
+                if clustering is not None:
+                    logger.info(f"Reusing the HRP clustering of the window ending {earlier[1].date()}")
+                    break
+        if clustering is None:
+            moments = self._get_moments()
+            logger.info(f"Clustering {moments.n_assets} tickers on {moments.n_obs} returns for HRP")
+            clustering = build_clustering(moments.tickers, moments.gram / (moments.n_obs - 1), linkage_method)
+            estimator_cache.put(('hrp_clustering', *scope, window), clustering)
+            clustering_windows.add(scope, window)
+        self.hrp = clustering
+        return self.hrp
+
     def optimize_hrp(self) -> Dict:
         """HRP optimization"""
         logger.info("Starting HRP optimization...")
         try:
-            returns = self._get_returns()
-            if returns.empty or returns.shape[0] < 2:
-                raise ValueError(f"Insufficient returns data: {returns.shape[0]} rows")
-
-            logger.info(f"HRP on returns shape: {returns.shape}")
-            self.hrp = HRPOpt(returns)
-            hrp_weights = self.hrp.optimize(linkage_method='ward')
+            clustering = self._hrp_clustering()
+            # Allocate with this window's covariance; the tree may come from an earlier window
+            moments = self._get_moments()
+            cov = pd.DataFrame(moments.gram / (moments.n_obs - 1), index=moments.tickers, columns=moments.tickers)
+            weights = hrp_weights(clustering, cov.loc[clustering.tickers, clustering.tickers].values).to_dict()
 
-            expected_return, volatility, sharpe = self._calculate_performance(hrp_weights)
+            expected_return, volatility, sharpe = self._calculate_performance(weights)
 
             logger.info(f"HRP complete. Return: {expected_return:.2%}, Vol: {volatility:.2%}, Sharpe: {sharpe:.2f}")
             
-            cleaned_weights = {k: v for k, v in hrp_weights.items() if abs(v) > 1e-4}
+            cleaned_weights = {k: v for k, v in weights.items() if abs(v) > 1e-4}
             return {
                 'weights': cleaned_weights,
                 'expected_return': expected_return,
@@ -2286,13 +2584,42 @@ class PortfolioOptimizer:
         
         return expected_return, volatility, sharpe
 
+    def _latest_prices(self, tickers: List[str]) -> pd.Series:
+        """
+        Latest prices for tickers without a network round-trip when possible
+
+        Prefers the loaded history when recent, then the shared quote cache
+        (which only goes to the network for missing or stale tickers).
+        """
+        latest_prices = pd.Series(dtype=float)
+        if self.prices is not None and not self.prices.empty and \
+                (datetime.now() - self.prices.index.max()).days <= quote_cache.max_age_days:
+            logger.info("Using existing prices for latest")
+            latest_prices = get_latest_prices(self.prices).dropna()
+
+        missing = [t for t in tickers if t not in latest_prices.index]
+        if missing:
+            latest_prices = pd.concat([latest_prices, quote_cache.latest_prices(missing)])
+        return latest_prices.dropna()
+
     def get_discrete_allocation(
         self,
         weights: Dict,
         portfolio_value: float = 10000,
-        short_ratio: Optional[float] = None
+        short_ratio: Optional[float] = None,
+        method: str = DEFAULT_ALLOCATION_METHOD,
+        lp_time_limit: float = LP_TIME_LIMIT_SECONDS
     ) -> Dict:
-        """Convert weights to discrete shares"""
+        """
+        Convert weights to discrete shares
+
+        Args:
+            weights: Continuous weights {ticker: weight}
+            portfolio_value: Total value to allocate
+            short_ratio: Short book size as a fraction of portfolio_value
+            method: 'greedy' (largest remainder, default) or 'lp' (time-limited integer refinement)
+            lp_time_limit: Seconds allowed for the integer program when method='lp'
+        """
         if not weights:
             logger.warning("Empty weights")
             return {
@@ -2301,7 +2628,9 @@ class PortfolioOptimizer:
                 'leftover_cash': portfolio_value,
                 'total_allocated_value': 0,
                 'initial_portfolio_value': portfolio_value,
-                'latest_prices_used': {}
+                'latest_prices_used': {},
+                'allocation_method': method,
+                'tracking': None
             }
         
         if portfolio_value <= 0:
@@ -2314,17 +2643,7 @@ class PortfolioOptimizer:
             if not relevant_tickers:
                 raise ValueError("No tickers in weights")
             
-            # Try to get latest prices
-            prices_to_use = None
-            if self.prices is not None and not self.prices.empty:
-                if (datetime.now() - self.prices.index.max()).days <= 5:
-                    prices_to_use = self.prices
-                    logger.info("Using existing prices for latest")
-            
-            latest_prices = get_latest_prices(
-                prices_to_use if prices_to_use is not None else relevant_tickers
-            )
-            latest_prices = latest_prices.dropna()
+            latest_prices = self._latest_prices(relevant_tickers)
             
             missing = set(relevant_tickers) - set(latest_prices.index)
             if missing:
@@ -2339,7 +2658,9 @@ class PortfolioOptimizer:
                         'leftover_cash': portfolio_value,
                         'total_allocated_value': 0,
                         'initial_portfolio_value': portfolio_value,
-                        'latest_prices_used': {}
+                        'latest_prices_used': {},
+                        'allocation_method': method,
+                        'tracking': None
                     }
                 
                 total_weight = sum(weights.values())
@@ -2361,13 +2682,21 @@ class PortfolioOptimizer:
             if not final_weights:
                 raise ValueError("No valid weights after price alignment")
             
-            da = DiscreteAllocation(
+            alloc, leftover, method_used = allocate_shares(
                 final_weights,
-                latest_prices.reindex(final_weights.keys()),
-                total_portfolio_value=portfolio_value,
-                short_ratio=short_ratio
+                latest_prices,
+                portfolio_value,
+                short_ratio=short_ratio,
+                method=method,
+                time_limit=lp_time_limit
+            )
+            tracking = allocation_tracking_error(
+                pd.Series(final_weights, dtype=float),
+                pd.Series(alloc, dtype=float),
+                latest_prices,
+                portfolio_value,
+                cov_matrix=self.S
             )
-            alloc, leftover = da.lp_portfolio()
             
             allocated_details = {}
             total_allocated = 0
@@ -2388,7 +2717,8 @@ class PortfolioOptimizer:
                 reverse=True
             ))
             
-            logger.info(f"Discrete allocation complete. Leftover: ${leftover:.2f}")
+            logger.info(f"Discrete allocation complete ({method_used}). Leftover: ${leftover:.2f}, "
+                        f"weight RMSE: {tracking['weight_rmse']:.4f}")
             
             return {
                 'allocation_shares': alloc,
@@ -2399,12 +2729,181 @@ class PortfolioOptimizer:
                 'latest_prices_used': {
                     t: round(p, 2)
                     for t, p in latest_prices.reindex(final_weights.keys()).to_dict().items()
-                }
+                },
+                'allocation_method': method_used,
+                'tracking': tracking
             }
         except Exception as e:
             logger.error(f"Error during discrete allocation: {e}", exc_info=True)
             raise ValueError(f"Discrete allocation failed: {e}")
 
+    def current_weights(self, holdings: Dict[str, float], cash: float = 0.0) -> Tuple[pd.Series, float, pd.Series]:
+        """
+        Value current share holdings at the latest prices
+
+        Args:
+            holdings: {ticker: shares} currently held
+            cash: Uninvested cash counted in the portfolio value
+
+        Returns:
+            (weights aligned to self.tickers, total portfolio value, latest prices used)
+        """
+        shares = pd.Series({str(t).upper(): float(n) for t, n in holdings.items()}, dtype=float)
+        try:
+            latest_prices = self._latest_prices(sorted(set(self.tickers) | set(shares.index)))
+        except Exception as e:
+            logger.error(f"Error fetching latest prices: {e}", exc_info=True)
+            raise ConnectionError(f"Failed to fetch latest prices: {e}")
+
+        untracked = [t for t in shares.index if t not in self.tickers or t not in latest_prices.index]
+        if untracked:
+            logger.warning(f"Holdings outside the optimized universe are left untouched: {', '.join(untracked)}")
+
+        values = (shares.drop(untracked) * latest_prices.reindex(shares.drop(untracked).index)).reindex(self.tickers).fillna(0.0)
+        total_value = float(values.sum() + cash)
+        if total_value <= 0:
+            raise ValueError("Current holdings and cash must have a positive total value")
+        return values / total_value, total_value, latest_prices
+
+    def optimize_rebalance(
+        self,
+        current_weights: pd.Series,
+        objective: str = 'max_sharpe',
+        turnover_cost: float = DEFAULT_TURNOVER_COST,
+        target_return: Optional[float] = None,
+        target_risk: Optional[float] = None,
+        market_neutral: bool = False,
+        weight_bounds: Tuple[float, float] = (0, 1),
+        risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+        gamma: float = 0.1
+    ) -> Dict:
+        """
+        Optimize from the current portfolio with a turnover penalty
+
+        max_sharpe is not convex once a trading cost is added, so it is run as
+        efficient_risk at the volatility of the cost-free max-Sharpe portfolio:
+        the same risk level, with return traded off against turnover.
+        """
+        if objective not in REBALANCE_OBJECTIVES:
+            raise ValueError(f"Turnover-aware rebalancing supports: {', '.join(REBALANCE_OBJECTIVES)}")
+
+        self._prepare_mean_variance_inputs()
+        tickers = self.S.index.tolist()
+        previous = current_weights.reindex(tickers).fillna(0.0).to_numpy()
+        actual_bounds = (-1, 1) if market_neutral else weight_bounds
+        risk_factor = self.risk_model.risk_factor() if self.risk_model is not None else None
+
+        solve_objective = objective
+        target = target_risk if objective == 'efficient_risk' else target_return
+        if objective == 'max_sharpe':
+            tangency = self.optimize_portfolio(
+                objective='max_sharpe', market_neutral=market_neutral, weight_bounds=weight_bounds,
+                risk_free_rate=risk_free_rate, gamma=gamma
+            )
+            solve_objective, target = 'efficient_risk', tangency['volatility']
+        if solve_objective in ('efficient_risk', 'efficient_return') and target is None:
+            raise ValueError(f"{'target_risk' if solve_objective == 'efficient_risk' else 'target_return'} required")
+
+        logger.info(f"Rebalancing for {objective} with {len(tickers)} tickers (turnover cost {turnover_cost})")
+        weights = solve_rebalance(
+            tickers, self.mu.values, self.S.values, previous, solve_objective,
+            turnover_cost=turnover_cost, target=target, weight_bounds=actual_bounds,
+            market_neutral=market_neutral, gamma=gamma, risk_factor=risk_factor
+        )
+        weights = np.where(np.abs(weights - previous) < TRADE_WEIGHT_TOLERANCE, previous, weights)
+
+        expected_return = float(self.mu.values @ weights)
+        volatility = float(np.sqrt(max(weights @ self.S.values @ weights, 0.0)))
+        sharpe = (expected_return - risk_free_rate) / volatility if volatility > 1e-9 else 0
+        traded = float(np.abs(weights - previous).sum())
+
+        logger.info(f"Rebalance solved. Return: {expected_return:.2%}, Vol: {volatility:.2%}, Turnover: {traded / 2:.2%}")
+        return {
+            'weights': {t: float(w) for t, w in zip(tickers, weights) if abs(w) > 1e-4},
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'sharpe_ratio': sharpe,
+            'turnover': traded / 2,
+            'estimated_cost_rate': traded * turnover_cost,
+            'solved_as': solve_objective
+        }
+
+    def get_rebalance_trades(
+        self,
+        target_weights: Dict[str, float],
+        current_weights: pd.Series,
+        holdings: Dict[str, float],
+        total_value: float,
+        latest_prices: pd.Series,
+        method: str = DEFAULT_ALLOCATION_METHOD,
+        lp_time_limit: float = LP_TIME_LIMIT_SECONDS
+    ) -> Dict:
+        """
+        Turn target weights into share deltas against current holdings
+
+        Positions the optimizer left unchanged keep their exact share count;
+        only the traded names are rounded to whole shares, within the value
+        the untouched positions leave over.
+        """
+        current_shares = pd.Series({str(t).upper(): float(n) for t, n in holdings.items()}, dtype=float)
+        target = pd.Series(target_weights, dtype=float).reindex(self.tickers).fillna(0.0)
+        current = current_weights.reindex(self.tickers).fillna(0.0)
+
+        traded_names = target.index[(target - current).abs() >= TRADE_WEIGHT_TOLERANCE]
+        kept_shares = current_shares.reindex(self.tickers).fillna(0.0).drop(traded_names)
+        kept_value = float((kept_shares * latest_prices.reindex(kept_shares.index)).sum())
+        budget = total_value * float(target[traded_names].sum()) if len(traded_names) else 0.0
+
+        new_shares = pd.Series(dtype=float)
+        leftover = total_value - kept_value
+        method_used = None
+        traded_weights = target[traded_names]
+        traded_weights = traded_weights[traded_weights.abs() > 0]
+        if not traded_weights.empty and budget > 0:
+            alloc, leftover_budget, method_used = allocate_shares(
+                (traded_weights / traded_weights.sum()).to_dict(),
+                latest_prices,
+                budget,
+                method=method,
+                time_limit=lp_time_limit
+            )
+            new_shares = pd.Series(alloc, dtype=float)
+            leftover = total_value - kept_value - (budget - leftover_budget)
+
+        target_shares = pd.concat([kept_shares[kept_shares != 0], new_shares])
+        trades = build_trade_list(current_shares.reindex(self.tickers).dropna(), target_shares, latest_prices)
+
+        return {
+            'trades': trades,
+            'trade_count': len(trades),
+            'traded_value': round(sum(trade['value'] for trade in trades), 2),
+            'target_shares': {t: float(n) for t, n in target_shares.items()},
+            'cash_after_trades': round(leftover, 2),
+            'portfolio_value': round(total_value, 2),
+            'allocation_method': method_used
+        }
+
+
+def _format_optimization(optimization_result: Dict) -> Dict:
+    return {
+        'expected_annual_return': optimization_result['expected_return'],
+        'annual_volatility': optimization_result['volatility'],
+        'sharpe_ratio': optimization_result['sharpe_ratio'],
+        'weights': {k: v for k, v in optimization_result['weights'].items() if abs(v) > 0.0001}
+    }
+
+
+def _format_allocation(allocation_result: Dict) -> Dict:
+    return {
+        'shares_per_ticker': allocation_result['allocation_shares'],
+        'details_per_ticker': allocation_result['allocation_details'],
+        'total_allocated_value': allocation_result['total_allocated_value'],
+        'leftover_cash': allocation_result['leftover_cash'],
+        'latest_prices_used': allocation_result['latest_prices_used'],
+        'allocation_method': allocation_result.get('allocation_method'),
+        'tracking': allocation_result.get('tracking')
+    }
+
 
 def run_portfolio_optimization(
     tickers: List[str],
@@ -2417,13 +2916,153 @@ def run_portfolio_optimization(
     portfolio_value: float = 10000,
     risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
     expected_returns_method: str = 'mean',
-    covariance_method: str = 'ledoit_wolf'
+    covariance_method: str = 'ledoit_wolf',
+    n_factors: int = DEFAULT_FACTOR_COUNT,
+    objectives: Optional[List[str]] = None,
+    allocation_method: str = DEFAULT_ALLOCATION_METHOD,
+    lp_time_limit: float = LP_TIME_LIMIT_SECONDS,
+    current_holdings: Optional[Dict[str, float]] = None,
+    cash: float = 0.0,
+    turnover_cost: float = DEFAULT_TURNOVER_COST,
+    progress_callback: Optional[Callable[[str], None]] = None
 ) -> Dict:
-    """High-level portfolio optimization function"""
+    """
+    High-level portfolio optimization function
+
+    When objectives is given, prices, mu and S are computed once and every
+    objective is solved concurrently; the response then carries one result
+    block per objective under 'results' instead of a single optimization.
+
+    allocation_method selects how weights become whole shares: 'greedy'
+    (largest remainder) or 'lp' (greedy refined by an integer program that
+    must finish within lp_time_limit seconds).
+
+    When current_holdings ({ticker: shares}) is given the run rebalances
+    instead: the portfolio value is the holdings plus cash, the objective is
+    penalized by turnover_cost per unit of traded weight and the response
+    carries a trade list under 'rebalance' instead of a full allocation.
+
+    progress_callback is called with each entry of OPTIMIZATION_STAGES as the
+    run reaches it and may raise OptimizationCancelled to abort the run.
+    """
+    def report(stage: str) -> None:
+        if progress_callback is not None:
+            progress_callback(stage)
+
     optimizer = None
     try:
         logger.info("--- Starting Portfolio Optimization ---")
+        if current_holdings is not None:
+            if objectives:
+                raise ValueError("Rebalancing from current holdings takes a single objective")
+            if market_neutral:
+                raise ValueError("Rebalancing from current holdings does not support market_neutral portfolios")
+            tickers = list(dict.fromkeys(list(tickers) + [str(t).upper() for t in current_holdings]))
         optimizer = PortfolioOptimizer(tickers, predicted_returns=predicted_returns)
+        report('fetching')
+        optimizer.fetch_historical_data()
+        report('estimating')
+        optimizer.calculate_expected_returns(
+            method=expected_returns_method,
+            risk_free_rate=risk_free_rate,
+            covariance_method=covariance_method,
+            n_factors=n_factors
+        )
+        optimizer.calculate_covariance_matrix(method=covariance_method, n_factors=n_factors)
+
+        parameters = {
+            'initial_tickers': tickers,
+            'objective': objective,
+            'target_return': target_return,
+            'target_risk': target_risk,
+            'market_neutral': market_neutral,
+            'weight_bounds': weight_bounds,
+            'portfolio_value': portfolio_value,
+            'risk_free_rate': risk_free_rate,
+            'predicted_returns_used': optimizer.predicted_returns is not None,
+            'historical_returns_method': expected_returns_method if optimizer.predicted_returns is None else None,
+            'covariance_method': covariance_method,
+            'n_factors': n_factors if covariance_method == 'factor_model' else None,
+            'allocation_method': allocation_method,
+            'black_litterman': optimizer.black_litterman
+        }
+
+        report('solving')
+        if current_holdings is not None:
+            current, total_value, latest_prices = optimizer.current_weights(current_holdings, cash)
+            optimization_result = optimizer.optimize_rebalance(
+                current,
+                objective=objective,
+                turnover_cost=turnover_cost,
+                target_return=target_return,
+                target_risk=target_risk,
+                weight_bounds=weight_bounds,
+                risk_free_rate=risk_free_rate
+            )
+
+            report('allocating')
+            rebalance = optimizer.get_rebalance_trades(
+                optimization_result['weights'],
+                current,
+                current_holdings,
+                total_value,
+                latest_prices,
+                method=allocation_method,
+                lp_time_limit=lp_time_limit
+            )
+
+            optimization = _format_optimization(optimization_result)
+            optimization.update({
+                'turnover': optimization_result['turnover'],
+                'estimated_cost': round(optimization_result['estimated_cost_rate'] * total_value, 2),
+                'solved_as': optimization_result['solved_as']
+            })
+            parameters.update({'portfolio_value': total_value, 'cash': cash, 'turnover_cost': turnover_cost})
+
+            logger.info(f"--- Rebalance Finished: {rebalance['trade_count']} trades ---")
+            return {
+                'status': 'success',
+                'tickers_optimized': optimizer.tickers,
+                'parameters': parameters,
+                'optimization': optimization,
+                'rebalance': rebalance
+            }
+
+        if objectives:
+            blocks = optimizer.optimize_objectives(
+                objectives,
+                target_return=target_return,
+                target_risk=target_risk,
+                market_neutral=market_neutral,
+                weight_bounds=weight_bounds,
+                risk_free_rate=risk_free_rate,
+                portfolio_value=portfolio_value,
+                allocation_method=allocation_method,
+                lp_time_limit=lp_time_limit,
+                progress_callback=progress_callback
+            )
+            if all(block['status'] == 'error' for block in blocks.values()):
+                raise ValueError('; '.join(f"{obj}: {block['message']}" for obj, block in blocks.items()))
+
+            results = {}
+            for obj, block in blocks.items():
+                if block['status'] == 'success':
+                    block = {
+                        'status': 'success',
+                        'optimization': _format_optimization(block['optimization']),
+                        'allocation': _format_allocation(block['allocation'])
+                    }
+                results[obj] = block
+
+            parameters['objective'] = None
+            parameters['objectives'] = list(results.keys())
+            logger.info("--- Portfolio Optimization Finished Successfully ---")
+            return {
+                'status': 'success',
+                'tickers_optimized': optimizer.tickers,
+                'parameters': parameters,
+                'results': results
+            }
         
         optimization_result = optimizer.optimize_portfolio(
             objective=objective,
@@ -2435,46 +3074,29 @@ def run_portfolio_optimization(
         )
         
         short_ratio = 0.5 if market_neutral else None
+        report('allocating')
         allocation_result = optimizer.get_discrete_allocation(
             weights=optimization_result['weights'],
             portfolio_value=portfolio_value,
-            short_ratio=short_ratio
+            short_ratio=short_ratio,
+            method=allocation_method,
+            lp_time_limit=lp_time_limit
         )
         
         response = {
             'status': 'success',
-            'tickers_optimized': optimizer.tickers if optimizer else [],
-            'parameters': {
-                'initial_tickers': tickers,
-                'objective': objective,
-                'target_return': target_return,
-                'target_risk': target_risk,
-                'market_neutral': market_neutral,
-                'weight_bounds': weight_bounds,
-                'portfolio_value': portfolio_value,
-                'risk_free_rate': risk_free_rate,
-                'predicted_returns_used': optimizer.predicted_returns is not None if optimizer else False,
-                'historical_returns_method': expected_returns_method if not (optimizer and optimizer.predicted_returns is not None) else None,
-                'covariance_method': covariance_method
-            },
-            'optimization': {
-                'expected_annual_return': optimization_result['expected_return'],
-                'annual_volatility': optimization_result['volatility'],
-                'sharpe_ratio': optimization_result['sharpe_ratio'],
-                'weights': {k: v for k, v in optimization_result['weights'].items() if abs(v) > 0.0001}
-            },
-            'allocation': {
-                'shares_per_ticker': allocation_result['allocation_shares'],
-                'details_per_ticker': allocation_result['allocation_details'],
-                'total_allocated_value': allocation_result['total_allocated_value'],
-                'leftover_cash': allocation_result['leftover_cash'],
-                'latest_prices_used': allocation_result['latest_prices_used']
-            }
+            'tickers_optimized': optimizer.tickers,
+            'parameters': parameters,
+            'optimization': _format_optimization(optimization_result),
+            'allocation': _format_allocation(allocation_result)
         }
         
         logger.info("--- Portfolio Optimization Finished Successfully ---")
         return response
         
+    except OptimizationCancelled:
+        logger.info("--- Portfolio Optimization Cancelled ---")
+        raise
     except (ValueError, ConnectionError) as ve:
         error_type = type(ve).__name__
         logger.error(f"Portfolio optimization failed ({error_type}): {str(ve)}", exc_info=False)
@@ -2492,6 +3114,73 @@ def run_portfolio_optimization(
         }
 
 
+def run_frontier_sweep(
+    tickers: List[str],
+    predicted_returns: Optional[Dict[str, float]] = None,
+    n_points: int = 50,
+    market_neutral: bool = False,
+    weight_bounds: Tuple[float, float] = (0, 1),
+    risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+    expected_returns_method: str = 'mean',
+    covariance_method: str = 'ledoit_wolf',
+    n_factors: int = DEFAULT_FACTOR_COUNT,
+    n_workers: int = 1
+) -> Dict:
+    """High-level efficient frontier sweep"""
+    try:
+        logger.info("--- Starting Efficient Frontier Sweep ---")
+        optimizer = PortfolioOptimizer(tickers, predicted_returns=predicted_returns)
+        optimizer.calculate_expected_returns(
+            method=expected_returns_method,
+            risk_free_rate=risk_free_rate,
+            covariance_method=covariance_method,
+            n_factors=n_factors
+        )
+        optimizer.calculate_covariance_matrix(method=covariance_method, n_factors=n_factors)
+
+        frontier = optimizer.efficient_frontier_sweep(
+            n_points=n_points,
+            market_neutral=market_neutral,
+            weight_bounds=weight_bounds,
+            risk_free_rate=risk_free_rate,
+            n_workers=n_workers
+        )
+
+        logger.info("--- Efficient Frontier Sweep Finished Successfully ---")
+        return {
+            'status': 'success',
+            'tickers_optimized': optimizer.tickers,
+            'parameters': {
+                'initial_tickers': tickers,
+                'n_points': n_points,
+                'market_neutral': market_neutral,
+                'weight_bounds': weight_bounds,
+                'risk_free_rate': risk_free_rate,
+                'predicted_returns_used': optimizer.predicted_returns is not None,
+                'historical_returns_method': expected_returns_method if optimizer.predicted_returns is None else None,
+                'covariance_method': covariance_method,
+                'n_factors': n_factors if covariance_method == 'factor_model' else None
+            },
+            'frontier': frontier
+        }
+
+    except (ValueError, ConnectionError) as ve:
+        error_type = type(ve).__name__
+        logger.error(f"Frontier sweep failed ({error_type}): {str(ve)}", exc_info=False)
+        return {
+            'status': 'error',
+            'message': str(ve),
+            'error_type': error_type
+        }
+    except Exception as e:
+        logger.exception("Unexpected error during frontier sweep")
+        return {
+            'status': 'error',
+            'message': 'An unexpected internal error occurred.',
+            'error_type': type(e).__name__
+        }
+
+
 if __name__ == '__main__':
     test_tickers = ["MSFT", "AAPL", "GOOG", "AMZN", "NVDA"]
     print("\n--- Testing Max Sharpe ---")
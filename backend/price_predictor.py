@@ -5,31 +5,77 @@ Loads pre-trained LSTM model and provides price forecasts with XAI
 
 import numpy as np
 import joblib
-from tensorflow import keras
-from tensorflow.keras import layers
 import shap
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import yfinance as yf
 from datetime import datetime, timedelta
 import os
+from windowing import sliding_windows, WindowNormalizer, rollout
+from xgb_forecaster import get_xgb_forecaster, volatility_confidence, volatility_return_std, build_forecast_results
+from model_metadata import read_model_metadata
+from model_registry import ModelSlot, PRICE_MODEL
+from engine_lifecycle import DerivedModelCache, KerasInference
+# TensorFlow / Keras are imported only by the 'keras' runtime, so the 'tflite'
+# runtime serves the LSTM through the TFLite interpreter alone
+
+# 'keras' loads the .h5 model; 'tflite' serves its exported artifacts (export_lightweight.py)
+MODEL_RUNTIMES = ('keras', 'tflite')
+PRICE_MODEL_RUNTIME = os.environ.get('PRICE_MODEL_RUNTIME', 'keras')
+
+# 'xgboost' rolls the TF-free XGBoost model; 'ensemble' blends it with the LSTM
+FORECAST_BACKENDS = ('lstm', 'xgboost', 'ensemble')
+# Weight of the XGBoost path in the ensemble
+ENSEMBLE_XGB_WEIGHT = float(os.environ.get('ENSEMBLE_XGB_WEIGHT', 0.5))
+# Stochastic forward passes per Monte Carlo dropout forecast
+MC_DROPOUT_SAMPLES = int(os.environ.get('MC_DROPOUT_SAMPLES', 100))
+INTERVAL_PERCENTILES = (5, 95)
+
+def mc_dropout_model(model):
+    """
+    Copy of a Sequential model's graph with dropout forced on
+    
+    Layers (and weights) are shared with model; only Dropout layers are
+    called with training=True, so BatchNormalization keeps using its moving
+    statistics, which model(x, training=True) would not.
+    """
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    
+    inputs = keras.Input(shape=model.input_shape[1:])
+    x = inputs
+    for layer in model.layers:
+        x = layer(x, training=True) if isinstance(layer, layers.Dropout) else layer(x)
+    return keras.Model(inputs, x)
 
 class LSTMPricePredictor:
     def __init__(self, model_path: str = 'models/sp500_lstm_model.h5', 
-                 scaler_path: str = 'models/scaler.joblib'):
+                 scaler_path: str = 'models/scaler.joblib',
+                 runtime: str = PRICE_MODEL_RUNTIME):
         """
         Initialize LSTM Price Predictor
         
         Args:
             model_path: Path to trained LSTM model
             scaler_path: Path to fitted scaler
+            runtime: One of MODEL_RUNTIMES
         """
-        print("Loading LSTM model...")
+        if runtime not in MODEL_RUNTIMES:
+            raise ValueError(f"Unknown runtime '{runtime}'. Use one of {MODEL_RUNTIMES}")
+        print(f"Loading LSTM model ({runtime} runtime)...")
         self.sequence_length = 60  # Standard for LSTM models
         self.model_loaded = False
+        self.runtime = runtime
         
+        if runtime == 'tflite':
+            # Exported artifacts must exist; there is no untrained fallback without Keras
+            from lite_runtime import LiteLSTM
+            self.model = LiteLSTM(model_path)
+            print(f"✅ TFLite model loaded (lookbacks {self.model.lookbacks[0]}-{self.model.lookbacks[-1]})")
+            self.model_loaded = True
         # Try loading existing model
-        if os.path.exists(model_path):
+        elif os.path.exists(model_path):
             try:
+                from tensorflow import keras
                 # Try loading with compile=False to avoid optimizer issues
                 self.model = keras.models.load_model(model_path, compile=False)
                 print(f"✅ LSTM model loaded successfully")
@@ -55,8 +101,34 @@ class LSTMPricePredictor:
             dummy_data = np.random.random((100, 1)) * 200
             self.scaler.fit(dummy_data)
         
-        print(f"   Model input shape: {self.model.input_shape}")
-        print(f"   Model output shape: {self.model.output_shape}")
+        # Input normalization the model was trained with (legacy models: global scaler)
+        self.metadata = read_model_metadata(model_path)
+        if self.metadata['normalization'] == 'window_relative':
+            self.normalizer = WindowNormalizer('window_relative')
+        else:
+            self.normalizer = WindowNormalizer.from_scaler(self.scaler)
+        # Days per forward pass: > 1 for direct multi-horizon models
+        self.horizon = int(self.metadata['horizon'])
+        print(f"   Input normalization: {self.normalizer.method}, horizon: {self.horizon}")
+        
+        # Fine-tuned per-ticker heads on top of this (shared) model; these are
+        # Keras clones, so the TFLite runtime serves the shared model only
+        if runtime == 'keras':
+            from ticker_models import TickerModelCache, ticker_models_dir
+            self.ticker_models = TickerModelCache(self.model, ticker_models_dir(model_path),
+                                                  self.normalizer.method, self.horizon)
+        else:
+            self.ticker_models = None
+        # Per-model thread-safe forward passes (and MC dropout twins), for the
+        # shared model and the fine-tuned ones in recent use
+        if runtime == 'keras':
+            max_models = self.ticker_models.max_models + 1
+            self._inference = DerivedModelCache(KerasInference, max_models)
+            self._mc_inference = DerivedModelCache(lambda m: KerasInference(mc_dropout_model(m)), max_models)
+        
+        if runtime == 'keras':
+            print(f"   Model input shape: {self.model.input_shape}")
+            print(f"   Model output shape: {self.model.output_shape}")
         
         if not self.model_loaded:
             print()
@@ -64,12 +136,20 @@ class LSTMPricePredictor:
             print("   Run 'python train_lstm_enhanced.py' to train with real data.")
         
         print()
-        print("📝 NOTE: Model was trained on S&P 500 (^GSPC) data.")
-        print("   Predictions for individual stocks use transfer learning.")
-        print("   For best results, retrain on specific stock data.")
+        if self.metadata.get('tickers'):
+            print(f"📝 NOTE: Shared model trained on {len(self.metadata['tickers'])} tickers.")
+        else:
+            print("📝 NOTE: Model was trained on S&P 500 (^GSPC) data.")
+            print("   Predictions for individual stocks use transfer learning.")
+        if self.ticker_models is not None:
+            print(f"   Fine-tuned tickers: {len(self.ticker_models.available())}")
+            print("   Train per-ticker heads with: python train_lstm_enhanced.py --fine-tune TICKER")
     
     def _create_new_model(self):
         """Create a new LSTM model architecture"""
+        from tensorflow import keras
+        from tensorflow.keras import layers
+        
         model = keras.Sequential([
             layers.Input(shape=(self.sequence_length, 1)),
             layers.LSTM(50, return_sequences=True),
@@ -84,6 +164,116 @@ class LSTMPricePredictor:
         print(f"✅ New model architecture created (untrained)")
         return model
     
+    def model_for(self, symbol: str):
+        """
+        Model to use for a symbol: its fine-tuned model (loaded lazily,
+        LRU-bounded) if there is one, else the shared model
+        """
+        if self.ticker_models is None:
+            return self.model
+        fine_tuned = self.ticker_models.get(str(symbol).upper())
+        return self.model if fine_tuned is None else fine_tuned
+    
+    def warmup(self) -> None:
+        """Forecast once on synthetic prices so the first request skips graph building"""
+        prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, self.sequence_length)))
+        self._rollout(self.model, prices[np.newaxis, :], self.horizon)
+    
+    @property
+    def xgb(self):
+        """Shared XGBoost forecaster (loaded on first use)"""
+        return get_xgb_forecaster()
+    
+    def _rollout(self, model, windows: np.ndarray, forecast_days: int) -> np.ndarray:
+        """
+        LSTM forecasts for a batch of raw price windows
+        
+        A direct multi-horizon model predicts self.horizon days per forward
+        pass, so forecasts up to its horizon take a single call; one-step
+        models feed predictions back in (see windowing.rollout).
+        
+        Args:
+            model: Keras model (or LiteLSTM) taking (N, lookback, 1)
+            windows: (N, lookback) raw prices
+            forecast_days: Number of days to forecast
+            
+        Returns:
+            (N, forecast_days) predicted prices
+        """
+        return rollout(self._predict_fn(model), self.normalizer, windows, forecast_days, self.horizon)
+    
+    def _predict_fn(self, model):
+        """Forward pass of model that request threads may call concurrently (see engine_lifecycle)"""
+        if self.runtime == 'tflite':
+            return model.predict
+        return self._inference.get(model)
+    
+    def _mc_model_for(self, model):
+        """Thread-safe forward pass of model's MC dropout twin, built once while the model stays in use"""
+        if self.runtime != 'keras':
+            # The exported graph has dropout folded away
+            raise ValueError("Forecast intervals need the Keras runtime (Monte Carlo dropout)")
+        return self._mc_inference.get(model)
+    
+    def forecast_intervals(self, model, history: np.ndarray, forecast_days: int, lookback_days: int,
+                           n_samples: int = MC_DROPOUT_SAMPLES, backend: str = 'lstm') -> Dict[str, np.ndarray]:
+        """
+        Monte Carlo dropout forecast distribution for one symbol
+        
+        The window is repeated n_samples times and rolled forward through the
+        model with dropout active, one (n_samples, lookback, 1) batch per step,
+        so each sample follows its own stochastic path at the cost of a
+        single batched call per step. For the ensemble the XGBoost forecast
+        is blended into every path.
+        
+        Args:
+            model: LSTM to sample
+            history: (T,) raw prices (T >= lookback_days)
+            forecast_days: Number of days to forecast
+            lookback_days: LSTM window length
+            n_samples: Number of stochastic forward passes
+            backend: 'lstm' or 'ensemble' (XGBoost has no dropout to sample)
+            
+        Returns:
+            {'mean', 'lower', 'upper'} arrays of shape (forecast_days,);
+            lower / upper are the INTERVAL_PERCENTILES of the sampled prices
+        """
+        if backend not in ('lstm', 'ensemble'):
+            raise ValueError("Forecast intervals need the LSTM (Monte Carlo dropout); use model 'lstm' or 'ensemble'")
+        
+        mc_model = self._mc_model_for(model)
+        windows = np.repeat(history[np.newaxis, -lookback_days:], n_samples, axis=0)
+        paths = rollout(mc_model, self.normalizer, windows, forecast_days, self.horizon)
+        if backend == 'ensemble':
+            xgb_forecast = self.xgb.rollout(history[np.newaxis, :], forecast_days)
+            paths = ENSEMBLE_XGB_WEIGHT * xgb_forecast + (1 - ENSEMBLE_XGB_WEIGHT) * paths
+        
+        lower, upper = np.percentile(paths, INTERVAL_PERCENTILES, axis=0)
+        return {'mean': paths.mean(axis=0), 'lower': lower, 'upper': upper}
+    
+    def _forecast(self, model, history: np.ndarray, forecast_days: int, lookback_days: int,
+                  backend: str = 'lstm') -> np.ndarray:
+        """
+        (N, forecast_days) price forecasts from the LSTM, XGBoost or their blend
+        
+        Args:
+            model: LSTM to use for the 'lstm' and 'ensemble' backends
+            history: (N, T) raw prices; the LSTM sees the last lookback_days,
+                XGBoost the last window_size it was trained on
+            forecast_days: Number of days to forecast
+            lookback_days: LSTM window length
+            backend: One of FORECAST_BACKENDS
+        """
+        if backend not in FORECAST_BACKENDS:
+            raise ValueError(f"Unknown model '{backend}'. Use one of {FORECAST_BACKENDS}")
+        if backend == 'lstm':
+            return self._rollout(model, history[:, -lookback_days:], forecast_days)
+        xgb_forecast = self.xgb.rollout(history, forecast_days)
+        if backend == 'xgboost':
+            return xgb_forecast
+        lstm_forecast = self._rollout(model, history[:, -lookback_days:], forecast_days)
+        return ENSEMBLE_XGB_WEIGHT * xgb_forecast + (1 - ENSEMBLE_XGB_WEIGHT) * lstm_forecast
+    
     def fetch_historical_data(self, symbol: str, days: int = 100) -> np.ndarray:
         """
         Fetch historical stock data with retry logic
@@ -148,24 +338,19 @@ class LSTMPricePredictor:
         
         sequence = prices[-self.sequence_length:]
         
-        # Reshape for scaler (needs 2D)
-        sequence_2d = sequence.reshape(-1, 1)
-        
-        # Scale
-        scaled_sequence = self.scaler.transform(sequence_2d)
-        
-        # Reshape for LSTM (samples, timesteps, features)
-        lstm_input = scaled_sequence.reshape(1, self.sequence_length, 1)
+        # Normalize and shape for LSTM (samples, timesteps, features)
+        lstm_input, _ = self.normalizer.normalize(sequence[np.newaxis, :])
         
         return lstm_input
     
-    def predict_next_days(self, symbol: str, days: int = 5) -> Dict:
+    def predict_next_days(self, symbol: str, days: int = 5, backend: str = 'lstm') -> Dict:
         """
         Predict next N days of prices
         
         Args:
             symbol: Stock symbol
             days: Number of days to predict (1-5)
+            backend: One of FORECAST_BACKENDS
             
         Returns:
             Dictionary with predictions and metadata
@@ -174,25 +359,11 @@ class LSTMPricePredictor:
             # Fetch historical data
             historical_prices = self.fetch_historical_data(symbol)
             current_price = historical_prices[-1]
-            
-            # Prepare predictions
-            predictions = []
-            sequence = historical_prices.copy()
+            model = self.model_for(symbol)
             
             # Predict iteratively
-            for i in range(days):
-                # Prepare input
-                lstm_input = self.prepare_sequence(sequence)
-                
-                # Predict
-                scaled_prediction = self.model.predict(lstm_input, verbose=0)
-                
-                # Inverse transform
-                prediction = self.scaler.inverse_transform(scaled_prediction)[0][0]
-                predictions.append(float(prediction))
-                
-                # Append prediction to sequence for next iteration
-                sequence = np.append(sequence, prediction)
+            predictions = [float(p) for p in self._forecast(model, historical_prices[np.newaxis, :], days,
+                                                            self.sequence_length, backend)[0]]
             
             # Calculate changes
             changes = []
@@ -221,6 +392,7 @@ class LSTMPricePredictor:
             
             return {
                 'symbol': symbol,
+                'model': backend,
                 'current_price': float(current_price),
                 'predictions': [
                     {
@@ -251,15 +423,7 @@ class LSTMPricePredictor:
         Returns:
             Confidence score (0-1)
         """
-        # Calculate historical volatility
-        returns = np.diff(historical) / historical[:-1]
-        volatility = np.std(returns)
-        
-        # Lower volatility = higher confidence
-        # Map volatility to confidence (0.5 to 0.95)
-        confidence = max(0.5, min(0.95, 1 - (volatility * 10)))
-        
-        return float(confidence)
+        return volatility_confidence(historical)
     
     def explain_with_shap(self, symbol: str, num_features: int = 10) -> Dict:
         """
@@ -275,22 +439,23 @@ class LSTMPricePredictor:
         try:
             # Fetch historical data
             historical_prices = self.fetch_historical_data(symbol)
+            model = self.model_for(symbol)
+            if self.runtime != 'keras':
+                # DeepExplainer needs the Keras graph
+                return self._fallback_explanation(symbol)
             
             # Prepare input
             lstm_input = self.prepare_sequence(historical_prices)
             
-            # Create background dataset (use recent history)
-            background_data = []
-            for i in range(min(20, len(historical_prices) - self.sequence_length)):
-                seq = historical_prices[i:i+self.sequence_length]
-                seq_2d = seq.reshape(-1, 1)
-                scaled = self.scaler.transform(seq_2d)
-                background_data.append(scaled.reshape(self.sequence_length, 1))
-            
-            background = np.array(background_data)
+            # Create background dataset (use recent history): windows are views
+            # into the history, normalized together in one array operation
+            # (the windows just before the explained one)
+            n_background = min(20, len(historical_prices) - self.sequence_length)
+            windows = sliding_windows(historical_prices, self.sequence_length)
+            background, _ = self.normalizer.normalize(windows[len(windows) - 1 - n_background:-1])
             
             # Create SHAP explainer
-            explainer = shap.DeepExplainer(self.model, background)
+            explainer = shap.DeepExplainer(model, background)
             
             # Get SHAP values
             shap_values = explainer.shap_values(lstm_input)
@@ -359,7 +524,8 @@ class LSTMPricePredictor:
         }
     
     def predict_with_historical_data(self, symbol: str, historical_prices: List[float], 
-                                     forecast_days: int = 5, lookback_days: int = 60) -> Dict:
+                                     forecast_days: int = 5, lookback_days: int = 60,
+                                     backend: str = 'lstm', mc_samples: int = 0, explain: bool = False) -> Dict:
         """
         Predict using provided historical data (no yfinance fetch)
         
@@ -368,6 +534,11 @@ class LSTMPricePredictor:
             historical_prices: List of historical closing prices
             forecast_days: Number of days to predict (1-10)
             lookback_days: Number of historical days to use (30-120)
+            backend: One of FORECAST_BACKENDS
+            mc_samples: If > 0, add Monte Carlo dropout intervals from this many samples
+            explain: Run SHAP on the last window (DeepExplainer for the LSTM,
+                hundreds of milliseconds or more per call); otherwise xai is the
+                simple explanation
             
         Returns:
             Dictionary with predictions and XAI
@@ -380,33 +551,19 @@ class LSTMPricePredictor:
             # Convert to numpy array
             prices = np.array(historical_prices, dtype=float)
             current_price = prices[-1]
+            model = self.model_for(symbol)
             
             # Use only the required lookback window
             sequence = prices[-lookback_days:]
             
-            # Prepare predictions
-            predictions = []
-            working_sequence = sequence.copy()
-            
             # Predict iteratively
-            for i in range(forecast_days):
-                # Prepare input (use last lookback_days)
-                input_seq = working_sequence[-lookback_days:]
-                
-                # Reshape for scaler
-                seq_2d = input_seq.reshape(-1, 1)
-                scaled_seq = self.scaler.transform(seq_2d)
-                
-                # Reshape for LSTM
-                lstm_input = scaled_seq.reshape(1, lookback_days, 1)
-                
-                # Predict
-                scaled_prediction = self.model.predict(lstm_input, verbose=0)
-                prediction = self.scaler.inverse_transform(scaled_prediction)[0][0]
-                predictions.append(float(prediction))
-                
-                # Append to sequence for next iteration
-                working_sequence = np.append(working_sequence, prediction)
+            predictions = [float(p) for p in self._forecast(model, prices[np.newaxis, :], forecast_days,
+                                                            lookback_days, backend)[0]]
+            
+            # Forecast distribution
+            intervals = None
+            if mc_samples > 0:
+                intervals = self.forecast_intervals(model, prices, forecast_days, lookback_days, mc_samples, backend)
             
             # Calculate changes
             changes = []
@@ -432,11 +589,15 @@ class LSTMPricePredictor:
                     next_date += timedelta(days=1)
                 prediction_dates.append(next_date.strftime('%Y-%m-%d'))
             
-            # SHAP explanation using provided data
-            xai = self._explain_with_provided_data(sequence, lookback_days)
+            # SHAP explanation using provided data, only on request (it dominates request latency)
+            if explain:
+                xai = self._explain_with_provided_data(prices, lookback_days, model, backend)
+            else:
+                xai = self._simple_explanation(lookback_days)
             
-            return {
+            result = {
                 'symbol': symbol,
+                'model': backend,
                 'current_price': float(current_price),
                 'lookback_days': lookback_days,
                 'forecast_days': forecast_days,
@@ -455,35 +616,109 @@ class LSTMPricePredictor:
                 'xai': xai
             }
             
+            if intervals is not None:
+                for i, prediction in enumerate(result['predictions']):
+                    prediction['mean'] = float(intervals['mean'][i])
+                    prediction['lower'] = float(intervals['lower'][i])
+                    prediction['upper'] = float(intervals['upper'][i])
+                result['interval'] = {
+                    'method': 'mc_dropout',
+                    'samples': mc_samples,
+                    'percentiles': list(INTERVAL_PERCENTILES)
+                }
+            
+            return result
+            
         except Exception as e:
             print(f"Error in prediction with historical data: {str(e)}")
             raise
     
-    def _explain_with_provided_data(self, sequence: np.ndarray, lookback_days: int) -> Dict:
-        """Generate SHAP explanations using provided data"""
+    def history_needed(self, lookback_days: int, backend: str = 'lstm') -> int:
+        """Fewest prices per symbol a backend can forecast from (XGBoost needs its full window)"""
+        if backend == 'lstm':
+            return lookback_days
+        if backend == 'xgboost':
+            return self.xgb.window_size
+        return max(lookback_days, self.xgb.window_size)
+    
+    def forecast_returns(self, price_histories: Dict[str, List[float]],
+                         forecast_days: int = 5, lookback_days: int = 60,
+                         backend: str = 'lstm') -> Dict[str, Dict]:
+        """
+        Forecast returns for many symbols with one model call per forecast step
+        
+        All symbols sharing a model have their windows stacked into a single
+        (symbols, lookback, 1) batch, so the cost grows with the number of
+        forward passes (1 for a multi-horizon model covering forecast_days)
+        and of fine-tuned symbols, not with the number of symbols.
+        Results are recorded in the signal cache for Black-Litterman views.
+        
+        Args:
+            price_histories: Symbol -> historical closing prices (>= history_needed each)
+            forecast_days: Number of days to predict (1-10)
+            lookback_days: Number of historical days to use (30-120)
+            backend: One of FORECAST_BACKENDS
+            
+        Returns:
+            Symbol -> {'current_price', 'forecast_price', 'expected_return', 'confidence'}
+        
+        Raises:
+            ValueError: Some symbols have fewer prices than the backend needs
+        """
+        if backend == 'xgboost':
+            return self.xgb.forecast_returns(price_histories, forecast_days)
+        needed = self.history_needed(lookback_days, backend)
+        
+        symbols = list(price_histories)
+        short = [s for s in symbols if len(price_histories[s]) < needed]
+        if short:
+            raise ValueError(f"Need at least {needed} days of data for: {', '.join(short)}")
+        
+        windows = np.array([np.asarray(price_histories[s], dtype=float)[-needed:] for s in symbols])
+        current_prices = windows[:, -1].copy()
+        confidences = [self.calculate_confidence(w[-lookback_days:], []) for w in windows]
+        return_stds = [volatility_return_std(w[-lookback_days:], forecast_days) for w in windows]
+        
+        # Group rows by model and roll each group forward as one batch
+        groups = {}
+        for i, symbol in enumerate(symbols):
+            model = self.model_for(symbol)
+            groups.setdefault(id(model), (model, []))[1].append(i)
+        
+        forecasts = np.empty(len(symbols))
+        for model, rows in groups.values():
+            forecasts[rows] = self._forecast(model, windows[rows], forecast_days, lookback_days, backend)[:, -1]
+        
+        return build_forecast_results(symbols, current_prices, forecasts, confidences, forecast_days, return_stds)
+    
+    def _explain_with_provided_data(self, prices: np.ndarray, lookback_days: int, model=None,
+                                    backend: str = 'lstm') -> Dict:
+        """Generate SHAP explanations using provided data (full history; the last window is explained)"""
+        model = self.model if model is None else model
         try:
-            # Prepare input
-            seq_2d = sequence.reshape(-1, 1)
-            scaled_seq = self.scaler.transform(seq_2d)
-            lstm_input = scaled_seq.reshape(1, lookback_days, 1)
-            
-            # Create background (use variations of the sequence)
-            background_data = []
-            for i in range(min(20, len(sequence) - lookback_days + 1)):
-                bg_seq = sequence[i:i+lookback_days]
-                bg_2d = bg_seq.reshape(-1, 1)
-                bg_scaled = self.scaler.transform(bg_2d)
-                background_data.append(bg_scaled.reshape(lookback_days, 1))
-            
-            if len(background_data) < 5:
-                # Not enough data for SHAP, return simple explanation
+            if backend == 'xgboost':
+                # Tree SHAP on the XGBoost window: exact, no background needed
+                lookback_days = self.xgb.window_size
+                xgb_input, _ = self.xgb.normalizer.normalize(prices[np.newaxis, -lookback_days:])
+                shap_values = shap.TreeExplainer(self.xgb.booster).shap_values(xgb_input[..., 0])
+            elif self.runtime != 'keras':
+                # DeepExplainer needs the Keras graph
                 return self._simple_explanation(lookback_days)
-            
-            background = np.array(background_data)
-            
-            # SHAP explainer
-            explainer = shap.DeepExplainer(self.model, background)
-            shap_values = explainer.shap_values(lstm_input)
+            else:
+                # Windows are views into the history; only the ones used get normalized
+                windows = sliding_windows(prices, lookback_days)
+                lstm_input, _ = self.normalizer.normalize(windows[-1:])
+                
+                # Background: the (up to) 20 windows just before the explained one
+                background, _ = self.normalizer.normalize(windows[-21:-1])
+                
+                if len(background) < 5:
+                    # Not enough data for SHAP, return simple explanation
+                    return self._simple_explanation(lookback_days)
+                
+                # SHAP explainer
+                explainer = shap.DeepExplainer(model, background)
+                shap_values = explainer.shap_values(lstm_input)
             
             # Process SHAP values
             shap_array = np.array(shap_values).flatten()
@@ -524,19 +759,20 @@ class LSTMPricePredictor:
             'top_influential_days': [1, 5, 10]
         }
     
-    def predict_with_explanation(self, symbol: str, days: int = 5) -> Dict:
+    def predict_with_explanation(self, symbol: str, days: int = 5, backend: str = 'lstm') -> Dict:
         """
         Complete prediction with SHAP explanation (fetches data via yfinance)
         
         Args:
             symbol: Stock symbol
             days: Number of days to predict
+            backend: One of FORECAST_BACKENDS (the explanation is of the LSTM)
             
         Returns:
             Dictionary with predictions and XAI
         """
         # Get predictions
-        predictions = self.predict_next_days(symbol, days)
+        predictions = self.predict_next_days(symbol, days, backend)
         
         # Get SHAP explanation
         xai = self.explain_with_shap(symbol)
@@ -550,12 +786,18 @@ class LSTMPricePredictor:
         return result
 
 
-# Singleton instance
-_predictor_instance = None
+def load_predictor(entry: Optional[Dict]) -> LSTMPricePredictor:
+    """Predictor for a model registry version (None: the unversioned models/ files)"""
+    if entry is None:
+        return LSTMPricePredictor()
+    scaler_path = os.path.join(entry['path'], 'scaler.joblib')
+    return LSTMPricePredictor(os.path.join(entry['path'], entry['model_file']),
+                              scaler_path if os.path.exists(scaler_path) else 'models/scaler.joblib')
+
+
+# Served predictor: the registry's active price model, hot-swappable via the admin API
+predictor_slot = ModelSlot(PRICE_MODEL, load_predictor, LSTMPricePredictor.warmup)
 
 def get_predictor() -> LSTMPricePredictor:
     """Get or create predictor instance"""
-    global _predictor_instance
-    if _predictor_instance is None:
-        _predictor_instance = LSTMPricePredictor()
-    return _predictor_instance
+    return predictor_slot.get()
@@ -0,0 +1,213 @@
+"""
+Turnover-Aware Rebalancing
+Mean-variance objectives with an L1 trading-cost penalty relative to current holdings
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+from frontier import covariance_factor
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_OBJECTIVES = ('max_sharpe', 'min_volatility', 'efficient_risk', 'efficient_return')
+# Proportional cost per unit of traded weight (0.001 = 10 bps)
+DEFAULT_TURNOVER_COST = 0.001
+# Weight changes below this are treated as "no trade"
+TRADE_WEIGHT_TOLERANCE = 1e-4
+REBALANCE_PROBLEM_CACHE_SIZE = int(os.environ.get('REBALANCE_PROBLEM_CACHE_SIZE', 16))
+SOLVED_STATUSES = (cp.OPTIMAL, cp.OPTIMAL_INACCURATE)
+
+
+class RebalanceProblem:
+    """
+    Mean-variance problem with a turnover penalty, compiled once per universe
+
+    Expected returns, the risk factor, current weights, the cost rate and the
+    risk/return target are cvxpy Parameters. Re-solving with new inputs (the
+    next day's rebalance) skips canonicalization and warm-starts the solver
+    from the previous solution, which sits close to the new optimum when
+    the portfolio only drifts a little.
+
+    Trades are a separate variable (w - w_prev == trades) so the penalty
+    cost * ||trades||_1 stays DPP-compliant.
+    """
+
+    def __init__(self,
+                 n_assets: int,
+                 n_risk_rows: int,
+                 objective: str,
+                 weight_bounds: Tuple[float, float] = (0, 1),
+                 market_neutral: bool = False,
+                 gamma: float = 0.0,
+                 solver: Optional[str] = None):
+        if objective not in ('min_volatility', 'efficient_risk', 'efficient_return'):
+            raise ValueError(f"Unsupported rebalance objective: {objective}")
+
+        self.objective = objective
+        self.solver = solver
+        self.weights = cp.Variable(n_assets)
+        self.trades = cp.Variable(n_assets)
+
+        self.mu = cp.Parameter(n_assets)
+        self.risk_factor = cp.Parameter((n_risk_rows, n_assets))
+        self.previous_weights = cp.Parameter(n_assets)
+        self.turnover_cost = cp.Parameter(nonneg=True)
+        self.target = cp.Parameter()
+
+        constraints = [
+            cp.sum(self.weights) == (0 if market_neutral else 1),
+            self.weights >= weight_bounds[0],
+            self.weights <= weight_bounds[1],
+            self.weights - self.previous_weights == self.trades
+        ]
+        variance = cp.sum_squares(self.risk_factor @ self.weights)
+        penalty = self.turnover_cost * cp.norm1(self.trades)
+        if gamma > 0:
+            penalty = penalty + gamma * cp.sum_squares(self.weights)
+
+        if objective == 'efficient_risk':
+            constraints.append(cp.norm(self.risk_factor @ self.weights, 2) <= self.target)
+            self.problem = cp.Problem(cp.Maximize(self.mu @ self.weights - penalty), constraints)
+        else:
+            if objective == 'efficient_return':
+                constraints.append(self.mu @ self.weights >= self.target)
+            self.problem = cp.Problem(cp.Minimize(variance + penalty), constraints)
+
+    def solve(self,
+              mu: np.ndarray,
+              risk_factor: np.ndarray,
+              previous_weights: np.ndarray,
+              turnover_cost: float,
+              target: Optional[float] = None) -> np.ndarray:
+        """Update the parameters and solve, warm-starting from the last solution"""
+        self.mu.value = np.asarray(mu, dtype=float)
+        self.risk_factor.value = np.asarray(risk_factor, dtype=float)
+        self.previous_weights.value = np.asarray(previous_weights, dtype=float)
+        self.turnover_cost.value = float(turnover_cost)
+        self.target.value = float(target) if target is not None else 0.0
+
+        if self.weights.value is None:
+            # First solve: the current portfolio is the natural starting point
+            self.weights.value = self.previous_weights.value
+            self.trades.value = np.zeros_like(self.previous_weights.value)
+
+        try:
+            self.problem.solve(solver=self.solver, warm_start=True)
+        except cp.error.SolverError as e:
+            raise ValueError(f"Rebalance solve failed: {e}")
+
+        if self.problem.status not in SOLVED_STATUSES or self.weights.value is None:
+            raise ValueError(f"Rebalance optimization is {self.problem.status} for objective {self.objective}")
+        return np.array(self.weights.value)
+
+
+class RebalanceProblemCache:
+    """
+    Small LRU of compiled RebalanceProblems
+
+    A problem is checked out while it is being solved so two requests never
+    share one; a concurrent request for the same key just compiles its own.
+    """
+
+    def __init__(self, max_entries: int = REBALANCE_PROBLEM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, RebalanceProblem]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def checkout(self, key: Hashable) -> Optional[RebalanceProblem]:
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def checkin(self, key: Hashable, problem: RebalanceProblem) -> None:
+        with self._lock:
+            self._entries[key] = problem
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+rebalance_problem_cache = RebalanceProblemCache()
+
+
+def solve_rebalance(tickers: List[str],
+                    mu: np.ndarray,
+                    cov: np.ndarray,
+                    previous_weights: np.ndarray,
+                    objective: str,
+                    turnover_cost: float = DEFAULT_TURNOVER_COST,
+                    target: Optional[float] = None,
+                    weight_bounds: Tuple[float, float] = (0, 1),
+                    market_neutral: bool = False,
+                    gamma: float = 0.0,
+                    risk_factor=None,
+                    solver: Optional[str] = None) -> np.ndarray:
+    """
+    Turnover-penalized mean-variance weights, reusing a compiled problem per universe
+
+    Args:
+        tickers: Universe, in mu / cov order
+        mu: Expected annual returns (N,)
+        cov: Annual covariance (N x N); unused when risk_factor is given
+        previous_weights: Current portfolio weights (N,)
+        objective: 'min_volatility', 'efficient_risk' or 'efficient_return'
+        turnover_cost: Penalty per unit of traded weight
+        target: Volatility ceiling (efficient_risk) or return floor (efficient_return)
+        risk_factor: Optional R with R'R = covariance (e.g. a factor model)
+
+    Returns:
+        Target weights (N,)
+    """
+    if risk_factor is None:
+        risk_factor = covariance_factor(np.asarray(cov, dtype=float))
+    elif hasattr(risk_factor, 'toarray'):
+        risk_factor = risk_factor.toarray()
+
+    key = (tuple(tickers), objective, tuple(weight_bounds), market_neutral, gamma, risk_factor.shape, solver)
+    problem = rebalance_problem_cache.checkout(key)
+    if problem is None:
+        problem = RebalanceProblem(len(tickers), risk_factor.shape[0], objective, weight_bounds,
+                                   market_neutral, gamma, solver)
+    else:
+        logger.info(f"Reusing compiled rebalance problem for {len(tickers)} tickers ({objective})")
+
+    weights = problem.solve(mu, risk_factor, previous_weights, turnover_cost, target)
+    rebalance_problem_cache.checkin(key, problem)
+    return weights
+
+
+def build_trade_list(current_shares: pd.Series,
+                     target_shares: pd.Series,
+                     latest_prices: pd.Series) -> List[Dict]:
+    """
+    Share deltas needed to move from current to target holdings
+
+    Returns:
+        List of {'ticker', 'action', 'shares', 'price', 'value'} sorted by traded value
+    """
+    tickers = current_shares.index.union(target_shares.index)
+    deltas = target_shares.reindex(tickers).fillna(0) - current_shares.reindex(tickers).fillna(0)
+    deltas = deltas[deltas != 0]
+
+    trades = []
+    for ticker, delta in deltas.items():
+        price = float(latest_prices.get(ticker, np.nan))
+        trades.append({
+            'ticker': ticker,
+            'action': 'buy' if delta > 0 else 'sell',
+            'shares': float(abs(delta)),
+            'price': round(price, 2),
+            'value': round(abs(delta) * price, 2)
+        })
+    return sorted(trades, key=lambda trade: trade['value'], reverse=True)
@@ -88,14 +88,13 @@ if __name__ == '__main__':
     print("=" * 60)
     print("INSTRUCTIONS:")
     print("=" * 60)
-    print("1. Backup old model:")
-    print("   Move 'models/sp500_lstm_model.h5' to 'models/sp500_lstm_model_old.h5'")
+    print("1. Register the new model as a version (existing versions are kept):")
+    print("   python model_registry.py register price_lstm --model models/sp500_lstm_model_new.h5 \\")
+    print("       --scaler models/scaler.joblib")
     print()
-    print("2. Use new model:")
-    print("   Rename 'models/sp500_lstm_model_new.h5' to 'models/sp500_lstm_model.h5'")
-    print()
-    print("3. Restart Flask server:")
-    print("   python app.py")
+    print("2. Serve it without restarting Flask (loads and warms up in the background):")
+    print("   POST /api/admin/models/price_lstm/activate  {\"version\": \"<version>\"}")
+    print("   (or add --activate in step 1 to use it from the next start)")
     print()
     print("NOTE: The new model has random weights (not trained).")
     print("      Predictions will be random until you train it with real data.")
@@ -0,0 +1,372 @@
+"""
+Incremental Rolling Covariance
+Maintains windowed return sums and cross-products under row additions and removals
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from estimators import fix_nonpositive_semidefinite, ledoit_wolf_shrinkage, shrink_to_identity
+
+logger = logging.getLogger(__name__)
+
+ROLLING_COVARIANCE_METHODS = ('sample_cov', 'ledoit_wolf', 'exp_cov')
+# Rebuild from raw rows after this many incremental updates to bound float drift
+MAX_INCREMENTAL_UPDATES = int(os.environ.get('ROLLING_COVARIANCE_MAX_UPDATES', 1000))
+ROLLING_COVARIANCE_MAX_UNIVERSES = int(os.environ.get('ROLLING_COVARIANCE_MAX_UNIVERSES', 32))
+# Directory to persist accumulators per universe (unset keeps them in memory only)
+ROLLING_COVARIANCE_DIR = os.environ.get('ROLLING_COVARIANCE_DIR')
+
+
+class RollingCovariance:
+    """
+    Running sums and cross-products of a sliding block of return rows
+
+    Alongside sum(x) and sum(xx') it keeps sum(a^2) and sum(a x) of the row
+    energies a_t = |x_t|^2, which is enough to rebuild the Ledoit-Wolf
+    shrinkage intensity exactly, and optionally exponentially weighted
+    accumulators for exp_cov. Adding or dropping k rows costs O(k * N^2)
+    instead of re-estimating the whole window.
+
+    Rows must be dropped oldest-first when span is set, since the weight of a
+    row depends on its age. With window set, the rows and their dates are
+    kept so add_day can evict the oldest day on its own.
+    """
+
+    def __init__(self,
+                 n_assets: int,
+                 tickers: Optional[Sequence[str]] = None,
+                 window: Optional[int] = None,
+                 span: Optional[float] = None):
+        self.n_assets = n_assets
+        self.tickers = list(tickers) if tickers is not None else None
+        self.window = window
+        self.span = span
+        self.decay = 1.0 - 2.0 / (span + 1.0) if span else None
+
+        self.count = 0
+        self.sum = np.zeros(n_assets)
+        self.cross = np.zeros((n_assets, n_assets))
+        self.energy_sq_sum = 0.0
+        self.energy_cross = np.zeros(n_assets)
+
+        self.ew_weight = 0.0
+        self.ew_sum = np.zeros(n_assets)
+        self.ew_cross = np.zeros((n_assets, n_assets)) if span else None
+
+        self.rows = deque() if window else None
+        self.dates = deque() if window else None
+        self.updates = 0
+
+    # --- Updates ---
+
+    def _accumulate(self, rows: np.ndarray, sign: float) -> None:
+        energy = np.einsum('ti,ti->t', rows, rows)
+        self.count += int(sign) * rows.shape[0]
+        self.sum += sign * rows.sum(axis=0)
+        self.cross += sign * (rows.T @ rows)
+        self.energy_sq_sum += sign * float(energy @ energy)
+        self.energy_cross += sign * (energy @ rows)
+
+    def add(self, rows: np.ndarray, dates: Optional[Sequence] = None) -> None:
+        """Append a block of return rows (k x N), newest last"""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        n_new = rows.shape[0]
+        if n_new == 0:
+            return
+
+        if self.decay is not None:
+            weights = self.decay ** np.arange(n_new - 1, -1, -1, dtype=np.float64)
+            scale = self.decay ** n_new
+            self.ew_weight = scale * self.ew_weight + weights.sum()
+            self.ew_sum = scale * self.ew_sum + weights @ rows
+            self.ew_cross = scale * self.ew_cross + (rows * weights[:, None]).T @ rows
+
+        self._accumulate(rows, 1.0)
+        self.updates += 1
+
+        if self.rows is not None:
+            self.rows.extend(rows)
+            self.dates.extend(dates if dates is not None else [None] * n_new)
+            overflow = len(self.rows) - self.window
+            if overflow > 0:
+                self.drop_oldest(overflow)
+
+    def drop(self, rows: np.ndarray) -> None:
+        """Remove the oldest block of return rows (k x N), oldest first"""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        n_old = rows.shape[0]
+        if n_old == 0:
+            return
+        if n_old > self.count:
+            raise ValueError(f"Cannot drop {n_old} rows from a window of {self.count}")
+
+        if self.decay is not None:
+            weights = self.decay ** (self.count - 1 - np.arange(n_old, dtype=np.float64))
+            self.ew_weight -= weights.sum()
+            self.ew_sum -= weights @ rows
+            self.ew_cross -= (rows * weights[:, None]).T @ rows
+
+        self._accumulate(rows, -1.0)
+        self.updates += 1
+
+    def drop_oldest(self, n_rows: int) -> None:
+        """Drop the n oldest buffered rows (requires window)"""
+        if self.rows is None:
+            raise ValueError("drop_oldest needs a windowed RollingCovariance")
+        n_rows = min(n_rows, len(self.rows))
+        oldest = [self.rows.popleft() for _ in range(n_rows)]
+        for _ in range(n_rows):
+            self.dates.popleft()
+        if oldest:
+            self.drop(np.vstack(oldest))
+
+    def add_day(self, row: np.ndarray, date=None) -> None:
+        """Append one day of returns; evicts the oldest day when the window is full"""
+        self.add(np.asarray(row, dtype=np.float64)[None, :], dates=[date])
+
+    def drop_day(self, row: np.ndarray) -> None:
+        """Remove the oldest day of returns"""
+        self.drop(np.asarray(row, dtype=np.float64)[None, :])
+
+    # --- Estimates ---
+
+    def mean(self) -> np.ndarray:
+        return self.sum / self.count
+
+    def gram(self) -> np.ndarray:
+        """X'X of the window returns demeaned by the window mean"""
+        mean = self.mean()
+        gram = self.cross - self.count * np.outer(mean, mean)
+        return (gram + gram.T) / 2
+
+    def squared_gram_sum(self) -> float:
+        """Sum of the entries of (Xc**2)'(Xc**2) for the demeaned window Xc"""
+        # |x_t - m|^2 = a_t - 2 x_t.m + |m|^2, squared and summed over t
+        mean = self.mean()
+        m_sq = float(mean @ mean)
+        return float(
+            self.energy_sq_sum
+            - 4.0 * (self.energy_cross @ mean)
+            + 2.0 * m_sq * np.trace(self.cross)
+            + 4.0 * (mean @ self.cross @ mean)
+            - 4.0 * m_sq * (self.sum @ mean)
+            + self.count * m_sq ** 2
+        )
+
+    def covariance(self, ddof: int = 1) -> np.ndarray:
+        """Sample covariance of the rows currently in the window"""
+        if self.count <= ddof:
+            raise ValueError(f"Need more than {ddof} rows for a covariance, have {self.count}")
+        return self.gram() / (self.count - ddof)
+
+    def sample_cov(self, frequency: int = 252) -> np.ndarray:
+        """Annualized sample covariance (matches ReturnMoments.sample_cov)"""
+        return fix_nonpositive_semidefinite(self.covariance() * frequency)
+
+    def ledoit_wolf(self, frequency: int = 252) -> np.ndarray:
+        """Annualized Ledoit-Wolf covariance (matches ReturnMoments.ledoit_wolf)"""
+        gram = self.gram()
+        shrinkage = ledoit_wolf_shrinkage(gram, self.squared_gram_sum(), self.count)
+        return fix_nonpositive_semidefinite(shrink_to_identity(gram / self.count, shrinkage) * frequency)
+
+    def exp_cov(self, frequency: int = 252) -> np.ndarray:
+        """Annualized exponentially weighted covariance (matches ReturnMoments.exp_cov)"""
+        if self.decay is None:
+            raise ValueError("exp_cov needs a RollingCovariance created with span")
+        mean = self.mean()
+        weighted = (self.ew_cross
+                    - np.outer(mean, self.ew_sum)
+                    - np.outer(self.ew_sum, mean)
+                    + self.ew_weight * np.outer(mean, mean)) / self.ew_weight
+        return fix_nonpositive_semidefinite((weighted + weighted.T) / 2 * frequency)
+
+    def estimate(self, method: str, frequency: int = 252) -> np.ndarray:
+        """Dispatch to a covariance estimate by name"""
+        if method == 'ledoit_wolf':
+            return self.ledoit_wolf(frequency)
+        if method == 'exp_cov':
+            return self.exp_cov(frequency)
+        if method == 'sample_cov':
+            return self.sample_cov(frequency)
+        raise ValueError(f"Unsupported rolling covariance method: {method}")
+
+    # --- Persistence ---
+
+    def save(self, path: str) -> None:
+        """Write accumulators (and buffered rows) to an .npz file"""
+        arrays = {
+            'meta': np.array([self.n_assets, self.count, self.window or 0, self.span or 0, self.updates], dtype=np.float64),
+            'sum': self.sum,
+            'cross': self.cross,
+            'energy': np.concatenate([[self.energy_sq_sum], self.energy_cross]),
+            'tickers': np.array(self.tickers or [], dtype=str),
+        }
+        if self.decay is not None:
+            arrays['ew'] = np.concatenate([[self.ew_weight], self.ew_sum])
+            arrays['ew_cross'] = self.ew_cross
+        if self.rows is not None:
+            arrays['rows'] = np.array(self.rows).reshape(-1, self.n_assets)
+            arrays['dates'] = pd.DatetimeIndex(list(self.dates)).to_numpy(dtype='datetime64[ns]')
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RollingCovariance':
+        with np.load(path) as data:
+            n_assets, count, window, span, updates = data['meta']
+            tickers = data['tickers'].tolist() or None
+            rolling = cls(int(n_assets), tickers=tickers, window=int(window) or None, span=span or None)
+            rolling.count = int(count)
+            rolling.updates = int(updates)
+            rolling.sum = data['sum'].copy()
+            rolling.cross = data['cross'].copy()
+            rolling.energy_sq_sum = float(data['energy'][0])
+            rolling.energy_cross = data['energy'][1:].copy()
+            if rolling.decay is not None:
+                rolling.ew_weight = float(data['ew'][0])
+                rolling.ew_sum = data['ew'][1:].copy()
+                rolling.ew_cross = data['ew_cross'].copy()
+            if rolling.rows is not None:
+                rolling.rows.extend(data['rows'])
+                rolling.dates.extend(pd.DatetimeIndex(data['dates']))
+        return rolling
+
+
+class RollingCovarianceStore:
+    """
+    One windowed RollingCovariance per ticker universe, slid forward between requests
+
+    When a request's return window overlaps a stored one (same tickers, same
+    returns on the shared dates) only the dropped and new days are applied.
+    Any mismatch, e.g. a dividend revising adjusted history, rebuilds from scratch.
+    """
+
+    def __init__(self,
+                 max_universes: int = ROLLING_COVARIANCE_MAX_UNIVERSES,
+                 directory: Optional[str] = ROLLING_COVARIANCE_DIR,
+                 max_updates: int = MAX_INCREMENTAL_UPDATES):
+        self.max_universes = max_universes
+        self.directory = directory
+        self.max_updates = max_updates
+        self._entries: 'OrderedDict[Hashable, RollingCovariance]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._slides = 0
+        self._rebuilds = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: Tuple) -> Optional[str]:
+        if not self.directory:
+            return None
+        digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"rolling_cov_{digest}.npz")
+
+    def _lookup(self, key: Tuple) -> Optional[RollingCovariance]:
+        rolling = self._entries.get(key)
+        if rolling is None:
+            path = self._path(key)
+            if path and os.path.exists(path):
+                try:
+                    rolling = RollingCovariance.load(path)
+                except Exception as e:
+                    logger.warning(f"Could not load rolling covariance {path}: {e}")
+        return rolling
+
+    def _slide(self, rolling: RollingCovariance, dates: pd.DatetimeIndex, returns: np.ndarray) -> bool:
+        """Advance rolling to the new window in place; False if it must be rebuilt"""
+        if rolling.updates >= self.max_updates or not rolling.dates:
+            return False
+
+        old_dates = pd.DatetimeIndex(list(rolling.dates))
+        n_drop = int(old_dates.searchsorted(dates[0]))
+        n_overlap = len(old_dates) - n_drop
+        if n_overlap <= 0 or n_overlap > len(dates):
+            return False
+        if not old_dates[n_drop:].equals(dates[:n_overlap]):
+            return False
+
+        buffered = np.array(rolling.rows)[n_drop:]
+        if not np.array_equal(buffered, returns[:n_overlap]):
+            return False
+
+        rolling.drop_oldest(n_drop)
+        rolling.window = len(dates)
+        for row, date in zip(returns[n_overlap:], dates[n_overlap:]):
+            rolling.add_day(row, date)
+        return True
+
+    def estimate(self,
+                 tickers: Sequence[str],
+                 dates: pd.DatetimeIndex,
+                 returns: np.ndarray,
+                 method: str,
+                 frequency: int = 252,
+                 span: Optional[float] = None) -> np.ndarray:
+        """
+        Covariance of returns (dates x tickers), reusing and sliding the stored accumulators
+
+        Args:
+            tickers: Column names of returns
+            dates: Row dates of returns
+            returns: Simple returns matrix
+            method: One of ROLLING_COVARIANCE_METHODS
+            frequency: Periods per year used for annualization
+            span: EWM span (exp_cov only)
+
+        Returns:
+            Annualized N x N covariance
+        """
+        if method not in ROLLING_COVARIANCE_METHODS:
+            raise ValueError(f"Unsupported rolling covariance method: {method}")
+        span = span if method == 'exp_cov' else None
+        key = (tuple(tickers), span)
+        dates = pd.DatetimeIndex(dates)
+
+        with self._lock:
+            rolling = self._lookup(key)
+            if rolling is not None and self._slide(rolling, dates, returns):
+                self._slides += 1
+                logger.info(f"Slid rolling covariance to {dates[-1].date()} ({len(tickers)} tickers)")
+            else:
+                self._rebuilds += 1
+                rolling = RollingCovariance(len(tickers), tickers=tickers, window=len(dates), span=span)
+                rolling.add(returns, dates=dates)
+
+            self._entries[key] = rolling
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_universes:
+                self._entries.popitem(last=False)
+
+            path = self._path(key)
+            if path:
+                try:
+                    rolling.save(path)
+                except OSError as e:
+                    logger.warning(f"Could not persist rolling covariance: {e}")
+
+            return rolling.estimate(method, frequency)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'universes': len(self._entries),
+                'slides': self._slides,
+                'rebuilds': self._rebuilds
+            }
+
+
+# Shared store used by PortfolioOptimizer.calculate_covariance_matrix
+rolling_covariance_store = RollingCovarianceStore()
@@ -11,12 +11,17 @@ class FinBERTSentimentAnalyzer:
     Uses the ProsusAI/finbert model from HuggingFace
     """
     
-    def __init__(self):
-        """Initialize the FinBERT model and tokenizer"""
-        print("Loading FinBERT model from HuggingFace...")
+    def __init__(self, model_name: str = "ProsusAI/finbert"):
+        """
+        Initialize the FinBERT model and tokenizer
+        
+        Args:
+            model_name: HuggingFace model id, or a local save_pretrained directory
+        """
+        print(f"Loading FinBERT model from {model_name}...")
         
         # Load FinBERT model and tokenizer
-        self.model_name = "ProsusAI/finbert"
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
         self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
         
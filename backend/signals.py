@@ -0,0 +1,158 @@
+"""
+Per-Ticker Signal Cache
+Aggregates FinBERT sentiment and price-model forecasts per ticker as they are
+produced, so the optimizer can turn them into Black-Litterman views without
+calling either model
+"""
+
+import logging
+import os
+import threading
+import time
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Older observations count half as much after this many days
+SIGNAL_HALF_LIFE_DAYS = float(os.environ.get('SIGNAL_HALF_LIFE_DAYS', 7))
+SECONDS_PER_DAY = 86400.0
+
+SIGNAL_COLUMNS = (
+    'sentiment_score', 'sentiment_confidence', 'sentiment_count', 'sentiment_age_days',
+    'forecast_return', 'forecast_horizon_days', 'forecast_confidence', 'forecast_age_days',
+    'forecast_return_std'
+)
+
+
+def interval_return_std(current_price: float, lower: float, upper: float, percentiles: Sequence[float]) -> float:
+    """
+    Standard deviation of a forecast's total return implied by its
+    (lower, upper) price percentiles, taken as normal
+    """
+    low_z, high_z = (NormalDist().inv_cdf(p / 100) for p in percentiles)
+    return float((upper - lower) / current_price / (high_z - low_z))
+
+
+class SignalCache:
+    """
+    Thread-safe ticker -> sentiment aggregate and latest forecast
+
+    Sentiment is kept as exponentially time-decayed sums, so an aggregate
+    is O(1) to update and read no matter how many texts were scored. The
+    mean score weights each text by the model's confidence in it; the
+    decayed count measures how much (recent) evidence there is.
+    """
+
+    def __init__(self, half_life_days: float = SIGNAL_HALF_LIFE_DAYS):
+        self.half_life_days = half_life_days
+        # ticker -> [decayed_count, confidence_sum, weighted_score_sum, updated_at]
+        self._sentiment: Dict[str, List[float]] = {}
+        # ticker -> (expected_return, horizon_days, confidence, recorded_at, return_std)
+        self._forecasts: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _decay(self, elapsed_seconds: float) -> float:
+        return 0.5 ** (max(elapsed_seconds, 0.0) / (self.half_life_days * SECONDS_PER_DAY))
+
+    def record_sentiment(self, ticker: str, score: float, confidence: float, at: Optional[float] = None) -> None:
+        """
+        Fold one scored text into the ticker's aggregate
+
+        Args:
+            ticker: Ticker the text is about
+            score: Sentiment score in [-1, 1]
+            confidence: Model confidence in [0, 1]
+            at: Unix time of the observation (default now)
+        """
+        self.record_sentiments([{'ticker': ticker, 'score': score, 'confidence': confidence}], at)
+
+    def record_sentiments(self, items: Iterable[Dict], at: Optional[float] = None) -> int:
+        """Fold many {'ticker', 'score', 'confidence'} results in under one lock"""
+        at = time.time() if at is None else at
+        recorded = 0
+        with self._lock:
+            for item in items:
+                ticker = str(item['ticker']).upper()
+                confidence = float(np.clip(item.get('confidence', 1.0), 0.0, 1.0))
+                aggregate = self._sentiment.get(ticker)
+                if aggregate is None:
+                    aggregate = self._sentiment[ticker] = [0.0, 0.0, 0.0, at]
+                decay = self._decay(at - aggregate[3])
+                aggregate[0] = aggregate[0] * decay + 1.0
+                aggregate[1] = aggregate[1] * decay + confidence
+                aggregate[2] = aggregate[2] * decay + confidence * float(np.clip(item['score'], -1.0, 1.0))
+                aggregate[3] = max(aggregate[3], at)
+                recorded += 1
+        return recorded
+
+    def record_forecast(self,
+                        ticker: str,
+                        expected_return: float,
+                        horizon_days: int,
+                        confidence: float,
+                        return_std: Optional[float] = None,
+                        at: Optional[float] = None) -> None:
+        """
+        Store the latest forecast return over horizon_days (replaces the previous one)
+
+        return_std is the dispersion of that total return (Monte Carlo
+        interval or historical volatility over the horizon); forecasts
+        without one do not become Black-Litterman views.
+        """
+        at = time.time() if at is None else at
+        return_std = np.nan if return_std is None else float(return_std)
+        with self._lock:
+            self._forecasts[str(ticker).upper()] = (
+                float(expected_return), int(horizon_days), float(np.clip(confidence, 0.0, 1.0)), at, return_std
+            )
+
+    def snapshot(self, tickers: Iterable[str], now: Optional[float] = None) -> pd.DataFrame:
+        """
+        Current signals for tickers as one frame (NaN where a ticker has none)
+
+        Columns are SIGNAL_COLUMNS. sentiment_score is the confidence-weighted
+        mean score, sentiment_confidence the mean confidence and
+        sentiment_count the decayed number of texts behind them.
+        forecast_return_std is the dispersion of forecast_return.
+        """
+        now = time.time() if now is None else now
+        tickers = [str(t).upper() for t in tickers]
+        rows = np.full((len(tickers), len(SIGNAL_COLUMNS)), np.nan)
+
+        with self._lock:
+            for i, ticker in enumerate(tickers):
+                aggregate = self._sentiment.get(ticker)
+                if aggregate is not None and aggregate[1] > 0:
+                    decayed_count, confidence_sum, score_sum, updated_at = aggregate
+                    rows[i, 0] = score_sum / confidence_sum
+                    rows[i, 1] = confidence_sum / decayed_count
+                    rows[i, 2] = decayed_count * self._decay(now - updated_at)
+                    rows[i, 3] = (now - updated_at) / SECONDS_PER_DAY
+                forecast = self._forecasts.get(ticker)
+                if forecast is not None:
+                    rows[i, 4:7] = forecast[:3]
+                    rows[i, 7] = (now - forecast[3]) / SECONDS_PER_DAY
+                    rows[i, 8] = forecast[4]
+
+        return pd.DataFrame(rows, index=tickers, columns=list(SIGNAL_COLUMNS))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sentiment.clear()
+            self._forecasts.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sentiment_tickers': len(self._sentiment),
+                'forecast_tickers': len(self._forecasts),
+                'half_life_days': self.half_life_days
+            }
+
+
+# Process-wide signal cache fed by the sentiment and price endpoints
+signal_cache = SignalCache()
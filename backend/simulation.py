@@ -0,0 +1,286 @@
+"""
+Monte Carlo Portfolio Simulation
+Simulates buy-and-hold portfolio paths in bounded-memory chunks and summarizes tail risk
+"""
+
+import logging
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from portfolio_optimizer import PortfolioOptimizer, DEFAULT_RISK_FREE_RATE
+from factor_risk import DEFAULT_FACTOR_COUNT
+from frontier import covariance_factor
+
+logger = logging.getLogger(__name__)
+
+SIMULATION_METHODS = ('bootstrap', 'parametric')
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_PATHS = 100_000
+DEFAULT_HORIZON_DAYS = 252
+DEFAULT_BLOCK_SIZE = 21
+DEFAULT_CONFIDENCE_LEVELS = (0.95, 0.99)
+# Path arrays are float32: half the memory and RNG time of float64, ample for returns
+PATH_DTYPE = np.float32
+# Upper bound on the (paths x days x assets) array materialized per chunk
+SIMULATION_CHUNK_BYTES = int(os.environ.get('SIMULATION_CHUNK_BYTES', 64 * 1024 * 1024))
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def chunk_size_for(horizon_days: int, n_assets: int, max_bytes: int = SIMULATION_CHUNK_BYTES) -> int:
+    """Paths per chunk so one chunk of asset returns stays within max_bytes"""
+    return max(1, int(max_bytes // (horizon_days * n_assets * np.dtype(PATH_DTYPE).itemsize)))
+
+
+def parametric_log_returns(rng: np.random.Generator,
+                           n_paths: int,
+                           horizon_days: int,
+                           daily_mean: np.ndarray,
+                           cholesky: np.ndarray) -> np.ndarray:
+    """Correlated normal daily log returns (paths x days x assets) via a Cholesky factor"""
+    shocks = rng.standard_normal((n_paths, horizon_days, len(daily_mean)), dtype=PATH_DTYPE)
+    return daily_mean + shocks @ cholesky.T
+
+
+def block_bootstrap_log_returns(rng: np.random.Generator,
+                                n_paths: int,
+                                horizon_days: int,
+                                history: np.ndarray,
+                                block_size: int) -> np.ndarray:
+    """
+    Resample historical daily log returns in contiguous blocks (paths x days x assets)
+
+    Whole blocks keep cross-asset correlation and short-range autocorrelation
+    (volatility clustering) that iid day sampling would destroy.
+    """
+    n_history = history.shape[0]
+    block_size = max(1, min(block_size, n_history))
+    n_blocks = -(-horizon_days // block_size)
+    starts = rng.integers(0, n_history - block_size + 1, size=(n_paths, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon_days]
+    return history[rows]
+
+
+def path_statistics(log_returns: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Terminal return and max drawdown of buy-and-hold paths
+
+    Args:
+        log_returns: Daily asset log returns (paths x days x assets)
+        weights: Initial portfolio weights (assets,)
+
+    Returns:
+        (terminal_returns, max_drawdowns), each of shape (paths,)
+    """
+    growth = np.exp(np.cumsum(log_returns, axis=1))
+    values = growth @ weights
+    cash = 1.0 - weights.sum()
+    values += PATH_DTYPE(cash)
+
+    peaks = np.maximum.accumulate(np.maximum(values, 1.0), axis=1)
+    drawdowns = (values / peaks - 1.0).min(axis=1)
+    return (values[:, -1] - 1.0).astype(np.float64), np.minimum(drawdowns, 0.0).astype(np.float64)
+
+
+def summarize(terminal_returns: np.ndarray,
+              max_drawdowns: np.ndarray,
+              confidence_levels: Sequence[float],
+              portfolio_value: Optional[float] = None) -> Dict:
+    """VaR / CVaR, loss probability and return / drawdown distributions"""
+    tail_risk = {}
+    for level in confidence_levels:
+        cutoff = np.quantile(terminal_returns, 1.0 - level)
+        tail = terminal_returns[terminal_returns <= cutoff]
+        var = float(-cutoff)
+        cvar = float(-tail.mean()) if tail.size else var
+        entry = {'var': var, 'cvar': cvar}
+        if portfolio_value is not None:
+            entry['var_value'] = round(var * portfolio_value, 2)
+            entry['cvar_value'] = round(cvar * portfolio_value, 2)
+        tail_risk[f"{level:.4g}"] = entry
+
+    return_percentiles = np.percentile(terminal_returns, PERCENTILES)
+    drawdown_percentiles = np.percentile(max_drawdowns, PERCENTILES)
+    return {
+        'expected_return': float(terminal_returns.mean()),
+        'return_volatility': float(terminal_returns.std(ddof=1)),
+        'probability_of_loss': float((terminal_returns < 0).mean()),
+        'tail_risk': tail_risk,
+        'return_percentiles': {f"p{p}": float(v) for p, v in zip(PERCENTILES, return_percentiles)},
+        'max_drawdown': {
+            'mean': float(max_drawdowns.mean()),
+            'percentiles': {f"p{p}": float(v) for p, v in zip(PERCENTILES, drawdown_percentiles)},
+            'probability_worse_than_10pct': float((max_drawdowns <= -0.10).mean()),
+            'probability_worse_than_20pct': float((max_drawdowns <= -0.20).mean())
+        }
+    }
+
+
+def simulate_portfolio_paths(weights: np.ndarray,
+                             method: str = 'bootstrap',
+                             n_paths: int = DEFAULT_PATHS,
+                             horizon_days: int = DEFAULT_HORIZON_DAYS,
+                             mu: Optional[np.ndarray] = None,
+                             cov: Optional[np.ndarray] = None,
+                             history: Optional[np.ndarray] = None,
+                             block_size: int = DEFAULT_BLOCK_SIZE,
+                             confidence_levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS,
+                             portfolio_value: Optional[float] = None,
+                             seed: Optional[int] = None,
+                             chunk_paths: Optional[int] = None) -> Dict:
+    """
+    Simulate n_paths buy-and-hold portfolio paths, chunk by chunk
+
+    Args:
+        weights: Initial weights (N,); any remainder to 1 is held as cash
+        method: 'parametric' (normal log returns from mu and a Cholesky factor
+            of cov) or 'bootstrap' (block-resampled historical log returns)
+        mu: Annual expected (geometric) returns, for parametric
+        cov: Annual covariance of returns, for parametric
+        history: Daily historical log returns (T x N), for bootstrap
+        block_size: Days per bootstrap block
+        confidence_levels: Levels for VaR / CVaR
+        portfolio_value: Optional value to express VaR / CVaR in currency
+        seed: Random seed for reproducible results
+        chunk_paths: Paths per chunk (default sized from SIMULATION_CHUNK_BYTES)
+
+    Returns:
+        Summary dictionary (see summarize) plus run metadata
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method: {method}. Expected one of {SIMULATION_METHODS}")
+
+    weights = np.asarray(weights, dtype=PATH_DTYPE)
+    n_assets = len(weights)
+    rng = np.random.default_rng(seed)
+    chunk_paths = chunk_paths or chunk_size_for(horizon_days, n_assets)
+
+    if method == 'parametric':
+        if mu is None or cov is None:
+            raise ValueError("Parametric simulation needs mu and cov")
+        daily_mean = (np.log1p(np.asarray(mu, dtype=np.float64)) / TRADING_DAYS_PER_YEAR).astype(PATH_DTYPE)
+        cholesky = covariance_factor(np.asarray(cov, dtype=np.float64) / TRADING_DAYS_PER_YEAR).T.astype(PATH_DTYPE)
+
+        def draw(n):
+            return parametric_log_returns(rng, n, horizon_days, daily_mean, cholesky)
+    else:
+        if history is None or len(history) < 2:
+            raise ValueError("Bootstrap simulation needs historical returns")
+        history = np.asarray(history, dtype=PATH_DTYPE)
+
+        def draw(n):
+            return block_bootstrap_log_returns(rng, n, horizon_days, history, block_size)
+
+    terminal_returns = np.empty(n_paths)
+    max_drawdowns = np.empty(n_paths)
+    for start in range(0, n_paths, chunk_paths):
+        stop = min(start + chunk_paths, n_paths)
+        terminal_returns[start:stop], max_drawdowns[start:stop] = path_statistics(draw(stop - start), weights)
+
+    summary = summarize(terminal_returns, max_drawdowns, confidence_levels, portfolio_value)
+    summary.update({
+        'method': method,
+        'n_paths': n_paths,
+        'horizon_days': horizon_days,
+        'block_size': block_size if method == 'bootstrap' else None,
+        'chunk_paths': chunk_paths
+    })
+    return summary
+
+
+def run_portfolio_simulation(tickers: Sequence[str],
+                             weights: Optional[Dict[str, float]] = None,
+                             objective: str = 'max_sharpe',
+                             optimize_params: Optional[Dict] = None,
+                             method: str = 'bootstrap',
+                             n_paths: int = DEFAULT_PATHS,
+                             horizon_days: int = DEFAULT_HORIZON_DAYS,
+                             block_size: int = DEFAULT_BLOCK_SIZE,
+                             confidence_levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS,
+                             portfolio_value: Optional[float] = None,
+                             seed: Optional[int] = None,
+                             expected_returns_method: str = 'mean',
+                             covariance_method: str = 'ledoit_wolf',
+                             n_factors: int = DEFAULT_FACTOR_COUNT,
+                             risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+                             predicted_returns: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    High-level simulation: weights given directly or from an optimize run
+
+    When weights ({ticker: weight}, e.g. the weights of an /optimize response)
+    is None the portfolio is first optimized for objective, with
+    optimize_params (target_return, weight_bounds, ...) passed through.
+
+    Returns:
+        {'status': 'success', 'weights', 'simulation', ...} or an error dict
+    """
+    try:
+        optimizer = PortfolioOptimizer(list(tickers), predicted_returns=predicted_returns)
+        optimizer.fetch_historical_data()
+
+        optimization = None
+        if weights is None or method == 'parametric':
+            optimizer.calculate_expected_returns(method=expected_returns_method, risk_free_rate=risk_free_rate,
+                                                 covariance_method=covariance_method, n_factors=n_factors)
+            optimizer.calculate_covariance_matrix(method=covariance_method, n_factors=n_factors)
+        if weights is None:
+            optimization = optimizer.optimize_portfolio(objective=objective, risk_free_rate=risk_free_rate,
+                                                        **(optimize_params or {}))
+            weights = optimization['weights']
+
+        weights = {str(t).upper(): float(w) for t, w in weights.items()}
+        unknown = [t for t in weights if t not in optimizer.prices.columns]
+        if unknown:
+            raise ValueError(f"No price history for weighted tickers: {', '.join(unknown)}")
+
+        tickers_used = [t for t in optimizer.prices.columns if t in weights]
+        weight_vector = np.array([weights[t] for t in tickers_used])
+
+        prices = optimizer.prices[tickers_used]
+        history = np.diff(np.log(prices.to_numpy(dtype=np.float64)), axis=0)
+        mu = cov = None
+        if method == 'parametric':
+            missing = [t for t in tickers_used if t not in optimizer.mu.index]
+            if missing:
+                raise ValueError(f"No expected return for weighted tickers: {', '.join(missing)}")
+            mu = optimizer.mu.reindex(tickers_used).to_numpy()
+            cov = optimizer.S.loc[tickers_used, tickers_used].to_numpy()
+
+        logger.info(f"Simulating {n_paths} {method} paths over {horizon_days} days for {len(tickers_used)} tickers")
+        simulation = simulate_portfolio_paths(
+            weight_vector,
+            method=method,
+            n_paths=n_paths,
+            horizon_days=horizon_days,
+            mu=mu,
+            cov=cov,
+            history=history,
+            block_size=block_size,
+            confidence_levels=confidence_levels,
+            portfolio_value=portfolio_value,
+            seed=seed
+        )
+
+        response = {
+            'status': 'success',
+            'tickers_simulated': tickers_used,
+            'weights': {t: w for t, w in zip(tickers_used, weight_vector.tolist())},
+            'simulation': simulation
+        }
+        if optimization is not None:
+            response['optimization'] = {
+                'objective': objective,
+                'expected_annual_return': float(optimization['expected_return']),
+                'annual_volatility': float(optimization['volatility']),
+                'sharpe_ratio': float(optimization['sharpe_ratio'])
+            }
+        return response
+
+    except (ValueError, ConnectionError) as ve:
+        error_type = type(ve).__name__
+        logger.error(f"Simulation failed ({error_type}): {str(ve)}")
+        return {'status': 'error', 'message': str(ve), 'error_type': error_type}
+    except Exception as e:
+        logger.error(f"Unexpected simulation error: {e}", exc_info=True)
+        return {'status': 'error', 'message': 'An unexpected internal error occurred.', 'error_type': type(e).__name__}
@@ -0,0 +1,318 @@
+"""
+Portfolio Stress Testing
+Applies historical crisis windows and factor shocks to many portfolios at once:
+one (scenarios x tickers) return matrix times a (tickers x portfolios) weight matrix
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolio_optimizer import PortfolioOptimizer, DEFAULT_RISK_FREE_RATE
+from factor_risk import DEFAULT_FACTOR_COUNT
+from market_data import price_store
+
+logger = logging.getLogger(__name__)
+
+# Peak-to-trough (or shock) windows replayed as one-period returns
+HISTORICAL_SCENARIOS = {
+    'gfc_2008': ('2008-09-12', '2009-03-09', 'Lehman collapse to the March 2009 low'),
+    'us_downgrade_2011': ('2011-07-22', '2011-10-03', 'US credit downgrade and euro debt crisis'),
+    'taper_tantrum_2013': ('2013-05-21', '2013-06-24', 'Fed taper signal and bond sell-off (rate shock)'),
+    'china_devaluation_2015': ('2015-08-10', '2015-08-25', 'Yuan devaluation sell-off'),
+    'volmageddon_2018': ('2018-01-26', '2018-02-08', 'Short-volatility unwind'),
+    'q4_2018': ('2018-10-03', '2018-12-24', 'Rate hikes and trade war sell-off (rate shock)'),
+    'covid_crash_2020': ('2020-02-19', '2020-03-23', 'COVID-19 crash'),
+    'rate_shock_2022': ('2022-01-03', '2022-10-12', 'Fed hiking cycle reprices bonds and growth stocks'),
+    'regional_banks_2023': ('2023-03-08', '2023-03-13', 'Silicon Valley Bank failure'),
+}
+# Factor shocks are expressed as the return of a tradable proxy
+FACTOR_PROXIES = {
+    'market': 'SPY',
+    'nasdaq': 'QQQ',
+    'small_cap': 'IWM',
+    'rates': 'TLT',
+    'credit': 'HYG',
+    'dollar': 'UUP',
+    'oil': 'USO',
+    'gold': 'GLD',
+}
+# Stands in for tickers that did not trade during a historical window
+BENCHMARK_TICKER = os.environ.get('STRESS_BENCHMARK_TICKER', '^GSPC')
+FACTOR_LOOKBACK_DAYS = 756
+MIN_FACTOR_OBSERVATIONS = 60
+
+
+def window_returns(prices: pd.DataFrame, windows: Sequence[Tuple[str, str]]) -> np.ndarray:
+    """
+    Return of every column over each (start, end) window (windows x tickers)
+
+    Each end uses the last close on or before that date. A ticker without a
+    close on or before a window's start (not yet listed, or outside the
+    store) gets NaN for that window.
+    """
+    filled = prices.ffill().to_numpy(dtype=np.float64)
+    dates = prices.index.values
+    starts = np.searchsorted(dates, pd.to_datetime([w[0] for w in windows]).values, side='right') - 1
+    ends = np.searchsorted(dates, pd.to_datetime([w[1] for w in windows]).values, side='right') - 1
+
+    returns = np.full((len(windows), prices.shape[1]), np.nan)
+    valid = (starts >= 0) & (ends > starts)
+    returns[valid] = filled[ends[valid]] / filled[starts[valid]] - 1.0
+    return returns
+
+
+def market_betas(returns: pd.DataFrame, benchmark: pd.Series) -> np.ndarray:
+    """Beta of every column to benchmark over pairwise-complete days"""
+    r = returns.to_numpy(dtype=np.float64)
+    m = benchmark.reindex(returns.index).to_numpy(dtype=np.float64)[:, None]
+    mask = ~np.isnan(r) & ~np.isnan(m)
+    r = np.where(mask, r, 0.0)
+    m = np.where(mask, m, 0.0)
+
+    n = np.maximum(mask.sum(axis=0), 1)
+    mean_r = r.sum(axis=0) / n
+    mean_m = m.sum(axis=0) / n
+    covariance = (r * m).sum(axis=0) / n - mean_r * mean_m
+    variance = (m * m).sum(axis=0) / n - mean_m ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        betas = covariance / variance
+    # Not enough overlap to estimate: assume the ticker moves with the market
+    return np.where((mask.sum(axis=0) >= MIN_FACTOR_OBSERVATIONS) & np.isfinite(betas), betas, 1.0)
+
+
+def historical_scenario_returns(tickers: List[str],
+                                scenario_names: Sequence[str],
+                                history: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
+    """
+    Ticker returns over each historical window
+
+    Tickers that did not trade through a window get beta x benchmark return.
+
+    Args:
+        tickers: Universe
+        scenario_names: Keys of HISTORICAL_SCENARIOS
+        history: Stored closes covering tickers and BENCHMARK_TICKER
+
+    Returns:
+        (scenarios x tickers DataFrame, scenario -> proxied tickers); scenarios
+        the store cannot cover at all are left out
+    """
+    windows = [HISTORICAL_SCENARIOS[name][:2] for name in scenario_names]
+    prices = history.reindex(columns=tickers)
+    returns = window_returns(prices, windows)
+
+    proxied = {}
+    missing = np.isnan(returns)
+    if missing.any() and BENCHMARK_TICKER in history.columns:
+        benchmark_prices = history[[BENCHMARK_TICKER]]
+        benchmark_returns = window_returns(benchmark_prices, windows)[:, 0]
+        betas = market_betas(prices.pct_change(fill_method=None), benchmark_prices[BENCHMARK_TICKER].pct_change(fill_method=None))
+        fill = np.outer(benchmark_returns, betas)
+        returns = np.where(missing, fill, returns)
+        for row, name in enumerate(scenario_names):
+            if missing[row].any() and not np.isnan(benchmark_returns[row]):
+                proxied[name] = [t for t, m in zip(tickers, missing[row]) if m]
+
+    frame = pd.DataFrame(returns, index=list(scenario_names), columns=tickers)
+    covered = frame.notna().all(axis=1)
+    if not covered.all():
+        logger.warning(f"No stored prices for scenarios: {', '.join(frame.index[~covered])}")
+    return frame[covered], {k: v for k, v in proxied.items() if covered[k]}
+
+
+def factor_exposures(tickers: List[str],
+                     factors: List[str],
+                     history: pd.DataFrame,
+                     lookback: int = FACTOR_LOOKBACK_DAYS) -> pd.DataFrame:
+    """
+    Multivariate OLS betas of daily ticker returns on factor proxy returns
+
+    Each ticker is fit on its own days with a return only, so a recent
+    listing is not pulled toward zero by the days before it traded. Tickers
+    sharing the same missing days (typically the same listing date) share
+    one least-squares solve. Tickers with fewer than
+    MIN_FACTOR_OBSERVATIONS days get zero exposures.
+
+    Returns:
+        DataFrame factors x tickers
+    """
+    proxies = [FACTOR_PROXIES[f] for f in factors]
+    prices = history.reindex(columns=list(dict.fromkeys(tickers + proxies))).ffill().iloc[-(lookback + 1):]
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    returns = returns[returns[proxies].notna().all(axis=1)]
+    if len(returns) < MIN_FACTOR_OBSERVATIONS:
+        raise ValueError(f"Not enough stored history for factor proxies: {', '.join(proxies)}")
+
+    y = returns[tickers].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(y)
+    unestimable = valid.sum(axis=0) < MIN_FACTOR_OBSERVATIONS
+    design = np.column_stack([np.ones(len(returns)), returns[proxies].to_numpy(dtype=np.float64)])
+
+    coefficients = np.zeros((design.shape[1], len(tickers)))
+    groups = {}
+    for column in np.flatnonzero(~unestimable):
+        groups.setdefault(valid[:, column].tobytes(), []).append(column)
+    for columns in groups.values():
+        rows = valid[:, columns[0]]
+        coefficients[:, columns], *_ = np.linalg.lstsq(design[rows], y[np.ix_(rows, columns)], rcond=None)
+
+    exposures = pd.DataFrame(coefficients[1:], index=factors, columns=tickers)
+    if unestimable.any():
+        logger.warning(f"Too little history for factor exposures of: "
+                       f"{', '.join(t for t, u in zip(tickers, unestimable) if u)}")
+    return exposures
+
+
+def factor_scenario_returns(shocks: List[Dict], exposures: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ticker returns implied by factor shocks: (scenarios x factors) @ (factors x tickers)
+
+    Args:
+        shocks: [{'name': str, 'factors': {factor: proxy return}}, ...]
+        exposures: factors x tickers betas
+
+    Returns:
+        scenarios x tickers DataFrame
+    """
+    shock_matrix = pd.DataFrame(
+        [shock['factors'] for shock in shocks], index=[shock['name'] for shock in shocks]
+    ).reindex(columns=exposures.index).fillna(0.0)
+    return shock_matrix @ exposures
+
+
+def stress_portfolios(scenario_returns: pd.DataFrame, weights: pd.DataFrame) -> pd.DataFrame:
+    """
+    Portfolio returns for every scenario: (scenarios x tickers) @ (tickers x portfolios)
+
+    Any weight not invested in a ticker is cash and returns 0.
+    """
+    return scenario_returns @ weights.reindex(scenario_returns.columns).fillna(0.0)
+
+
+def run_stress_test(tickers: Optional[Sequence[str]] = None,
+                    portfolios: Optional[Dict[str, Dict[str, float]]] = None,
+                    objectives: Optional[Sequence[str]] = None,
+                    scenarios: Optional[Sequence[str]] = None,
+                    factor_shocks: Optional[List[Dict]] = None,
+                    portfolio_value: float = 10000,
+                    optimize_params: Optional[Dict] = None,
+                    expected_returns_method: str = 'mean',
+                    covariance_method: str = 'ledoit_wolf',
+                    n_factors: int = DEFAULT_FACTOR_COUNT,
+                    risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+                    predicted_returns: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    High-level stress test of one or more portfolios
+
+    Portfolios are given as {name: {ticker: weight}} (e.g. the weights of
+    /optimize responses); otherwise tickers are optimized once per entry of
+    objectives and each result is stressed.
+
+    Returns:
+        {'status': 'success', 'scenarios': [...], 'portfolios': {...}} or an error dict
+    """
+    try:
+        scenarios = list(HISTORICAL_SCENARIOS) if scenarios is None else list(scenarios)
+        unknown = [s for s in scenarios if s not in HISTORICAL_SCENARIOS]
+        if unknown:
+            raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+        factor_shocks = factor_shocks or []
+        if not scenarios and not factor_shocks:
+            raise ValueError("At least one historical scenario or factor shock is required")
+
+        optimizations = {}
+        if portfolios is None:
+            if not tickers or not objectives:
+                raise ValueError("Either portfolios or tickers with objectives are required")
+            optimizer = PortfolioOptimizer(list(tickers), predicted_returns=predicted_returns)
+            optimizer.fetch_historical_data()
+            optimizer.calculate_expected_returns(method=expected_returns_method, risk_free_rate=risk_free_rate,
+                                                 covariance_method=covariance_method, n_factors=n_factors)
+            optimizer.calculate_covariance_matrix(method=covariance_method, n_factors=n_factors)
+            portfolios = {}
+            for objective in objectives:
+                result = optimizer.optimize_portfolio(objective=objective, risk_free_rate=risk_free_rate,
+                                                      **(optimize_params or {}))
+                portfolios[objective] = result['weights']
+                optimizations[objective] = {
+                    'expected_annual_return': float(result['expected_return']),
+                    'annual_volatility': float(result['volatility']),
+                    'sharpe_ratio': float(result['sharpe_ratio'])
+                }
+
+        weights = pd.DataFrame({
+            name: {str(t).upper(): float(w) for t, w in portfolio.items()} for name, portfolio in portfolios.items()
+        }).fillna(0.0)
+        universe = weights.index.tolist()
+
+        factors = sorted({f for shock in factor_shocks for f in shock['factors']})
+        unknown = [f for f in factors if f not in FACTOR_PROXIES]
+        if unknown:
+            raise ValueError(f"Unknown factor(s): {', '.join(unknown)}. Must be one of: {', '.join(FACTOR_PROXIES)}")
+
+        history = price_store.history(universe + [BENCHMARK_TICKER] + [FACTOR_PROXIES[f] for f in factors])
+        if history.empty:
+            raise ConnectionError("No stored or downloadable price history for the portfolio tickers")
+        no_history = [t for t in universe if t not in history.columns]
+        if no_history:
+            logger.warning(f"No stored history for {', '.join(no_history)}; treated as market proxies")
+
+        blocks = []
+        proxied = {}
+        if scenarios:
+            historical, proxied = historical_scenario_returns(universe, scenarios, history)
+            blocks.append(historical)
+        if factor_shocks:
+            exposures = factor_exposures(universe, factors, history)
+            blocks.append(factor_scenario_returns(factor_shocks, exposures))
+        scenario_returns = pd.concat(blocks)
+        if scenario_returns.empty:
+            raise ValueError("None of the requested scenarios are covered by the stored price history")
+
+        logger.info(f"Stressing {weights.shape[1]} portfolios over {len(scenario_returns)} scenarios")
+        portfolio_returns = stress_portfolios(scenario_returns, weights)
+
+        rows = []
+        for name, row in portfolio_returns.iterrows():
+            entry = {'scenario': name}
+            if name in HISTORICAL_SCENARIOS:
+                start, end, description = HISTORICAL_SCENARIOS[name]
+                entry.update({'type': 'historical', 'start': start, 'end': end, 'description': description,
+                              'proxied_tickers': proxied.get(name, [])})
+            else:
+                entry.update({'type': 'factor',
+                              'factors': next(s['factors'] for s in factor_shocks if s['name'] == name)})
+            entry['returns'] = {p: float(r) for p, r in row.items()}
+            entry['pnl'] = {p: round(float(r) * portfolio_value, 2) for p, r in row.items()}
+            rows.append(entry)
+
+        summary = {}
+        for portfolio in portfolio_returns.columns:
+            column = portfolio_returns[portfolio]
+            summary[portfolio] = {
+                'weights': {t: float(w) for t, w in weights[portfolio].items() if w != 0},
+                'worst_scenario': column.idxmin(),
+                'worst_return': float(column.min()),
+                'worst_pnl': round(float(column.min()) * portfolio_value, 2)
+            }
+            if portfolio in optimizations:
+                summary[portfolio]['optimization'] = optimizations[portfolio]
+
+        return {
+            'status': 'success',
+            'portfolio_value': portfolio_value,
+            'scenarios': rows,
+            'portfolios': summary
+        }
+
+    except (ValueError, ConnectionError) as ve:
+        error_type = type(ve).__name__
+        logger.error(f"Stress test failed ({error_type}): {str(ve)}")
+        return {'status': 'error', 'message': str(ve), 'error_type': error_type}
+    except Exception as e:
+        logger.error(f"Unexpected stress test error: {e}", exc_info=True)
+        return {'status': 'error', 'message': 'An unexpected internal error occurred.', 'error_type': type(e).__name__}
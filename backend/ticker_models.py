@@ -0,0 +1,232 @@
+"""
+Per-Ticker Price Models
+Fine-tuned output layers on top of the shared multi-ticker LSTM, with an LRU
+of resident per-ticker models
+
+Heads live next to the model they were tuned on (models/foo.tickers/), so
+they travel with it into the model registry, and each head records the
+fingerprint, normalization and horizon of its base model. A head that does
+not match the model being served is ignored.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from tensorflow import keras
+
+logger = logging.getLogger(__name__)
+
+# Optional shared directory of fine-tuned heads (<TICKER>.npz); by default
+# heads sit next to their base model (models/foo.tickers/)
+TICKER_MODELS_DIR = os.environ.get('TICKER_MODELS_DIR', '')
+# Per-ticker models kept in memory at once
+TICKER_MODEL_CACHE_SIZE = int(os.environ.get('TICKER_MODEL_CACHE_SIZE', 8))
+# Trailing weighted layers that per-ticker fine-tuning updates (the rest stay frozen)
+FINE_TUNE_LAYERS = 2
+
+
+def head_layers(model: keras.Model, n_layers: int = FINE_TUNE_LAYERS) -> List[keras.layers.Layer]:
+    """The last n_layers layers that carry weights (the fine-tuned part)"""
+    return [layer for layer in model.layers if layer.weights][-n_layers:]
+
+
+def ticker_models_dir(model_path: str, directory: str = TICKER_MODELS_DIR) -> str:
+    """models/shared_lstm_model.h5 -> models/shared_lstm_model.tickers (or directory)"""
+    return directory or os.path.splitext(model_path)[0] + '.tickers'
+
+
+def body_fingerprint(model: keras.Model, n_layers: int = FINE_TUNE_LAYERS) -> str:
+    """Hash of the weights a head is stacked on (everything except the head)"""
+    head = set(id(layer) for layer in head_layers(model, n_layers))
+    digest = hashlib.sha256()
+    for layer in model.layers:
+        if id(layer) not in head:
+            for weight in layer.get_weights():
+                digest.update(str(weight.shape).encode())
+                digest.update(np.ascontiguousarray(weight).tobytes())
+    return digest.hexdigest()
+
+
+def freeze_body(model: keras.Model, n_layers: int = FINE_TUNE_LAYERS) -> None:
+    """Make every layer except the head non-trainable (recompile afterwards)"""
+    head = set(id(layer) for layer in head_layers(model, n_layers))
+    for layer in model.layers:
+        layer.trainable = id(layer) in head
+
+
+def _head_path(ticker: str, directory: str) -> str:
+    safe = ''.join(c if c.isalnum() or c in '-_.^=' else '_' for c in ticker.upper())
+    return os.path.join(directory, f"{safe}.npz")
+
+
+def save_ticker_head(model: keras.Model,
+                     ticker: str,
+                     directory: str,
+                     normalization: str,
+                     horizon: int,
+                     n_layers: int = FINE_TUNE_LAYERS) -> str:
+    """
+    Persist a fine-tuned ticker's head weights
+
+    Only the head is stored (a few KB), since the body is the shared model.
+    Inputs are window-relative, so no per-ticker scaling needs saving.
+
+    Args:
+        model: Fine-tuned model (frozen shared body plus tuned head)
+        ticker: Ticker symbol
+        directory: Head directory of the base model (see ticker_models_dir)
+        normalization: Input normalization of the base model
+        horizon: Days predicted per forward pass
+        n_layers: Number of fine-tuned layers
+
+    Returns:
+        Path of the written .npz file
+    """
+    os.makedirs(directory, exist_ok=True)
+    weights = [w for layer in head_layers(model, n_layers) for w in layer.get_weights()]
+    path = _head_path(ticker, directory)
+    np.savez(path,
+             n_layers=np.array(n_layers),
+             base_model=np.array(body_fingerprint(model, n_layers)),
+             normalization=np.array(normalization),
+             horizon=np.array(int(horizon)),
+             **{f"weight_{i}": w for i, w in enumerate(weights)})
+    return path
+
+
+def load_ticker_head(ticker: str, directory: str) -> Optional[Tuple[List[np.ndarray], Dict]]:
+    """
+    Head weights and base-model description of a fine-tuned ticker
+
+    Returns:
+        (weights, {'n_layers', 'base_model', 'normalization', 'horizon'}),
+        or None if the ticker was never fine-tuned; heads saved before the
+        description existed have None for its fields
+    """
+    path = _head_path(ticker, directory)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as stored:
+        n_weights = sum(1 for key in stored.files if key.startswith('weight_'))
+        weights = [stored[f"weight_{i}"] for i in range(n_weights)]
+        info = {'n_layers': int(stored['n_layers'])}
+        for key in ('base_model', 'normalization', 'horizon'):
+            info[key] = stored[key].item() if key in stored.files else None
+        return weights, info
+
+
+class TickerModelCache:
+    """
+    LRU of per-ticker models built lazily from the shared model
+
+    A ticker's model is a clone of the shared model with its fine-tuned head
+    weights applied. Tickers without fine-tuned weights, or whose head was
+    tuned on a different base model, normalization or horizon, get None, and
+    callers fall back to the shared model.
+    """
+
+    def __init__(self,
+                 base_model: keras.Model,
+                 directory: str,
+                 normalization: str,
+                 horizon: int,
+                 max_models: int = TICKER_MODEL_CACHE_SIZE):
+        self.base_model = base_model
+        self.directory = directory
+        self.normalization = normalization
+        self.horizon = int(horizon)
+        self.max_models = max(0, int(max_models))
+        self._models: 'OrderedDict[str, keras.Model]' = OrderedDict()
+        self._fingerprints: Dict[int, str] = {}
+        # Tickers whose head does not fit the base model (warned about once)
+        self._rejected = set()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def _mismatch(self, info: Dict) -> Optional[str]:
+        """Why a stored head cannot be stacked on the base model, or None if it can"""
+        if info['base_model'] is None:
+            return 'it was saved without its base model (re-run fine-tuning)'
+        n_layers = info['n_layers']
+        if n_layers not in self._fingerprints:
+            self._fingerprints[n_layers] = body_fingerprint(self.base_model, n_layers)
+        if info['base_model'] != self._fingerprints[n_layers]:
+            return 'it was fine-tuned on a different base model'
+        if info['normalization'] != self.normalization:
+            return f"its normalization is {info['normalization']}, the model's is {self.normalization}"
+        if info['horizon'] != self.horizon:
+            return f"its horizon is {info['horizon']}, the model's is {self.horizon}"
+        return None
+
+    def get(self, ticker: str) -> Optional[keras.Model]:
+        """Model of a fine-tuned ticker, loading it on first use"""
+        ticker = str(ticker).upper()
+        with self._lock:
+            model = self._models.get(ticker)
+            if model is not None:
+                self._models.move_to_end(ticker)
+                self._hits += 1
+                return model
+            self._misses += 1
+            if ticker in self._rejected:
+                return None
+
+        stored = load_ticker_head(ticker, self.directory)
+        if stored is None:
+            return None
+
+        weights, info = stored
+        with self._lock:
+            reason = self._mismatch(info)
+        model = None
+        if reason is None:
+            model = keras.models.clone_model(self.base_model)
+            model.set_weights(self.base_model.get_weights())
+            try:
+                offset = 0
+                for layer in head_layers(model, info['n_layers']):
+                    count = len(layer.weights)
+                    layer.set_weights(weights[offset:offset + count])
+                    offset += count
+            except ValueError as e:
+                reason = f"its weights do not fit ({e})"
+        if reason is not None:
+            logger.warning(f"Ignoring fine-tuned head for {ticker}: {reason}; using the shared model")
+            with self._lock:
+                self._rejected.add(ticker)
+            return None
+        logger.info(f"Loaded fine-tuned model for {ticker}")
+
+        if self.max_models == 0:
+            return model
+        with self._lock:
+            self._models[ticker] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    def available(self) -> List[str]:
+        """Tickers with fine-tuned weights on disk"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith('.npz'))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._rejected.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'resident': list(self._models),
+                'max_models': self.max_models,
+                'hits': self._hits,
+                'misses': self._misses
+            }
@@ -1,29 +1,36 @@
 """
 Enhanced LSTM Training with GPU Optimization & Advanced Visualizations
-Run: python train_lstm_enhanced.py
+Run: python train_lstm_enhanced.py [--input-pipeline tf_data|arrays] [--compare-pipelines EPOCHS]
+     python train_lstm_enhanced.py --tickers AAPL MSFT ...   (shared multi-ticker model)
+     python train_lstm_enhanced.py --fine-tune AAPL ...      (per-ticker heads)
 """
 
+import argparse
+import time
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
-import joblib
 import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout, Bidirectional, BatchNormalization
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau, TensorBoard
 import xgboost as xgb
 import shap
+from windowing import create_sequences
+from market_data import price_store
+from ticker_models import freeze_body, save_ticker_head, ticker_models_dir, FINE_TUNE_LAYERS
+from model_metadata import read_model_metadata, write_model_metadata
+from model_registry import register_model, PRICE_MODEL
 
 # Configuration
 sns.set_style("whitegrid")
 DATA_FILE = 'sp500_historical_data.csv'
-SCALER_FILE = 'scaler.joblib'
 LSTM_MODEL_FILE = 'sp500_lstm_model.h5'
 XGB_MODEL_FILE = 'sp500_xgb_model.json'
+SHARED_MODEL_FILE = 'shared_lstm_model.h5'
 OUTPUT_DIR = 'training_outputs'
 PLOTS_DIR = os.path.join(OUTPUT_DIR, 'plots')
 LOGS_DIR = os.path.join(OUTPUT_DIR, 'logs')
@@ -35,6 +42,15 @@ TRAIN_SPLIT = 0.8
 EPOCHS = 100
 BATCH_SIZE = 32
 PATIENCE = 15
+# Windows held in the tf.data shuffle buffer (bounded, unlike a full in-memory shuffle)
+SHUFFLE_BUFFER = int(os.environ.get('TRAIN_SHUFFLE_BUFFER', 2048))
+# Directory for tf.data's on-disk window cache; empty caches in memory
+DATASET_CACHE_DIR = os.environ.get('TRAIN_DATASET_CACHE_DIR', '')
+INPUT_PIPELINES = ('tf_data', 'arrays')
+FINE_TUNE_EPOCHS = 10
+# Longest direct multi-horizon head (the API forecasts at most 10 days)
+MAX_HORIZON = 10
+FINE_TUNE_LEARNING_RATE = 1e-4
 
 def configure_gpu():
     """Configure GPU with mixed precision"""
@@ -73,19 +89,116 @@ def load_and_clean_data(filepath):
     print(f"   Range: ${clean_df['Close'].min():.2f} - ${clean_df['Close'].max():.2f}")
     return clean_df.values, clean_df
 
-def create_sequences(data, window_size, lstm=True):
-    """Create sequences"""
-    x, y = [], []
-    for i in range(window_size, len(data)):
-        x.append(data[i-window_size:i, 0])
-        y.append(data[i, 0])
-    x, y = np.array(x), np.array(y)
-    if lstm:
-        x = x.reshape(x.shape[0], x.shape[1], 1)
-    return x, y
-
-def build_model(input_shape):
-    """Build enhanced LSTM"""
+def _split_relative(window_size, horizon):
+    """Map a (W + H) slice to (inputs, targets) relative to the input's last price"""
+    def split(values):
+        last = values[window_size - 1]
+        relative = values / last - 1.0
+        targets = relative[window_size:]
+        return relative[:window_size, tf.newaxis], targets[0] if horizon == 1 else targets
+    return split
+
+def _series_windows(series, window_size, horizon=1):
+    """Unbatched (window, next horizon values) pairs of one series, window-relative"""
+    series = np.asarray(series, dtype=np.float32).reshape(-1)
+    dataset = tf.keras.utils.timeseries_dataset_from_array(
+        data=series, targets=None, sequence_length=window_size + horizon,
+        batch_size=None, shuffle=False
+    )
+    return dataset.map(_split_relative(window_size, horizon), num_parallel_calls=tf.data.AUTOTUNE)
+
+def make_window_dataset(series, window_size, batch_size=BATCH_SIZE, shuffle=False,
+                        shuffle_buffer=SHUFFLE_BUFFER, cache_name=None, horizon=1):
+    """
+    Streaming (window, next values) dataset over one or more raw price series
+
+    Windows are cut on the fly by timeseries_dataset_from_array, so only the
+    series itself (O(T)) is held up front; element i is the window
+    series[i:i + W] and target(s) series[i + W:i + W + H], all divided by
+    the window's last price minus 1, the same pairs
+    create_sequences(normalize=True) builds and WindowNormalizer applies at
+    serving time. A list of series (one per ticker) is interleaved at random
+    in proportion to length, and no window spans two series. Windows are
+    cached after the first epoch (in memory, or on disk under
+    DATASET_CACHE_DIR), reshuffled every epoch through a bounded buffer and
+    prefetched so the training step never waits on input.
+
+    Args:
+        series: (T, 1) or (T,) prices, or a list of them
+        window_size: Window length W
+        batch_size: Batch size
+        shuffle: Shuffle windows (training only)
+        shuffle_buffer: Shuffle buffer size in windows
+        cache_name: File name for the on-disk cache when DATASET_CACHE_DIR is set
+        horizon: Number of future values per target H (1 = next value only)
+
+    Returns:
+        Batched tf.data.Dataset of ((B, W, 1), (B,) or (B, H)) float32 tensors
+    """
+    if isinstance(series, (list, tuple)):
+        series = [s for s in series if len(s) >= window_size + horizon]
+        counts = np.array([len(s) - window_size - horizon + 1 for s in series], dtype=float)
+        dataset = tf.data.Dataset.sample_from_datasets(
+            [_series_windows(s, window_size, horizon) for s in series], weights=counts / counts.sum(), seed=42
+        )
+    else:
+        dataset = _series_windows(series, window_size, horizon)
+
+    if DATASET_CACHE_DIR and cache_name:
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        dataset = dataset.cache(os.path.join(DATASET_CACHE_DIR, cache_name))
+    else:
+        dataset = dataset.cache()
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """Records wall-clock seconds per epoch"""
+
+    def on_train_begin(self, logs=None):
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_times.append(time.perf_counter() - self._start)
+
+def compare_input_pipelines(train_data, test_data, epochs):
+    """
+    Epoch time of in-memory array training vs the tf.data pipeline
+
+    Trains a fresh model for the given number of epochs on each path and
+    reports the mean epoch time excluding the first (graph tracing and the
+    tf.data cache fill happen there).
+    """
+    print("\n" + "=" * 70)
+    print(f"INPUT PIPELINE COMPARISON ({epochs} epochs each)")
+    print("=" * 70)
+    x_train, y_train = create_sequences(train_data, WINDOW_SIZE, True, normalize=True)
+    x_test, y_test = create_sequences(test_data, WINDOW_SIZE, True, normalize=True)
+    inputs = {
+        'arrays': dict(x=x_train, y=y_train, batch_size=BATCH_SIZE, shuffle=True,
+                       validation_data=(x_test, y_test)),
+        'tf_data': dict(x=make_window_dataset(train_data, WINDOW_SIZE, shuffle=True),
+                        validation_data=make_window_dataset(test_data, WINDOW_SIZE))
+    }
+
+    results = {}
+    for name, fit_args in inputs.items():
+        timer = EpochTimer()
+        model = build_model((WINDOW_SIZE, 1), verbose=False)
+        model.fit(epochs=epochs, callbacks=[timer], verbose=0, **fit_args)
+        steady = timer.epoch_times[1:] or timer.epoch_times
+        results[name] = float(np.mean(steady))
+        print(f"   {name:<8} first epoch {timer.epoch_times[0]:7.2f}s   mean epoch {results[name]:7.2f}s")
+
+    print(f"   tf.data speedup: {results['arrays'] / results['tf_data']:.2f}x")
+    return results
+
+def build_model(input_shape, verbose=True, horizon=1):
+    """Build enhanced LSTM (horizon > 1: one output per day ahead, all in one pass)"""
     model = Sequential([
         LSTM(128, return_sequences=True, input_shape=input_shape),
         BatchNormalization(),
@@ -96,14 +209,107 @@ def build_model(input_shape):
         LSTM(32, return_sequences=False),
         Dropout(0.2),
         Dense(25, activation='relu'),
-        Dense(1)
+        Dense(horizon)
     ])
     model.compile(optimizer=tf.keras.optimizers.Adam(0.001), 
                  loss='huber', metrics=['mae', 'mse'])
-    print("\n✅ Model built")
-    model.summary()
+    if verbose:
+        print("\n✅ Model built")
+        model.summary()
     return model
 
+def load_ticker_corpus(tickers):
+    """
+    Daily closes per ticker from the local price store (missing tickers are fetched)
+
+    Tickers with fewer than two windows of history are skipped.
+    """
+    prices = price_store.history(tickers)
+    corpus = {t: prices[t].dropna().to_numpy(dtype=float) for t in prices.columns}
+    skipped = sorted(t for t, closes in corpus.items() if len(closes) < 2 * WINDOW_SIZE)
+    if skipped:
+        print(f"⚠️ Skipping tickers with too little history: {', '.join(skipped)}")
+    return {t: closes for t, closes in corpus.items() if t not in skipped}
+
+def split_ticker_series(closes):
+    """
+    Chronological train / validation split of one ticker
+
+    Returns:
+        (train series, validation series incl. one window of context)
+    """
+    train_len = int(len(closes) * TRAIN_SPLIT)
+    return closes[:train_len], closes[train_len - WINDOW_SIZE:]
+
+def train_shared_model(tickers, epochs=EPOCHS, horizon=1):
+    """
+    Train one LSTM on windows from many tickers
+
+    Windows are window-relative, so tickers at very different price levels
+    share the model's input range without any per-ticker scaler. Saves
+    SHARED_MODEL_FILE and its metadata.
+    """
+    corpus = load_ticker_corpus(tickers)
+    if not corpus:
+        raise ValueError("No ticker has enough history in the price store")
+    print(f"\nShared model corpus: {len(corpus)} tickers, {sum(len(c) for c in corpus.values())} rows")
+
+    splits = {t: split_ticker_series(closes) for t, closes in corpus.items()}
+    train_ds = make_window_dataset([train for train, _ in splits.values()], WINDOW_SIZE, shuffle=True,
+                                   cache_name=f'corpus_train_h{horizon}', horizon=horizon)
+    val_ds = make_window_dataset([val for _, val in splits.values()], WINDOW_SIZE,
+                                 cache_name=f'corpus_val_h{horizon}', horizon=horizon)
+
+    model = build_model((WINDOW_SIZE, 1), horizon=horizon)
+    epoch_timer = EpochTimer()
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=PATIENCE, restore_best_weights=True),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5),
+        TensorBoard(log_dir=LOGS_DIR),
+        epoch_timer
+    ]
+    history = model.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=callbacks, verbose=1)
+    print(f"   Mean epoch time: {np.mean(epoch_timer.epoch_times):.2f}s")
+
+    model.save(SHARED_MODEL_FILE)
+    write_model_metadata(SHARED_MODEL_FILE, normalization='window_relative', window_size=WINDOW_SIZE,
+                         horizon=horizon, tickers=sorted(corpus),
+                         metrics={'val_loss': float(min(history.history['val_loss'])), 'epochs': len(history.epoch)})
+    print(f"✅ Shared model saved to {SHARED_MODEL_FILE}")
+    return model, history
+
+def fine_tune_ticker(ticker, shared_model_file=SHARED_MODEL_FILE, epochs=FINE_TUNE_EPOCHS):
+    """
+    Fit the last FINE_TUNE_LAYERS layers of the shared model to one ticker
+
+    The body stays frozen, so a job only trains a few thousand weights and
+    only those are saved, next to the shared model (ticker_models_dir), where
+    a predictor serving that model picks them up on the ticker's next request.
+
+    Returns:
+        Path of the saved head
+    """
+    ticker = ticker.upper()
+    closes = load_ticker_corpus([ticker]).get(ticker)
+    if closes is None:
+        raise ValueError(f"Not enough history for {ticker}")
+
+    train, val = split_ticker_series(closes)
+
+    model = tf.keras.models.load_model(shared_model_file, compile=False)
+    metadata = read_model_metadata(shared_model_file)
+    horizon = metadata['horizon']
+    freeze_body(model)
+    model.compile(optimizer=tf.keras.optimizers.Adam(FINE_TUNE_LEARNING_RATE), loss='huber', metrics=['mae'])
+    model.fit(make_window_dataset(train, WINDOW_SIZE, shuffle=True, horizon=horizon), epochs=epochs,
+              validation_data=make_window_dataset(val, WINDOW_SIZE, horizon=horizon),
+              callbacks=[EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True)], verbose=0)
+
+    path = save_ticker_head(model, ticker, ticker_models_dir(shared_model_file),
+                            metadata['normalization'], horizon)
+    print(f"✅ {ticker}: last {FINE_TUNE_LAYERS} layers fine-tuned, saved to {path}")
+    return path
+
 def plot_training(history):
     """Plot training history"""
     fig, axes = plt.subplots(2, 2, figsize=(16, 10))
@@ -196,6 +402,34 @@ def plot_errors(y_test, pred_lstm, pred_xgb):
 
 # Main training
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the LSTM and XGBoost price models')
+    parser.add_argument('--input-pipeline', default='tf_data', choices=INPUT_PIPELINES,
+                        help='Feed the LSTM from a streaming tf.data pipeline or from in-memory arrays')
+    parser.add_argument('--compare-pipelines', type=int, metavar='EPOCHS',
+                        help='Only time both input pipelines for EPOCHS epochs and exit')
+    parser.add_argument('--horizon', type=int, default=1, choices=range(1, MAX_HORIZON + 1), metavar='H',
+                        help='Predict the next H days in one forward pass (1 = one-step model)')
+    parser.add_argument('--tickers', nargs='+',
+                        help='Train the shared model on these tickers from the local price store')
+    parser.add_argument('--fine-tune', nargs='+', metavar='TICKER',
+                        help=f'Fine-tune the shared model per ticker (heads saved to {ticker_models_dir(SHARED_MODEL_FILE)})')
+    parser.add_argument('--register', action='store_true',
+                        help='Add the trained LSTM to the model registry as a new (inactive) version')
+    args = parser.parse_args()
+    
+    if args.tickers or args.fine_tune:
+        configure_gpu()
+        if args.tickers:
+            train_shared_model(args.tickers, horizon=args.horizon)
+            if args.register:
+                print(f"✅ Registered {PRICE_MODEL} {register_model(PRICE_MODEL, SHARED_MODEL_FILE)}")
+        for ticker in args.fine_tune or []:
+            try:
+                fine_tune_ticker(ticker)
+            except Exception as e:
+                print(f"❌ Fine-tuning {ticker} failed: {e}")
+        raise SystemExit(0)
+
     print("\n" + "=" * 70)
     print("ENHANCED LSTM TRAINING")
     print("=" * 70)
@@ -206,21 +440,22 @@ if __name__ == "__main__":
     # Load data
     data, df = load_and_clean_data(DATA_FILE)
     
-    # Preprocess
-    scaler = MinMaxScaler()
-    scaled = scaler.fit_transform(data)
-    train_len = int(len(scaled) * TRAIN_SPLIT)
-    train_data = scaled[:train_len]
-    test_data = scaled[train_len - WINDOW_SIZE:]
+    # Split (windows are normalized relative to their last price, no global scaler)
+    train_len = int(len(data) * TRAIN_SPLIT)
+    train_data = data[:train_len]
+    test_data = data[train_len - WINDOW_SIZE:]
     
-    # Create sequences
-    x_train_lstm, y_train = create_sequences(train_data, WINDOW_SIZE, True)
-    x_test_lstm, y_test = create_sequences(test_data, WINDOW_SIZE, True)
-    x_train_xgb, _ = create_sequences(train_data, WINDOW_SIZE, False)
-    x_test_xgb, _ = create_sequences(test_data, WINDOW_SIZE, False)
+    if args.compare_pipelines:
+        compare_input_pipelines(train_data, test_data, args.compare_pipelines)
+        raise SystemExit(0)
+    
+    horizon = args.horizon
+    # Last price of each test window, to map relative predictions back to prices
+    test_last = test_data[WINDOW_SIZE - 1:len(test_data) - horizon]
+    y_test_unscaled = test_data[WINDOW_SIZE:len(test_data) - horizon + 1]
     
     # Build and train LSTM
-    model = build_model((x_train_lstm.shape[1], 1))
+    model = build_model((WINDOW_SIZE, 1), horizon=horizon)
     callbacks = [
         ModelCheckpoint('sp500_lstm_best.h5', monitor='val_loss', save_best_only=True),
         EarlyStopping(monitor='val_loss', patience=PATIENCE, restore_best_weights=True),
@@ -228,9 +463,38 @@ if __name__ == "__main__":
         TensorBoard(log_dir=LOGS_DIR)
     ]
     
-    print(f"\nTraining LSTM for {EPOCHS} epochs...")
-    history = model.fit(x_train_lstm, y_train, batch_size=BATCH_SIZE, epochs=EPOCHS,
-                       validation_data=(x_test_lstm, y_test), callbacks=callbacks, verbose=1)
+    epoch_timer = EpochTimer()
+    callbacks.append(epoch_timer)
+    
+    print(f"\nTraining LSTM for {EPOCHS} epochs ({args.input_pipeline} input, horizon {horizon})...")
+    if args.input_pipeline == 'tf_data':
+        # The datasets cut the windows; the LSTM never needs them as arrays
+        train_ds = make_window_dataset(train_data, WINDOW_SIZE, shuffle=True, cache_name=f'train_h{horizon}',
+                                       horizon=horizon)
+        val_ds = make_window_dataset(test_data, WINDOW_SIZE, cache_name=f'val_h{horizon}', horizon=horizon)
+        history = model.fit(train_ds, epochs=EPOCHS, validation_data=val_ds, callbacks=callbacks, verbose=1)
+        lstm_test_output = model.predict(val_ds)
+    else:
+        x_train_lstm, y_train_lstm = create_sequences(train_data, WINDOW_SIZE, True, normalize=True, horizon=horizon)
+        x_test_lstm, y_test_lstm = create_sequences(test_data, WINDOW_SIZE, True, normalize=True, horizon=horizon)
+        history = model.fit(x_train_lstm, y_train_lstm, batch_size=BATCH_SIZE, epochs=EPOCHS,
+                           validation_data=(x_test_lstm, y_test_lstm), callbacks=callbacks, verbose=1)
+        lstm_test_output = model.predict(x_test_lstm)
+    print(f"   Mean epoch time: {np.mean(epoch_timer.epoch_times):.2f}s")
+    
+    # XGBoost takes flat windows: views of the LSTM arrays when they exist,
+    # otherwise built now (after LSTM training, in float32) for XGBoost alone
+    if args.input_pipeline == 'tf_data':
+        x_train_xgb, y_train = create_sequences(train_data.astype(np.float32), WINDOW_SIZE, False,
+                                                normalize=True, horizon=horizon)
+        x_test_xgb, y_test = create_sequences(test_data.astype(np.float32), WINDOW_SIZE, False,
+                                              normalize=True, horizon=horizon)
+    else:
+        x_train_xgb, y_train = x_train_lstm[..., 0], y_train_lstm
+        x_test_xgb, y_test = x_test_lstm[..., 0], y_test_lstm
+    # XGBoost predicts the next day only
+    if horizon > 1:
+        y_train, y_test = y_train[:, 0], y_test[:, 0]
     
     # Train XGBoost
     print("\nTraining XGBoost...")
@@ -240,9 +504,8 @@ if __name__ == "__main__":
     xgb_model.fit(x_train_xgb, y_train, eval_set=[(x_test_xgb, y_test)], verbose=False)
     
     # Predictions
-    pred_lstm = scaler.inverse_transform(model.predict(x_test_lstm))
-    pred_xgb = scaler.inverse_transform(xgb_model.predict(x_test_xgb).reshape(-1,1))
-    y_test_unscaled = scaler.inverse_transform(y_test.reshape(-1,1))
+    pred_lstm = test_last * (1 + lstm_test_output[:, :1])
+    pred_xgb = test_last * (1 + xgb_model.predict(x_test_xgb).reshape(-1,1))
     
     # Metrics
     lstm_rmse = np.sqrt(mean_squared_error(y_test_unscaled, pred_lstm))
@@ -253,8 +516,16 @@ if __name__ == "__main__":
     # Save
     model.save(LSTM_MODEL_FILE)
     xgb_model.save_model(XGB_MODEL_FILE)
-    joblib.dump(scaler, SCALER_FILE)
+    write_model_metadata(LSTM_MODEL_FILE, normalization='window_relative', window_size=WINDOW_SIZE, horizon=horizon,
+                         metrics={'rmse': float(lstm_rmse), 'val_loss': float(min(history.history['val_loss'])),
+                                  'epochs': len(history.epoch)})
+    write_model_metadata(XGB_MODEL_FILE, normalization='window_relative', window_size=WINDOW_SIZE,
+                         metrics={'rmse': float(xgb_rmse)})
     print(f"\n✅ Models saved")
+    if args.register:
+        version = register_model(PRICE_MODEL, LSTM_MODEL_FILE)
+        print(f"✅ Registered {PRICE_MODEL} {version}")
+        print(f"   Serve it with: POST /api/admin/models/{PRICE_MODEL}/activate {{\"version\": \"{version}\"}}")
     
     # Plots
     plot_training(history)
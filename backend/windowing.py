@@ -0,0 +1,161 @@
+"""
+Zero-Copy Sequence Windowing
+Builds (window, next value) training pairs as strided views instead of copies
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Callable, Tuple
+
+
+def sliding_windows(series: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Every length-window_size window of a 1D series, as a read-only view
+
+    Args:
+        series: 1D array of length T
+        window_size: Window length W
+
+    Returns:
+        (T - W + 1, W) view sharing memory with series
+    """
+    series = np.asarray(series)
+    if series.ndim != 1:
+        raise ValueError(f"Expected a 1D series, got shape {series.shape}")
+    if len(series) < window_size:
+        raise ValueError(f"Need at least {window_size} values, got {len(series)}")
+    return sliding_window_view(series, window_size)
+
+
+def create_sequences(data: np.ndarray,
+                     window_size: int,
+                     lstm: bool = True,
+                     normalize: bool = False,
+                     horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Inputs x[i] = data[i:i + W, 0] and targets y[i] = data[i + W, 0]
+
+    Same shapes as the loop-and-copy version: x is (T - W, W, 1) for the LSTM
+    or (T - W, W) for XGBoost, y is (T - W,). With horizon H > 1 the targets
+    are the next H values, y[i] = data[i + W:i + W + H, 0], and there are
+    T - W - H + 1 pairs. Without normalize both are
+    views into data, so windowing costs O(T) memory instead of O(T * W).
+    Consumers that need a contiguous array (e.g. a DMatrix) copy only what
+    they use.
+
+    Args:
+        data: (T, 1) or (T,) array of values
+        window_size: Window length W
+        lstm: Add the trailing feature axis for the LSTM
+        normalize: Express each window and its target relative to the
+            window's last value (x / last - 1); this materializes x
+        horizon: Number of future values per target H
+
+    Returns:
+        (x, y)
+    """
+    series = data[:, 0] if np.ndim(data) == 2 else np.asarray(data)
+    n_pairs = len(series) - window_size - horizon + 1
+    x = sliding_windows(series, window_size)[:n_pairs]
+    y = series[window_size:] if horizon == 1 else sliding_windows(series[window_size:], horizon)
+    if normalize:
+        last = x[:, -1]
+        x = x / last[:, np.newaxis] - 1.0
+        y = y / (last if horizon == 1 else last[:, np.newaxis]) - 1.0
+    if lstm:
+        x = x[..., np.newaxis]
+    return x, y
+
+
+# Model input normalizations: prices relative to each window's last price
+# (new models) or the global MinMaxScaler fitted on S&P 500 levels (legacy)
+NORMALIZATIONS = ('window_relative', 'minmax')
+
+
+class WindowNormalizer:
+    """
+    Maps raw price windows to model inputs and model outputs back to prices
+
+    'window_relative' divides each window by its own last price (inputs and
+    targets become x / last - 1), so every symbol lands in the same range
+    regardless of price level. 'minmax' applies a fitted MinMaxScaler's
+    scale_ / min_ directly, for models trained on the global scaler. Both are
+    plain array arithmetic over a whole batch of windows.
+    """
+
+    def __init__(self, method: str = 'window_relative', scale: float = 1.0, offset: float = 0.0):
+        if method not in NORMALIZATIONS:
+            raise ValueError(f"Unknown normalization '{method}'. Use one of {NORMALIZATIONS}")
+        self.method = method
+        self.scale = float(scale)
+        self.offset = float(offset)
+
+    @classmethod
+    def from_scaler(cls, scaler) -> 'WindowNormalizer':
+        """Legacy normalizer reproducing a fitted 1-feature MinMaxScaler"""
+        return cls('minmax', scale=scaler.scale_[0], offset=scaler.min_[0])
+
+    def normalize(self, windows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            windows: (N, W) raw prices
+
+        Returns:
+            (model inputs (N, W, 1), per-window reference prices (N,))
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        reference = windows[:, -1]
+        if self.method == 'window_relative':
+            inputs = windows / reference[:, np.newaxis] - 1.0
+        else:
+            inputs = windows * self.scale + self.offset
+        return inputs[..., np.newaxis], reference
+
+    def denormalize(self, outputs: np.ndarray, reference: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            outputs: (N,) or (N, H) model outputs
+            reference: Reference prices returned by normalize (N,)
+
+        Returns:
+            Prices with the shape of outputs
+        """
+        outputs = np.asarray(outputs, dtype=np.float64)
+        if self.method == 'window_relative':
+            ref = reference.reshape((-1,) + (1,) * (outputs.ndim - 1))
+            return ref * (1.0 + outputs)
+        return (outputs - self.offset) / self.scale
+
+
+def rollout(predict: Callable[[np.ndarray], np.ndarray],
+            normalizer: WindowNormalizer,
+            windows: np.ndarray,
+            forecast_days: int,
+            horizon: int = 1) -> np.ndarray:
+    """
+    Forecast prices for a batch of raw price windows
+
+    Each forward pass predicts horizon days; forecasts longer than that
+    (and one-step models) feed predictions back in, horizon days at a time.
+    Windows slide over one preallocated buffer and are normalized with array
+    arithmetic, so the only per-step call is predict.
+
+    Args:
+        predict: Maps normalized inputs (N, W, 1) to outputs reshapeable to (N, horizon)
+        normalizer: Normalization the model was trained with
+        windows: (N, W) raw prices
+        forecast_days: Number of days to forecast
+        horizon: Days predicted per forward pass
+
+    Returns:
+        (N, forecast_days) predicted prices
+    """
+    n_windows, lookback = windows.shape
+    n_steps = -(-forecast_days // horizon)
+    buffer = np.empty((n_windows, lookback + n_steps * horizon))
+    buffer[:, :lookback] = windows
+    for day in range(0, n_steps * horizon, horizon):
+        inputs, reference = normalizer.normalize(buffer[:, day:day + lookback])
+        outputs = np.asarray(predict(inputs)).reshape(n_windows, horizon)
+        buffer[:, lookback + day:lookback + day + horizon] = normalizer.denormalize(outputs, reference)
+    return buffer[:, lookback:lookback + forecast_days]
@@ -0,0 +1,146 @@
+"""
+XGBoost Price Forecaster
+Serves the XGBoost model trained by train_lstm_enhanced.py without TensorFlow,
+predicting in place on 2D windows batched across symbols
+"""
+
+import logging
+import os
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import xgboost as xgb
+
+from engine_lifecycle import LazyEngine
+from model_metadata import read_model_metadata
+from signals import signal_cache
+from windowing import WindowNormalizer, rollout
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+XGB_MODEL_PATH = os.environ.get('XGB_MODEL_PATH', os.path.join(MODELS_DIR, 'sp500_xgb_model.json'))
+SCALER_PATH = os.environ.get('PRICE_SCALER_PATH', os.path.join(MODELS_DIR, 'scaler.joblib'))
+
+
+def volatility_confidence(prices: np.ndarray) -> float:
+    """
+    Forecast confidence from historical volatility (0.5 to 0.95)
+
+    Lower volatility of daily returns maps to higher confidence.
+    """
+    prices = np.asarray(prices, dtype=float)
+    volatility = np.std(np.diff(prices) / prices[:-1])
+    return float(max(0.5, min(0.95, 1 - (volatility * 10))))
+
+
+def volatility_return_std(prices: np.ndarray, forecast_days: int) -> float:
+    """Dispersion of the total return over forecast_days implied by historical daily volatility"""
+    prices = np.asarray(prices, dtype=float)
+    return float(np.std(np.diff(prices) / prices[:-1]) * np.sqrt(forecast_days))
+
+
+def build_forecast_results(symbols: List[str],
+                           current_prices: np.ndarray,
+                           forecast_prices: np.ndarray,
+                           confidences: List[float],
+                           forecast_days: int,
+                           return_stds: List[float]) -> Dict[str, Dict]:
+    """
+    Per-symbol forecast summaries, recorded in the signal cache for Black-Litterman views
+
+    return_stds (the dispersion of each expected return) sets how much
+    weight the view gets; it is recorded, not returned.
+
+    Returns:
+        Symbol -> {'current_price', 'forecast_price', 'expected_return', 'confidence'}
+    """
+    results = {}
+    for symbol, current, forecast, confidence, return_std in zip(symbols, current_prices, forecast_prices,
+                                                                 confidences, return_stds):
+        expected_return = float(forecast / current - 1)
+        signal_cache.record_forecast(symbol, expected_return, forecast_days, confidence, return_std)
+        results[symbol] = {
+            'current_price': float(current),
+            'forecast_price': float(forecast),
+            'expected_return': expected_return,
+            'confidence': confidence
+        }
+    return results
+
+
+class XGBForecaster:
+    """
+    One-step XGBoost model rolled forward over batches of price windows
+
+    The model sees exactly window_size prices, normalized the way it was
+    trained (model metadata; legacy models use the global scaler). Each step
+    is one Booster.inplace_predict over all windows, which skips DMatrix
+    construction and runs in well under a millisecond for a screen's worth
+    of symbols.
+    """
+
+    def __init__(self, model_path: str = XGB_MODEL_PATH, scaler_path: str = SCALER_PATH):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"XGBoost model not found: {model_path}")
+        self.booster = xgb.Booster()
+        self.booster.load_model(model_path)
+        self.metadata = read_model_metadata(model_path)
+        self.window_size = int(self.metadata['window_size'])
+
+        if self.metadata['normalization'] == 'window_relative':
+            self.normalizer = WindowNormalizer('window_relative')
+        else:
+            self.normalizer = WindowNormalizer.from_scaler(joblib.load(scaler_path))
+        logger.info(f"XGBoost forecaster loaded ({self.normalizer.method}, window {self.window_size})")
+
+    def _predict(self, inputs: np.ndarray) -> np.ndarray:
+        return self.booster.inplace_predict(inputs[..., 0])
+
+    def rollout(self, windows: np.ndarray, forecast_days: int) -> np.ndarray:
+        """
+        Args:
+            windows: (N, >= window_size) raw prices; the last window_size are used
+            forecast_days: Number of days to forecast
+
+        Returns:
+            (N, forecast_days) predicted prices
+        """
+        windows = np.asarray(windows, dtype=float)
+        if windows.shape[1] < self.window_size:
+            raise ValueError(f"XGBoost model needs {self.window_size} days of data, got {windows.shape[1]}")
+        return rollout(self._predict, self.normalizer, windows[:, -self.window_size:], forecast_days)
+
+    def forecast_returns(self, price_histories: Dict[str, List[float]], forecast_days: int = 5) -> Dict[str, Dict]:
+        """
+        Forecast returns for many symbols with one inplace_predict per forecast step
+
+        Args:
+            price_histories: Symbol -> historical closing prices (>= window_size each)
+            forecast_days: Number of days to predict
+
+        Returns:
+            Symbol -> {'current_price', 'forecast_price', 'expected_return', 'confidence'}
+
+        Raises:
+            ValueError: Some symbols have fewer than window_size prices
+        """
+        symbols = list(price_histories)
+        short = [s for s in symbols if len(price_histories[s]) < self.window_size]
+        if short:
+            raise ValueError(f"Need at least {self.window_size} days of data for: {', '.join(short)}")
+
+        windows = np.array([np.asarray(price_histories[s], dtype=float)[-self.window_size:] for s in symbols])
+        forecasts = self.rollout(windows, forecast_days)[:, -1]
+        confidences = [volatility_confidence(w) for w in windows]
+        return_stds = [volatility_return_std(w, forecast_days) for w in windows]
+        return build_forecast_results(symbols, windows[:, -1], forecasts, confidences, forecast_days, return_stds)
+
+
+_forecaster = LazyEngine(XGBForecaster, name='XGBoost forecaster')
+
+
+def get_xgb_forecaster() -> XGBForecaster:
+    """Get or create the XGBoost forecaster (loaded once, thread-safe)"""
+    return _forecaster.get()